@@ -0,0 +1,96 @@
+"""
+익명 사용자 지연 생성 및 빈 사용자 정리
+첫 방문(크롤러, 헬스 체크 포함)에는 users 행을 만들지 않고 기본 설정을 가진 임시 사용자로 응답하며,
+채팅/설정 저장처럼 상태를 바꾸는 요청에서 처음으로 사용자를 만든다
+대화가 하나도 없는 채 일정 기간(USER_GC_TTL_DAYS) 활동이 없는 사용자는 flask gc-users로 배치 삭제한다
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import click
+from flask import Flask
+from sqlalchemy import delete, exists, select
+
+from models import db, User, Conversation, Message, UserSession, ArchivedConversation
+
+USER_GC_TTL_DAYS = int(os.environ.get("USER_GC_TTL_DAYS", "30"))
+USER_GC_BATCH_SIZE = 500
+
+
+def _column_default(column):
+    return column.default.arg if column.default is not None else None
+
+
+class AnonymousUser:
+    """아직 DB에 만들지 않은 방문자 (User 기본값과 같은 읽기 전용 속성)"""
+
+    id = None
+    is_anonymous = True
+    name = _column_default(User.__table__.c.name)
+    search_scope = _column_default(User.__table__.c.search_scope)
+    theme = _column_default(User.__table__.c.theme)
+    preferred_model = _column_default(User.__table__.c.preferred_model)
+
+
+anonymous_user = AnonymousUser()
+
+
+def empty_user_criteria(now: Optional[datetime] = None, ttl_days: int = USER_GC_TTL_DAYS):
+    """정리 대상 조건: 기간 동안 활동이 없고 대화(보관 포함)/메시지가 없는 사용자"""
+    now = now or datetime.utcnow()
+    return [
+        User.last_active < now - timedelta(days=ttl_days),
+        ~exists().where(Conversation.user_id == User.id),
+        ~exists().where(ArchivedConversation.user_id == User.id),
+        ~exists().where(Message.user_id == User.id)
+    ]
+
+
+def collect_empty_users(ttl_days: int = USER_GC_TTL_DAYS, batch_size: int = USER_GC_BATCH_SIZE,
+                        sleep_seconds: float = 0.0, max_batches: Optional[int] = None,
+                        progress: Optional[Callable[[int], None]] = None) -> int:
+    """빈 사용자를 배치 단위 집합 삭제로 정리하고 삭제한 수 반환 (배치마다 커밋)"""
+    criteria = empty_user_criteria(ttl_days=ttl_days)
+    deleted = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            select(User.id).where(*criteria).order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        # 조회 후 대화를 시작한 사용자는 제외하도록 삭제 시 조건을 다시 적용
+        # (세션이 사용자를 참조하므로 먼저 삭제)
+        targets = select(User.id).where(User.id.in_(ids), *criteria)
+        db.session.execute(delete(UserSession).where(UserSession.user_id.in_(targets)))
+        result = db.session.execute(delete(User).where(User.id.in_(ids), *criteria))
+        db.session.commit()
+        deleted += result.rowcount
+        batches += 1
+        if progress:
+            progress(deleted)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return deleted
+
+
+def register_user_commands(app: Flask):
+    """flask gc-users 명령 등록"""
+
+    @app.cli.command("gc-users")
+    @click.option("--ttl-days", default=USER_GC_TTL_DAYS, show_default=True, help="마지막 활동 후 정리까지의 기간")
+    @click.option("--batch-size", default=USER_GC_BATCH_SIZE, show_default=True)
+    @click.option("--sleep", "sleep_seconds", default=0.0, show_default=True, help="배치 사이 대기 시간(초)")
+    @click.option("--max-batches", default=None, type=int, help="이번 실행에서 처리할 최대 배치 수")
+    def gc_users(ttl_days, batch_size, sleep_seconds, max_batches):
+        """대화가 없는 비활성 사용자 삭제"""
+        deleted = collect_empty_users(ttl_days, batch_size, sleep_seconds, max_batches,
+                                      lambda done: click.echo(f"삭제 진행: {done}건", err=True))
+        logging.info(f"빈 사용자 정리 완료: {deleted}건")
+        click.echo(f"삭제 완료: {deleted}건", err=True)
@@ -1,12 +1,43 @@
+# 시작 시간 측정을 위해 가장 먼저 import
+from bootstrap import (startup_timer, register_bootstrap_commands, ensure_schema,
+                       warm_rule_tables, SCHEMA_AUTO_CREATE)
 import os
 import requests
 import logging
 import time
 import hashlib
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta
-from models import db, User, Conversation, Message, UserSession
+from models import db, User, Conversation, Message, UserSession, ArchivedConversation
+from quality_scorer import IncrementalQualityScorer
+from pplx_client import request_chat_completion
+from http_cache import init_http_cache, make_etag, not_modified, set_validators, PUBLIC_LONG_LIVED, PRIVATE_REVALIDATE
+from json_provider import init_json_provider
+from projections import (paginate_rows, message_dicts, history_entries, conversation_buckets,
+                         CONVERSATION_BUCKETS)
+from history_io import iter_export_lines, register_history_commands
+from archive import (register_archive_commands, find_archived_conversation,
+                     archived_message_dicts, archived_history_entries)
+from citation_store import register_citation_commands, store_message_citations
+from assets import init_assets, register_asset_commands
+from chat_batch import normalize_items, clamp_concurrency, iter_batch_results, register_batch_commands
+from prefetch import Prefetcher, PREFETCH_ENABLED
+from session_store import init_session_store, register_session_commands, detach_conversations
+from anonymous_users import anonymous_user, register_user_commands
+from db_routing import init_db_routing, register_replica_commands, replica_read
+from query_stats import init_query_stats
+from sqlite_profile import configure_sqlite_profile, init_sqlite_profile
+from deadline import deadline_for, DeadlineExceeded, upstream_latency
+from traffic_capture import init_traffic_capture, record_upstream, record_cancel
+from shared_cache import register_cache_commands
+from cancellation import (RequestCancelled, start_request, finish_request, request_cancel,
+                          valid_request_id)
+from upstream_scheduler import upstream_scheduler, upstream_lane, UpstreamOverloaded, register_upstream_commands
+from keyword_index import (register_keyword_commands, index_message, forget_conversations,
+                           related_conversations, asked_before)
+
+startup_timer.mark("imports")
 
 # 로깅 설정
 logging.basicConfig(level=logging.DEBUG)
@@ -23,13 +54,58 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 }
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# 단일 노드 SQLite 파일 DB면 WAL/스레드별 커넥션/쓰기 직렬화 프로필 사용
+sqlite_profile = configure_sqlite_profile(app)
+
+# 읽기 전용 복제본 바인드 (DATABASE_REPLICA_URL 설정 시)
+init_db_routing(app)
+
 # 데이터베이스 초기화
 db.init_app(app)
+if sqlite_profile:
+    init_sqlite_profile(app)
+
+# 요청별 쿼리 수/DB 시간/풀 대기 계측 (QUERY_STATS=true)
+init_query_stats(app)
+
+# 응답 압축 (gzip/brotli) 및 고속 JSON 직렬화
+init_http_cache(app)
+init_json_provider(app)
+
+# /api/chat 트래픽 캡처 (TRAFFIC_CAPTURE_PATH 설정 시, 압축 전 응답을 읽도록 압축 훅 뒤에 등록)
+init_traffic_capture(app)
+
+# 서버 측 세션 (user_sessions 테이블, 정적 자산 인터페이스가 감싸므로 먼저 설정)
+init_session_store(app)
+
+# 해시/사전 압축된 정적 자산 (python -m assets로 빌드, 없으면 원본 파일 사용)
+init_assets(app)
+
+# 관리 명령 (flask init-db / build-assets / export-history / import-history / archive-conversations / backfill-citations / reindex-keywords / upstream-stats / sweep-sessions / gc-users / replica-sync / cache-stats / cache-clear)
+register_history_commands(app)
+register_archive_commands(app)
+register_citation_commands(app)
+register_keyword_commands(app)
+register_upstream_commands(app)
+register_bootstrap_commands(app)
+register_asset_commands(app)
+register_session_commands(app)
+register_user_commands(app)
+register_replica_commands(app)
+register_cache_commands(app)
+
+startup_timer.mark("app_config")
 
 # Perplexity API 설정
 PERPLEXITY_API_KEY = os.environ.get("PERPLEXITY_API_KEY", "your_api_key_here")
-PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+PERPLEXITY_API_URL = os.environ.get("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
 DEFAULT_MODEL = "sonar-pro"
+# 사용자 마지막 활동 시각 갱신 간격(초)
+LAST_ACTIVE_RESOLUTION = int(os.environ.get("LAST_ACTIVE_RESOLUTION", "300"))
+
+# 스트리밍 모드: 답변을 받는 도중 품질을 채점해 기준 미달이 예측되면 즉시 재시도
+PPLX_STREAMING = os.environ.get("PPLX_STREAMING", "false").lower() == "true"
+QUALITY_THRESHOLD = 70
 
 # PPLX 모델 설정
 PPLX_MODELS = {
@@ -84,6 +160,22 @@ PPLX_MODELS = {
     }
 }
 
+# 모델 목록 응답의 ETag (모델 설정이 바뀔 때만 달라짐)
+MODELS_ETAG = make_etag('models', DEFAULT_MODEL, repr(PPLX_MODELS))
+
+# /api/models, /api/bootstrap 응답용 모델 목록
+MODELS_INFO = [
+    {
+        'id': model_id,
+        'name': model_data['name'],
+        'description': model_data['description'],
+        'has_web_search': model_data['has_web_search'],
+        'recommended_for': model_data['recommended_for'],
+        'icon': model_data['icon']
+    }
+    for model_id, model_data in PPLX_MODELS.items()
+]
+
 def classify_question(user_input):
     """
     사용자 입력을 분류하여 적절한 응답 방식을 결정
@@ -181,21 +273,34 @@ def get_response_config(question_type, search_scope):
     
     return config
 
-def get_or_create_user():
-    """세션에서 사용자 ID를 가져오거나 새 사용자 생성"""
+def get_current_user():
+    """세션의 사용자 조회 (없으면 DB에 쓰지 않고 임시 익명 사용자 반환)
+    
+    조회만 하는 요청에서 사용하며, 상태를 바꾸는 요청은 get_or_create_user()를 사용한다
+    """
     user_id = session.get('user_id')
     
     if user_id:
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if user:
-            # 마지막 활동 시간 업데이트
-            user.last_active = datetime.utcnow()
-            try:
-                db.session.commit()
-            except:
-                db.session.rollback()
+            # 마지막 활동 시간 업데이트 (매 요청 쓰기를 피하도록 일정 간격으로만)
+            now = datetime.utcnow()
+            if now - user.last_active >= timedelta(seconds=LAST_ACTIVE_RESOLUTION):
+                user.last_active = now
+                try:
+                    db.session.commit()
+                except:
+                    db.session.rollback()
             return user
     
+    return anonymous_user
+
+def get_or_create_user():
+    """세션에서 사용자를 가져오거나 새 사용자 생성 (첫 상태 변경 요청에서 사용자 생성)"""
+    user = get_current_user()
+    if user is not anonymous_user:
+        return user
+    
     # 새 사용자 생성
     user = User()
     try:
@@ -243,112 +348,228 @@ def get_or_create_conversation(user_id):
 @app.route('/')
 def index():
     """메인 페이지 렌더링"""
-    # 사용자 생성 또는 가져오기
-    user = get_or_create_user()
-    return render_template('index.html')
+    # 사용자 가져오기 (첫 방문이면 DB에 만들지 않고 임시 익명 사용자 사용)
+    user = get_current_user()
+    
+    # 첫 화면에 필요한 데이터를 HTML에 함께 넣어 추가 API 왕복을 없앰
+    # (시작 화면은 환영 화면이므로 현재 대화 메시지는 제외)
+    try:
+        bootstrap = build_bootstrap(user, include_current=False)
+    except Exception as e:
+        logging.error(f"초기 데이터 생성 실패: {e}")
+        bootstrap = None
+    
+    return render_template('index.html', bootstrap=bootstrap)
+
+def user_settings(user):
+    """사용자 설정 dict"""
+    return {
+        'user_name': user.name,
+        'search_scope': user.search_scope,
+        'theme': user.theme,
+        'preferred_model': user.preferred_model
+    }
+
+def conversation_page(user_id, page=1, per_page=50, search_query='', bucket=None):
+    """대화 목록을 날짜 그룹별로 페이지네이션해서 반환 (그룹 분류/개수는 DB에서 계산)
+    
+    bucket을 지정하면 해당 그룹의 page만 조회하고, 없으면 모든 그룹의 page를 조회한다
+    (그룹별 개수는 항상 전체 그룹에 대해 반환)
+    
+    Returns:
+        tuple: (날짜별 대화 목록, 페이지네이션 정보 - 그룹별 정보는 'buckets')
+    """
+    criteria = [Conversation.user_id == user_id]
+    
+    # 검색 필터
+    if search_query:
+        criteria.append(
+            db.or_(
+                Conversation.title.ilike(f'%{search_query}%'),
+                Conversation.id.in_(
+                    db.session.query(Message.conversation_id)
+                    .filter(Message.content.ilike(f'%{search_query}%'))
+                    .distinct()
+                )
+            )
+        )
+    
+    page = max(1, page)
+    pages = {bucket: page} if bucket else dict.fromkeys(CONVERSATION_BUCKETS, page)
+    grouped, buckets = conversation_buckets(criteria, pages, per_page)
+    
+    # 요청한 그룹 기준 요약 (기존 단일 페이지네이션 형식 유지)
+    requested = [buckets[name] for name in pages]
+    pagination = {
+        'page': page,
+        'pages': max(info['pages'] for info in requested),
+        'per_page': max(1, per_page),
+        'total': sum(info['total'] for info in buckets.values()),
+        'has_next': any(info['has_next'] for info in requested),
+        'has_prev': page > 1,
+        'buckets': buckets
+    }
+    return grouped, pagination
+
+def build_bootstrap(user, include_current=True):
+    """첫 화면 로드에 필요한 데이터 (설정, 모델 목록, 대화 목록, 현재 대화)를 한 번에 조회"""
+    conversations, pagination = conversation_page(user.id)
+    
+    data = {
+        'success': True,
+        'settings': user_settings(user),
+        'models': MODELS_INFO,
+        'default_model': DEFAULT_MODEL,
+        'conversations': conversations,
+        'pagination': pagination,
+        'current_conversation': None
+    }
+    
+    conversation_id = session.get('conversation_id')
+    if conversation_id:
+        data['current_conversation'] = {
+            'id': conversation_id,
+            'messages': history_entries(conversation_id, user.name) if include_current else None
+        }
+    
+    return data
+
+@app.route('/api/bootstrap', methods=['GET'])
+def get_bootstrap():
+    """첫 화면 초기 데이터 (사용자 조회 1회로 설정/모델/대화 목록/현재 대화를 함께 반환)"""
+    try:
+        user = get_current_user()
+        include_current = request.args.get('current', '1') != '0'
+        
+        response = jsonify(build_bootstrap(user, include_current=include_current))
+        response.headers['Cache-Control'] = PRIVATE_REVALIDATE
+        response.vary.add('Cookie')
+        return response
+    except Exception as e:
+        logging.error(f"초기 데이터 조회 실패: {e}")
+        return jsonify({'success': False, 'error': '초기 데이터를 불러올 수 없습니다.'}), 500
 
 @app.route('/api/conversations', methods=['GET'])
+@replica_read
 def get_conversations():
     """사용자의 대화 목록 조회"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         
         # 페이지네이션 파라미터
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
         search_query = request.args.get('search', '').strip()
-        
-        # 기본 쿼리
-        query = Conversation.query.filter_by(user_id=user.id)
-        
-        # 검색 필터
-        if search_query:
-            query = query.filter(
-                db.or_(
-                    Conversation.title.ilike(f'%{search_query}%'),
-                    Conversation.id.in_(
-                        db.session.query(Message.conversation_id)
-                        .filter(Message.content.ilike(f'%{search_query}%'))
-                        .distinct()
-                    )
-                )
-            )
-        
-        # 정렬 및 페이지네이션
-        conversations = query.order_by(Conversation.updated_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        # 대화 목록을 딕셔너리로 변환하고 메시지 수 추가
-        conversations_list = []
-        for conv in conversations.items:
-            conv_dict = conv.to_dict()
-            # 메시지 수 추가
-            message_count = Message.query.filter_by(conversation_id=conv.id).count()
-            conv_dict['message_count'] = message_count
-            conversations_list.append(conv_dict)
-        
-        # 날짜별 그룹핑
-        grouped_conversations = group_conversations_by_date(conversations_list)
-        
-        return jsonify({
+        bucket = request.args.get('bucket') or None
+        if bucket and bucket not in CONVERSATION_BUCKETS:
+            return jsonify({'success': False, 'error': '알 수 없는 대화 그룹입니다.'}), 400
+        
+        # 변경 여부 확인 (대화 수, 최근 수정 시각, 메시지 수, 날짜 그룹 기준일)
+        # 대화 삭제는 최근 수정 시각을 바꾸지 않으므로 Last-Modified 없이 ETag만 사용
+        conversation_count, last_updated, message_total = db.session.query(
+            db.func.count(Conversation.id),
+            db.func.max(Conversation.updated_at),
+            db.session.query(db.func.count(Message.id)).filter(Message.user_id == user.id).scalar_subquery()
+        ).filter(Conversation.user_id == user.id).one()
+        etag = make_etag('conversations', user.id, page, per_page, search_query, bucket,
+                         conversation_count, last_updated, message_total, datetime.utcnow().date())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        grouped_conversations, pagination = conversation_page(user.id, page, per_page, search_query, bucket)
+        
+        return set_validators(jsonify({
             'success': True,
             'conversations': grouped_conversations,
-            'pagination': {
-                'page': conversations.page,
-                'pages': conversations.pages,
-                'per_page': conversations.per_page,
-                'total': conversations.total,
-                'has_next': conversations.has_next,
-                'has_prev': conversations.has_prev
-            }
-        })
+            'pagination': pagination
+        }), etag)
         
     except Exception as e:
         logging.error(f"대화 목록 조회 실패: {e}")
         return jsonify({'success': False, 'error': '대화 목록을 불러올 수 없습니다.'}), 500
 
 @app.route('/api/conversations/<conversation_id>', methods=['GET'])
+@replica_read
 def get_conversation(conversation_id):
     """특정 대화의 상세 내용 조회"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         conversation = Conversation.query.filter_by(
             id=conversation_id, 
             user_id=user.id
         ).first()
         
         if not conversation:
-            return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
-        
-        # 메시지 목록 포함
-        messages = Message.query.filter_by(
-            conversation_id=conversation_id
-        ).order_by(Message.created_at.asc()).all()
-        
-        return jsonify({
-            'conversation': conversation.to_dict(),
-            'messages': [msg.to_dict() for msg in messages]
-        })
+            # 보관된 대화는 요청 시 압축을 풀어 반환
+            archived = find_archived_conversation(conversation_id, user.id)
+            if not archived:
+                return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
+            
+            etag = make_etag('archived_conversation', archived.id, archived.archived_at)
+            cached = not_modified(etag, archived.archived_at)
+            if cached:
+                return cached
+            
+            return set_validators(jsonify({
+                'conversation': archived.to_dict(),
+                'messages': archived_message_dicts(archived)
+            }), etag, archived.archived_at)
+        
+        # 변경 여부 확인 (수정 시각, 메시지 수)
+        message_count = Message.query.filter_by(conversation_id=conversation_id).count()
+        etag = make_etag('conversation', conversation.id, conversation.updated_at,
+                         conversation.is_favorite, message_count)
+        cached = not_modified(etag, conversation.updated_at)
+        if cached:
+            return cached
+        
+        conversation_dict = conversation.to_dict(message_count=message_count)
+        
+        return set_validators(jsonify({
+            'conversation': conversation_dict,
+            'messages': message_dicts(conversation_id)
+        }), etag, conversation.updated_at)
         
     except Exception as e:
         logging.error(f"대화 조회 실패: {e}")
         return jsonify({'error': '대화를 불러올 수 없습니다.'}), 500
 
+@app.route('/api/conversations/<conversation_id>/related', methods=['GET'])
+@replica_read
+def get_related_conversations(conversation_id):
+    """키워드가 겹치는 같은 사용자의 지난 대화 (사용자별 역색인 조회)"""
+    try:
+        user = get_current_user()
+        exists = db.session.query(Conversation.id).filter_by(id=conversation_id, user_id=user.id).first()
+        if not exists:
+            return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
+        
+        limit = min(max(request.args.get('limit', 5, type=int), 1), 20)
+        return jsonify({'related': related_conversations(user.id, conversation_id, limit)})
+        
+    except Exception as e:
+        logging.error(f"관련 대화 조회 실패: {e}")
+        return jsonify({'error': '관련 대화를 불러올 수 없습니다.'}), 500
+
 @app.route('/api/conversations/<conversation_id>', methods=['DELETE'])
 def delete_conversation(conversation_id):
     """대화 삭제"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         conversation = Conversation.query.filter_by(
             id=conversation_id, 
             user_id=user.id
         ).first()
         
         if not conversation:
-            return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
+            conversation = find_archived_conversation(conversation_id, user.id)
+            if not conversation:
+                return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
         
         # 관련 메시지도 함께 삭제 (CASCADE로 자동 처리됨)
+        detach_conversations([conversation_id])
+        forget_conversations([conversation_id])
         db.session.delete(conversation)
         db.session.commit()
         
@@ -362,7 +583,7 @@ def delete_conversation(conversation_id):
 def toggle_favorite(conversation_id):
     """대화 즐겨찾기 토글"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         conversation = Conversation.query.filter_by(
             id=conversation_id, 
             user_id=user.id
@@ -407,43 +628,11 @@ def create_new_conversation():
         logging.error(f"대화 생성 실패: {e}")
         return jsonify({'error': '새 대화를 생성할 수 없습니다.'}), 500
 
-def group_conversations_by_date(conversations):
-    """대화를 날짜별로 그룹핑"""
-    from datetime import datetime, timedelta
-    
-    now = datetime.utcnow()
-    today = now.date()
-    yesterday = today - timedelta(days=1)
-    week_ago = today - timedelta(days=7)
-    
-    grouped = {
-        'favorites': [],
-        'today': [],
-        'yesterday': [],
-        'this_week': [],
-        'older': []
-    }
-    
-    for conv in conversations:
-        conv_date = datetime.fromisoformat(conv['updated_at'].replace('Z', '+00:00')).date()
-        
-        if conv.get('is_favorite'):
-            grouped['favorites'].append(conv)
-        elif conv_date == today:
-            grouped['today'].append(conv)
-        elif conv_date == yesterday:
-            grouped['yesterday'].append(conv)
-        elif conv_date >= week_ago:
-            grouped['this_week'].append(conv)
-        else:
-            grouped['older'].append(conv)
-    
-    return grouped
-
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """채팅 API 엔드포인트 - 질문 유형별 맞춤 응답 제공"""
     try:
+        request_started = time.monotonic()
         data = request.get_json()
         user_message = data.get('message', '').strip()
         search_scope = data.get('search_scope', 'general')
@@ -456,11 +645,28 @@ def chat():
         question_type = classify_question(user_message)
         logging.debug(f"질문 유형 분류: '{user_message}' -> {question_type}")
         
+        # 요청 전체 마감 시간 (질문 유형별 예산 또는 클라이언트 지정값)
+        deadline = deadline_for(question_type, data.get('deadline_ms'), started=request_started)
+        
         # 질문 유형에 따른 응답 설정 가져오기
         response_config = get_response_config(question_type, search_scope)
         
         # 사용자 및 대화 가져오기/생성
         user = get_or_create_user()
+        
+        # 사용자가 선택한 모델 사용 (기본값: sonar-pro)
+        selected_model = resolve_model(data.get('selected_model'), user)
+        lane = upstream_lane(question_type, selected_model, user.id)
+        
+        # 선조회된 관련 질문 답변이 있으면 바로 사용하고, 없으면 업스트림 대기열이 넘치는지 먼저 확인
+        # (과부하면 대화/메시지를 만들기 전에 바로 503)
+        answer = None
+        if response_config.get("use_search", True):
+            answer = prefetcher.lookup(user_message, search_scope, selected_model) if PREFETCH_ENABLED else None
+            if answer is None:
+                upstream_scheduler.admit(lane)
+        prefetched = answer is not None
+        
         conversation = get_or_create_conversation(user.id)
         
         # 처리 시작 시간 기록
@@ -513,137 +719,48 @@ def chat():
                 'model_used': 'direct_response'  # 직접 응답의 경우
             })
         
-        # 검색이 필요한 경우 Perplexity API 호출
-        messages = []
-        
-        # 품질 개선된 시스템 메시지 구성
-        if response_config.get("use_search", True):
-            system_content = f"""당신은 전문적인 AI 검색 어시스턴트입니다. {response_config.get('prompt_prefix', '다음 질문에 대해 도움이 되는 답변을 제공해주세요')}.
-
-다음 품질 기준을 준수해주세요:
-1. 최소 300자 이상의 상세한 답변 제공
-2. 명확한 구조로 2-3개 섹션 구성 (예: 정의, 상세 설명, 요약/결론)
-3. 제공된 참고자료를 다양하게 활용하여 신뢰성 확보
-4. 구체적인 예시나 세부사항 포함
-5. 마크다운 포맷으로 가독성 향상 (**, ##, - 등 활용)
-
-답변은 정확하고 포괄적이며 사용자에게 실질적인 도움이 되도록 작성해주세요."""
-        else:
-            system_content = f"""당신은 친근하고 전문적인 AI 어시스턴트입니다. 사용자와 자연스럽게 대화하되, 다음을 준수해주세요:
-
-1. 충분히 상세하고 도움이 되는 답변 제공
-2. 명확하고 구조화된 형태로 답변 구성
-3. 구체적인 예시나 설명 포함
-
-사용자에게 최고 품질의 대화 경험을 제공해주세요."""
-        
-        messages.append({
-            "role": "system",
-            "content": system_content
-        })
-        
-        # 이전 대화 기록 추가 (최근 10개 메시지, 인사말 제외)
+        # 이전 대화 기록 (최근 10개 메시지, 인사말 제외)
         recent_messages = Message.query.filter_by(
             conversation_id=conversation.id
         ).filter(
             Message.question_type != 'greeting'
         ).order_by(Message.created_at.desc()).limit(10).all()
         
-        # 시간순 정렬로 되돌리기
+        # 시간순 정렬로 되돌리기 (현재 메시지와 취소된 턴은 제외)
         recent_messages.reverse()
+        history = [
+            {"role": "user" if msg.message_type == 'user' else "assistant", "content": msg.content}
+            for msg in drop_cancelled_turns(recent_messages) if msg.id != user_message_obj.id
+        ]
         
-        for msg in recent_messages:
-            if msg.id != user_message_obj.id:  # 현재 메시지는 제외
-                messages.append({
-                    "role": "user" if msg.message_type == 'user' else "assistant",
-                    "content": msg.content
-                })
-        
-        # 현재 사용자 메시지 추가
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
-        
-        # Perplexity API 요청
-        headers = {
-            'Authorization': f'Bearer {PERPLEXITY_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
-        # 사용자가 선택한 모델 사용 (기본값: sonar-pro)
-        selected_model = data.get('selected_model') or user.preferred_model or DEFAULT_MODEL
-        
-        # 모델이 유효한지 확인
-        if selected_model not in PPLX_MODELS:
-            selected_model = DEFAULT_MODEL
-            logging.warning(f"Invalid model {selected_model} requested, using default {DEFAULT_MODEL}")
-        
-        # 선택된 모델이 웹 검색을 지원하지 않는 경우 검색 비활성화
-        model_info = PPLX_MODELS[selected_model]
-        if not model_info["has_web_search"] and response_config.get("use_search", True):
-            logging.info(f"Model {selected_model} doesn't support web search, adjusting response")
-        
-        payload = {
-            "model": selected_model,
-            "messages": messages,
-            "temperature": 0.2,  # 일관성 향상
-            "top_p": 0.9,
-            "max_tokens": 2000,  # 충분한 답변 길이
-            "return_images": False,
-            "return_related_questions": False,
-            "stream": False,
-            "presence_penalty": 0,
-            "frequency_penalty": 1
-        }
-        
-        # 웹 검색을 지원하는 모델의 경우에만 검색 설정 추가
-        if model_info["has_web_search"]:
-            payload["search_recency_filter"] = response_config.get("search_recency_filter", "month")
-        
-        logging.debug(f"Perplexity API 요청 (질문유형: {question_type}, 모델: {selected_model}): {payload}")
-        
-        response = requests.post(PERPLEXITY_API_URL, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        api_response = response.json()
-        logging.debug(f"Perplexity API 응답: {api_response}")
-        
-        # AI 응답 추출
-        ai_content = api_response['choices'][0]['message']['content']
-        citations = api_response.get('citations', [])
-        
-        # 답변 품질 검증
-        quality_score = evaluate_response_quality(ai_content, citations, question_type)
-        logging.info(f"답변 품질 점수: {quality_score['total_score']}/100")
-        
-        # 품질 기준 미달 시 재시도 (최대 2회 추가)
-        retry_count = 0
-        max_retries = 2
+        # 업스트림 호출 전에 같은 질문을 했던 지난 대화 조회 후 이번 질문을 색인에 추가
+        previous_conversations = asked_before(user.id, user_message, conversation.id)
+        index_message(user_message_obj)
         
-        while quality_score['total_score'] < 70 and retry_count < max_retries:
-            retry_count += 1
-            logging.warning(f"품질 기준 미달 (점수: {quality_score['total_score']}), 재시도 {retry_count}/{max_retries}")
-            
-            # 질문을 더 구체적으로 재구성
-            enhanced_message = enhance_question_for_retry(user_message, question_type, retry_count)
-            messages[-1]['content'] = enhanced_message
-            
-            # 재요청
-            retry_response = requests.post(PERPLEXITY_API_URL, headers=headers, json=payload, timeout=30)
-            if retry_response.status_code == 200:
-                api_response = retry_response.json()
-                ai_content = api_response['choices'][0]['message']['content']
-                citations = api_response.get('citations', [])
-                quality_score = evaluate_response_quality(ai_content, citations, question_type)
-                logging.info(f"재시도 후 품질 점수: {quality_score['total_score']}/100")
-            else:
-                break
-        
-        # 출처 필터링 (관련성 높은 출처만 선별)
-        max_sources = response_config.get("max_sources", 4)
-        if len(citations) > max_sources:
-            citations = citations[:max_sources]
+        # Perplexity API 호출 (품질 기준 미달 시 재시도, 클라이언트가 취소하거나 연결을 끊으면 중단)
+        if answer is None:
+            cancel = start_request(data.get('request_id'))
+            try:
+                answer = generate_answer(user_message, question_type, response_config, selected_model, history,
+                                         deadline, cancel, lane)
+            except RequestCancelled as e:
+                processing_time = time.time() - start_time
+                logging.info(f"채팅 요청 취소 ({e}, {processing_time:.1f}초 후)")
+                record_cancel(str(e))
+                record_cancelled_turn(conversation, user.id, user_message, question_type, search_scope, processing_time)
+                return jsonify({'error': '요청이 취소되었습니다.', 'cancelled': True}), 499
+            except UpstreamOverloaded as e:
+                record_cancelled_turn(conversation, user.id, user_message, question_type, search_scope,
+                                      time.time() - start_time, content='요청이 많아 응답하지 못했습니다.')
+                return overloaded_response(e)
+            finally:
+                finish_request(cancel)
+        ai_content = answer['response']
+        citations = answer['citations']
+        
+        # 다음 질문으로 이어질 가능성이 높은 관련 질문을 백그라운드에서 미리 답변
+        if PREFETCH_ENABLED and answer.get('related_questions'):
+            prefetcher.schedule(user.id, answer['related_questions'], search_scope, selected_model)
         
         # 처리 시간 계산
         processing_time = time.time() - start_time
@@ -668,23 +785,25 @@ def chat():
         
         db.session.commit()
         
-        return jsonify({
+        # 인용 URL을 정규화 테이블에 저장 (도메인/URL 중복 제거)
+        store_message_citations(ai_message_obj.id, citations)
+        
+        result = {
             'success': True,
-            'response': ai_content,
-            'citations': citations,
             'timestamp': user_message_obj.created_at.isoformat(),
-            'question_type': question_type,
-            'model_used': selected_model,
-            'quality_score': quality_score,
-            'retry_count': retry_count,
-            'source_filtering': {
-                'total_sources': len(api_response.get('citations', [])),
-                'filtered_sources': len(citations),
-                'filtered_count': max(0, len(api_response.get('citations', [])) - len(citations)),
-                'filter_description': f'관련성 기반 필터링 (최대 {max_sources}개 소스)'
-            }
-        })
-        
+            **answer_fields(answer)
+        }
+        if prefetched:
+            result['prefetched'] = True
+        if previous_conversations:
+            result['asked_before'] = previous_conversations
+        return jsonify(result)
+        
+    except UpstreamOverloaded as e:
+        return overloaded_response(e)
+    except (DeadlineExceeded, requests.exceptions.Timeout) as e:
+        logging.error(f"응답 시간 초과: {str(e)}")
+        return jsonify({'error': '응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.'}), 504
     except requests.exceptions.RequestException as e:
         logging.error(f"API 요청 오류: {str(e)}")
         return jsonify({'error': 'API 요청 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.'}), 500
@@ -695,67 +814,496 @@ def chat():
         logging.error(f"예상치 못한 오류: {str(e)}")
         return jsonify({'error': '서버 오류가 발생했습니다. 잠시 후 다시 시도해주세요.'}), 500
 
-def evaluate_response_quality(response, citations, question_type):
-    """답변 품질을 평가하는 함수"""
-    score = {
-        'length_score': 0,
-        'structure_score': 0,
-        'citation_score': 0,
-        'content_score': 0,
-        'total_score': 0
-    }
+def resolve_model(requested_model, user=None):
+    """요청 모델 -> 사용자 선호 모델 -> 기본 모델 순으로 사용할 모델 결정"""
+    selected_model = requested_model or (user.preferred_model if user else None) or DEFAULT_MODEL
     
-    # 1. 길이 점수 (25점 만점)
-    response_length = len(response)
-    if response_length >= 300:
-        score['length_score'] = 25
-    elif response_length >= 200:
-        score['length_score'] = 20
-    elif response_length >= 100:
-        score['length_score'] = 15
+    # 모델이 유효한지 확인
+    if selected_model not in PPLX_MODELS:
+        logging.warning(f"Invalid model {selected_model} requested, using default {DEFAULT_MODEL}")
+        selected_model = DEFAULT_MODEL
+    
+    return selected_model
+
+def build_chat_messages(user_message, response_config, history=()):
+    """시스템 메시지 + 이전 대화 기록 + 현재 질문으로 API 메시지 목록 구성"""
+    # 품질 개선된 시스템 메시지 구성
+    if response_config.get("use_search", True):
+        system_content = f"""당신은 전문적인 AI 검색 어시스턴트입니다. {response_config.get('prompt_prefix', '다음 질문에 대해 도움이 되는 답변을 제공해주세요')}.
+
+다음 품질 기준을 준수해주세요:
+1. 최소 300자 이상의 상세한 답변 제공
+2. 명확한 구조로 2-3개 섹션 구성 (예: 정의, 상세 설명, 요약/결론)
+3. 제공된 참고자료를 다양하게 활용하여 신뢰성 확보
+4. 구체적인 예시나 세부사항 포함
+5. 마크다운 포맷으로 가독성 향상 (**, ##, - 등 활용)
+
+답변은 정확하고 포괄적이며 사용자에게 실질적인 도움이 되도록 작성해주세요."""
     else:
-        score['length_score'] = 10
-    
-    # 2. 구조 점수 (25점 만점)
-    structure_indicators = [
-        '**' in response,  # 볼드 텍스트
-        '##' in response,  # 헤딩
-        '\n-' in response or '\n•' in response,  # 리스트
-        response.count('\n\n') >= 1,  # 단락 구분
-        ':' in response  # 설명 구조
-    ]
-    score['structure_score'] = min(25, sum(structure_indicators) * 5)
-    
-    # 3. 참고자료 점수 (25점 만점)
-    citation_count = len(citations) if citations else 0
-    if citation_count >= 3:
-        score['citation_score'] = 25
-    elif citation_count >= 2:
-        score['citation_score'] = 20
-    elif citation_count >= 1:
-        score['citation_score'] = 15
+        system_content = f"""당신은 친근하고 전문적인 AI 어시스턴트입니다. 사용자와 자연스럽게 대화하되, 다음을 준수해주세요:
+
+1. 충분히 상세하고 도움이 되는 답변 제공
+2. 명확하고 구조화된 형태로 답변 구성
+3. 구체적인 예시나 설명 포함
+
+사용자에게 최고 품질의 대화 경험을 제공해주세요."""
+    
+    messages = [{
+        "role": "system",
+        "content": system_content
+    }]
+    messages.extend(history)
+    
+    # 현재 사용자 메시지 추가
+    messages.append({
+        "role": "user",
+        "content": user_message
+    })
+    return messages
+
+def build_chat_payload(selected_model, messages, response_config):
+    """Perplexity chat/completions 요청 본문 구성"""
+    # 선택된 모델이 웹 검색을 지원하지 않는 경우 검색 비활성화
+    model_info = PPLX_MODELS[selected_model]
+    if not model_info["has_web_search"] and response_config.get("use_search", True):
+        logging.info(f"Model {selected_model} doesn't support web search, adjusting response")
+    
+    payload = {
+        "model": selected_model,
+        "messages": messages,
+        "temperature": 0.2,  # 일관성 향상
+        "top_p": 0.9,
+        "max_tokens": 2000,  # 충분한 답변 길이
+        "return_images": False,
+        "return_related_questions": PREFETCH_ENABLED,  # 관련 질문 선조회용
+        "stream": PPLX_STREAMING,
+        "presence_penalty": 0,
+        "frequency_penalty": 1
+    }
+    
+    # 웹 검색을 지원하는 모델의 경우에만 검색 설정 추가
+    if model_info["has_web_search"]:
+        payload["search_recency_filter"] = response_config.get("search_recency_filter", "month")
+    
+    return payload
+
+def generate_answer(user_message, question_type, response_config, selected_model, history=(), deadline=None,
+                    cancel=None, lane=None):
+    """
+    Perplexity API로 답변을 생성하고 품질 기준 미달 시 질문을 보강해 재시도
+    
+    DB에 접근하지 않으므로 배치 처리 작업 스레드에서도 호출할 수 있다
+    deadline이 있으면 호출마다 남은 시간만 쓰고, 남은 시간이 모델의 관측 응답 시간보다 짧으면
+    재시도를 건너뛰고 지금까지의 가장 좋은 답변을 degraded=True로 반환한다
+    (재시도가 요청 오류로 실패하거나 가장 좋은 답변이 조기 중단으로 잘린 경우도 degraded=True)
+    cancel(CancelToken)이 취소되면 진행 중인 호출과 남은 재시도를 멈추고 RequestCancelled를 발생시킨다
+    호출마다 lane(등급/사용자, 없으면 질문 유형과 모델로 결정)으로 업스트림 슬롯을 받고,
+    재시도가 과부하로 차단되면 지금까지의 가장 좋은 답변을 degraded=True로 반환한다
+    
+    Returns:
+        dict: response, citations, model_used, question_type, quality_score, retry_count, degraded, 출처 수 정보
+    """
+    messages = build_chat_messages(user_message, response_config, history)
+    payload = build_chat_payload(selected_model, messages, response_config)
+    if lane is None:
+        lane = upstream_lane(question_type, selected_model)
+    
+    # Perplexity API 요청
+    headers = {
+        'Authorization': f'Bearer {PERPLEXITY_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+    
+    logging.debug(f"Perplexity API 요청 (질문유형: {question_type}, 모델: {selected_model}): {payload}")
+    
+    # 품질 기준 미달 시 재시도 (최대 2회 추가)
+    retry_count = 0
+    max_retries = 2
+    degraded = False
+    
+    api_response, quality_score = request_scored_completion(
+        headers, payload, question_type, allow_early_abort=retry_count < max_retries, deadline=deadline, cancel=cancel,
+        lane=lane
+    )
+    logging.debug(f"Perplexity API 응답: {api_response}")
+    logging.info(f"답변 품질 점수: {quality_score['total_score']}/100")
+    
+    while quality_score['total_score'] < QUALITY_THRESHOLD and retry_count < max_retries:
+        # 남은 시간에 현실적인 호출 한 번이 들어가지 않으면 재시도하지 않음
+        expected = upstream_latency.estimate(selected_model)
+        if deadline is not None and not deadline.fits(expected):
+            logging.warning(f"남은 시간 {deadline.remaining():.1f}초 < 예상 응답 시간 {expected:.1f}초, 재시도 생략")
+            degraded = True
+            break
+        
+        retry_count += 1
+        logging.warning(f"품질 기준 미달 (점수: {quality_score['total_score']}), 재시도 {retry_count}/{max_retries}")
+        
+        # 질문을 더 구체적으로 재구성
+        enhanced_message = enhance_question_for_retry(user_message, question_type, retry_count)
+        messages[-1]['content'] = enhanced_message
+        
+        # 재요청 (시간 초과 시 이전 답변 사용)
+        try:
+            retry_response, retry_score = request_scored_completion(
+                headers, payload, question_type, allow_early_abort=retry_count < max_retries, deadline=deadline,
+                cancel=cancel, lane=lane
+            )
+        except UpstreamOverloaded as e:
+            logging.warning(f"재시도가 과부하로 차단됨, 이전 답변 사용: {str(e)}")
+            degraded = True
+            break
+        except (DeadlineExceeded, requests.exceptions.Timeout) as e:
+            logging.warning(f"재시도 시간 초과, 이전 답변 사용: {str(e)}")
+            degraded = True
+            break
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"재시도 요청 오류, 이전 답변 사용: {str(e)}")
+            degraded = True
+            break
+        logging.info(f"재시도 후 품질 점수: {retry_score['total_score']}/100")
+        
+        # 지금까지의 가장 좋은 답변 유지
+        if retry_score['total_score'] >= quality_score['total_score']:
+            api_response, quality_score = retry_response, retry_score
+    
+    # 마감 시간에 걸렸거나 조기 중단 후 재시도로 대체되지 못해 스트림이 잘린 답변
+    if quality_score.get('deadline_cut') or api_response.get('stream_aborted'):
+        degraded = True
+    
+    # AI 응답 추출
+    ai_content = api_response['choices'][0]['message']['content']
+    citations = api_response.get('citations', [])
+    
+    # 출처 필터링 (관련성 높은 출처만 선별)
+    total_sources = len(api_response.get('citations', []))
+    max_sources = response_config.get("max_sources", 4)
+    if len(citations) > max_sources:
+        citations = citations[:max_sources]
+    
+    return {
+        'response': ai_content,
+        'citations': citations,
+        'question_type': question_type,
+        'model_used': selected_model,
+        'quality_score': quality_score,
+        'retry_count': retry_count,
+        'degraded': degraded,
+        'total_sources': total_sources,
+        'max_sources': max_sources,
+        'related_questions': api_response.get('related_questions') or []
+    }
+
+def answer_fields(answer):
+    """generate_answer() 결과를 채팅 API 응답 필드로 변환"""
+    fields = {
+        'response': answer['response'],
+        'citations': answer['citations'],
+        'question_type': answer['question_type'],
+        'model_used': answer['model_used'],
+        'quality_score': answer['quality_score'],
+        'retry_count': answer['retry_count'],
+        'degraded': answer.get('degraded', False),
+        'source_filtering': {
+            'total_sources': answer['total_sources'],
+            'filtered_sources': len(answer['citations']),
+            'filtered_count': max(0, answer['total_sources'] - len(answer['citations'])),
+            'filter_description': f"관련성 기반 필터링 (최대 {answer['max_sources']}개 소스)"
+        }
+    }
+    if answer.get('related_questions'):
+        fields['related_questions'] = answer['related_questions']
+    return fields
+
+def prefetch_answer(question, search_scope, selected_model):
+    """관련 질문 선조회용 답변 생성 (대화 기록 없이 단독 질문으로 처리, DB 접근 없음)"""
+    question_type = classify_question(question)
+    response_config = get_response_config(question_type, search_scope)
+    if not response_config.get("use_search", True):
+        raise ValueError('검색이 필요 없는 질문은 선조회하지 않습니다.')
+    return generate_answer(question, question_type, response_config, selected_model,
+                           lane=upstream_lane(question_type, selected_model, background='prefetch'))
+
+# 관련 질문 선조회 (PREFETCH_ENABLED=true일 때만 사용)
+prefetcher = Prefetcher(prefetch_answer)
+
+@app.route('/api/chat/<request_id>/cancel', methods=['POST'])
+def cancel_chat(request_id):
+    """진행 중인 채팅 요청 취소 (요청 시 보낸 request_id, 다른 워커에서 처리 중이어도 전달됨)
+    
+    추측할 수 없는 request_id 자체로 취소하므로 사용자를 조회하지 않는다
+    (첫 채팅 도중에는 새 사용자의 세션 쿠키가 아직 브라우저에 없어도 취소됨)
+    """
+    try:
+        if not valid_request_id(request_id):
+            return jsonify({'error': '잘못된 요청 ID입니다.'}), 400
+        
+        request_cancel(request_id)
+        return jsonify({'success': True, 'request_id': request_id})
+        
+    except Exception as e:
+        logging.error(f"채팅 취소 실패: {e}")
+        return jsonify({'error': '요청을 취소할 수 없습니다.'}), 500
+
+def record_cancelled_turn(conversation, user_id, user_message, question_type, search_scope, processing_time,
+                          content='응답이 취소되었습니다.'):
+    """답변하지 못한(취소/과부하 차단) 질문 뒤에 표시 메시지를 남김 (답변 없는 질문이 대화 기록에 끼지 않도록)"""
+    db.session.add(Message(
+        conversation_id=conversation.id,
+        user_id=user_id,
+        content=content,
+        message_type='cancelled',
+        question_type=question_type,
+        search_scope=search_scope,
+        processing_time=processing_time
+    ))
+    conversation.updated_at = datetime.utcnow()
+    if not conversation.title:
+        conversation.title = user_message[:50] + ('...' if len(user_message) > 50 else '')
+    db.session.commit()
+
+def drop_cancelled_turns(messages):
+    """취소된 턴(질문 + 취소 표시)을 업스트림에 보낼 대화 기록에서 제외"""
+    kept = []
+    for message in messages:
+        if message.message_type == 'cancelled':
+            if kept and kept[-1].message_type == 'user':
+                kept.pop()
+            continue
+        kept.append(message)
+    return kept
+
+@app.route('/api/prefetch/stats', methods=['GET'])
+def get_prefetch_stats():
+    """관련 질문 선조회 통계 (현재 워커 기준 적중률 등)"""
+    return jsonify(prefetcher.snapshot())
+
+def overloaded_response(error):
+    """업스트림 과부하 응답 (시간 초과까지 기다리게 하지 않고 바로 503 + Retry-After)"""
+    response = jsonify({'error': '요청이 많아 잠시 후 다시 시도해주세요.', 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+@app.route('/api/upstream/stats', methods=['GET'])
+def get_upstream_stats():
+    """업스트림 대기열 통계 (등급별 대기/실행 수, 최근 대기 시간, 차단 수 - 호스트의 모든 워커 합산)"""
+    return jsonify(upstream_scheduler.snapshot())
+
+def answer_batch_item(item, cancel=None, user_id=None):
+    """일괄 처리 항목 하나에 대해 분류 -> 응답 설정 -> 업스트림 -> 품질 평가 실행 (DB 접근 없음)"""
+    user_message = item['message']
+    if not user_message:
+        raise ValueError('메시지를 입력해주세요.')
+    
+    start_time = time.time()
+    question_type = classify_question(user_message)
+    response_config = get_response_config(question_type, item['search_scope'])
+    
+    # 인사말의 경우 검색 없이 직접 응답
+    if not response_config.get("use_search", True):
+        result = {
+            'response': response_config["response"],
+            'citations': [],
+            'question_type': question_type,
+            'model_used': 'direct_response'
+        }
     else:
-        score['citation_score'] = 5 if question_type == 'greeting' else 0
-    
-    # 4. 콘텐츠 품질 점수 (25점 만점)
-    content_indicators = [
-        '예시' in response or '예를 들어' in response,  # 예시 포함
-        '요약' in response or '결론' in response,  # 결론 포함
-        len(response.split('.')) >= 3,  # 충분한 문장 수
-        any(keyword in response for keyword in ['정의', '의미', '특징', '방법', '종류']),  # 체계적 설명
-        response.count('다음') >= 1 or response.count('이러한') >= 1  # 연결성
-    ]
-    score['content_score'] = min(25, sum(content_indicators) * 5)
-    
-    # 총점 계산
-    score['total_score'] = sum([
-        score['length_score'],
-        score['structure_score'], 
-        score['citation_score'],
-        score['content_score']
-    ])
-    
-    return score
+        selected_model = resolve_model(item['selected_model'])
+        answer = generate_answer(user_message, question_type, response_config, selected_model,
+                                 deadline=deadline_for(question_type), cancel=cancel,
+                                 lane=upstream_lane(question_type, selected_model, user_id, background='batch'))
+        result = answer_fields(answer)
+    
+    result['processing_time'] = time.time() - start_time
+    return result
+
+def persist_batch_result(user_id, item, result):
+    """일괄 처리 결과를 새 대화(질문 + 답변)로 저장"""
+    user_message = item['message']
+    conversation = Conversation(
+        user_id=user_id,
+        title=user_message[:50] + ('...' if len(user_message) > 50 else ''),
+        is_active=False
+    )
+    db.session.add(conversation)
+    db.session.flush()
+    
+    user_message_obj = Message(
+        conversation_id=conversation.id,
+        user_id=user_id,
+        content=user_message,
+        message_type='user',
+        question_type=result['question_type'],
+        search_scope=item['search_scope']
+    )
+    db.session.add(user_message_obj)
+    ai_message_obj = Message(
+        conversation_id=conversation.id,
+        user_id=user_id,
+        content=result['response'],
+        message_type='assistant',
+        question_type=result['question_type'],
+        citations=result['citations'],
+        search_scope=item['search_scope'],
+        processing_time=result['processing_time']
+    )
+    db.session.add(ai_message_obj)
+    
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    store_message_citations(ai_message_obj.id, result['citations'])
+    index_message(user_message_obj)
+    return {'conversation_id': conversation.id}
+
+def describe_batch_error(error):
+    """일괄 처리 항목 오류를 채팅 API와 같은 사용자용 메시지로 변환"""
+    if isinstance(error, ValueError):
+        return str(error)
+    if isinstance(error, RequestCancelled):
+        return '요청이 취소되었습니다.'
+    if isinstance(error, UpstreamOverloaded):
+        return '요청이 많아 잠시 후 다시 시도해주세요.'
+    if isinstance(error, (DeadlineExceeded, requests.exceptions.Timeout)):
+        logging.error(f"응답 시간 초과: {str(error)}")
+        return '응답 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.'
+    if isinstance(error, requests.exceptions.RequestException):
+        logging.error(f"API 요청 오류: {str(error)}")
+        return 'API 요청 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.'
+    if isinstance(error, KeyError):
+        logging.error(f"API 응답 파싱 오류: {str(error)}")
+        return 'API 응답을 처리하는 중 오류가 발생했습니다.'
+    logging.error(f"예상치 못한 오류: {str(error)}")
+    return '서버 오류가 발생했습니다. 잠시 후 다시 시도해주세요.'
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """여러 질문을 동시 실행 수 제한 하에 처리하고 완료 순서대로 NDJSON으로 스트리밍
+    
+    요청: {"items": [{"id", "message", "selected_model", "search_scope"}, ...],
+           "concurrency": 4, "persist": false, "request_id": "취소용 ID (선택)"}
+    
+    클라이언트가 스트림을 끊거나 request_id로 취소하면 실행 중인 항목의 업스트림 호출과 재시도도 멈춘다
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        items = normalize_items(data.get('items'))
+        concurrency = clamp_concurrency(data.get('concurrency'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        user = get_or_create_user()
+        for item in items:
+            item['selected_model'] = resolve_model(item['selected_model'], user)
+        
+        # 저장은 응답을 만드는 요청 스레드에서 처리 (작업 스레드는 DB 미사용)
+        user_id = user.id
+        on_result = None
+        if data.get('persist'):
+            on_result = lambda item, result: persist_batch_result(user_id, item, result)
+        
+        cancel = start_request(data.get('request_id'))
+        records = iter_batch_results(items, lambda item: answer_batch_item(item, cancel, user_id),
+                                     concurrency, on_result, describe_batch_error)
+        
+        def stream_records():
+            completed = False
+            try:
+                for record in records:
+                    yield app.json.dumps_bytes(record) + b"\n"
+                completed = True
+            finally:
+                # 끝까지 보내기 전에 스트림이 닫히면 (연결 끊김) 작업 스레드의 업스트림 호출도 중단
+                if not completed:
+                    cancel.cancel('client_disconnect')
+                records.close()
+                finish_request(cancel)
+        
+        return Response(
+            stream_with_context(stream_records()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        logging.error(f"일괄 처리 오류: {str(e)}")
+        return jsonify({'error': '일괄 처리 중 오류가 발생했습니다.'}), 500
+
+def request_scored_completion(headers, payload, question_type, allow_early_abort=False, deadline=None, cancel=None,
+                              lane=None):
+    """
+    Perplexity API를 호출하고 답변 품질 점수와 함께 반환
+    
+    스트리밍 모드에서는 청크가 도착할 때마다 증분 채점하고, allow_early_abort가 True이면
+    최종 점수가 기준 미달로 예측되는 즉시 스트림을 끊어 재시도가 바로 시작되게 한다
+    (deadline이 있으면 재시도할 시간이 남아 있을 때만 끊고, 마감 시간이 지나면 받은 데까지 사용)
+    cancel이 취소되면 호출하지 않거나 스트림을 끊고 RequestCancelled를 발생시킨다
+    호출 전에 업스트림 스케줄러에서 lane의 슬롯을 받고(대기 중에도 취소 확인), 기다린 시간은
+    응답 시간 통계에서 뺀다 (슬롯을 받지 못하면 UpstreamOverloaded)
+    
+    Returns:
+        tuple: (API 응답 dict, 품질 점수 dict)
+    """
+    if cancel is not None:
+        cancel.check()
+    scorer = IncrementalQualityScorer(question_type)
+    model = payload["model"]
+    if lane is None:
+        lane = upstream_lane(question_type, model)
+    retry_estimate = upstream_latency.estimate(model)
+    deadline_cut = []
+    
+    def on_chunk(piece, citations):
+        scorer.feed(piece)
+        if cancel is not None and cancel.cancelled:
+            return False
+        if deadline is not None and deadline.expired:
+            deadline_cut.append(True)
+            return False
+        # 재시도할 시간이 없으면 기준 미달 예측이어도 끝까지 받음
+        if deadline is not None and not deadline.fits(retry_estimate):
+            return True
+        return not (allow_early_abort and scorer.predicts_low(QUALITY_THRESHOLD, citations))
+    
+    # 슬롯 임대 시간은 남은 마감 시간 (대기한 만큼 호출 타임아웃이 줄어듦)
+    with upstream_scheduler.slot(lane, deadline.remaining() if deadline is not None else 30, cancel):
+        timeout = deadline.call_timeout() if deadline is not None else 30
+        started = time.monotonic()
+        try:
+            api_response = request_chat_completion(PERPLEXITY_API_URL, headers, payload, timeout=timeout,
+                                                   on_chunk=on_chunk)
+        except requests.exceptions.RequestException as e:
+            record_upstream(payload, time.monotonic() - started, error=e)
+            raise
+        elapsed = time.monotonic() - started
+    record_upstream(payload, elapsed, api_response)
+    if cancel is not None:
+        cancel.check()
+    if not api_response.get('stream_aborted'):
+        upstream_latency.record(model, elapsed)
+    
+    if not payload.get("stream"):
+        scorer.feed(api_response['choices'][0]['message']['content'])
+    
+    quality_score = scorer.score(api_response.get('citations', []))
+    if deadline_cut:
+        logging.warning(f"마감 시간 도달로 스트림 중단 ({scorer.length}자 수신 후)")
+        quality_score['deadline_cut'] = True
+    elif api_response.get('stream_aborted'):
+        logging.info(f"스트리밍 중 품질 기준 미달 예측 ({scorer.length}자 수신 후 중단)")
+        # 중단된 답변은 재시도 대상이 되도록 기준 미달 점수로 처리
+        quality_score['total_score'] = min(quality_score['total_score'], QUALITY_THRESHOLD - 1)
+        quality_score['early_aborted'] = True
+    
+    return api_response, quality_score
+
+def evaluate_response_quality(response, citations, question_type):
+    """답변 품질을 평가하는 함수 (증분 채점기로 한 번에 채점)"""
+    return IncrementalQualityScorer(question_type).feed(response).score(citations)
 
 def enhance_question_for_retry(original_question, question_type, retry_count):
     """재시도를 위해 질문을 더 구체적으로 개선"""
@@ -787,35 +1335,14 @@ def enhance_question_for_retry(original_question, question_type, retry_count):
 def get_current_conversation():
     """현재 대화의 메시지 기록 반환"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         conversation_id = session.get('conversation_id')
         
         if not conversation_id:
             return jsonify({'conversation': []})
         
-        # 현재 대화의 메시지들 가져오기
-        messages = Message.query.filter_by(
-            conversation_id=conversation_id
-        ).order_by(Message.created_at).all()
-        
-        # 세션 형태로 변환
-        conversation_data = []
-        for msg in messages:
-            message_data = {
-                'type': msg.message_type,
-                'content': msg.content,
-                'timestamp': msg.created_at.isoformat(),
-                'question_type': msg.question_type
-            }
-            
-            if msg.message_type == 'assistant' and msg.citations:
-                message_data['citations'] = msg.citations
-                
-            if msg.message_type == 'user':
-                # 사용자 이름은 현재 사용자 설정에서 가져오기
-                message_data['user_name'] = user.name
-                
-            conversation_data.append(message_data)
+        # 현재 대화의 메시지들 가져오기 (세션 형태로 변환)
+        conversation_data = history_entries(conversation_id, user.name)
         
         return jsonify({'conversation': conversation_data})
         
@@ -827,7 +1354,7 @@ def get_current_conversation():
 def clear_conversation():
     """현재 대화 종료 및 새 대화 시작"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         conversation_id = session.get('conversation_id')
         
         if conversation_id:
@@ -876,17 +1403,20 @@ def save_settings():
         return jsonify({'error': '설정 저장 중 오류가 발생했습니다.'}), 500
 
 @app.route('/api/settings', methods=['GET'])
+@replica_read
 def get_settings():
     """사용자 설정 조회"""
     try:
-        user = get_or_create_user()
-        settings = {
-            'user_name': user.name,
-            'search_scope': user.search_scope,
-            'theme': user.theme,
-            'preferred_model': user.preferred_model
-        }
-        return jsonify(settings)
+        user = get_current_user()
+        settings = user_settings(user)
+        
+        # 설정 값 자체로 버전을 판단 (updated_at은 활동 시각 갱신 때마다 바뀜)
+        etag = make_etag('settings', user.id, *settings.values())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        return set_validators(jsonify(settings), etag)
     except Exception as e:
         logging.error(f"설정 조회 오류: {str(e)}")
         return jsonify({
@@ -897,10 +1427,11 @@ def get_settings():
         })
 
 @app.route('/api/conversation/<conversation_id>', methods=['GET'])
+@replica_read
 def get_specific_conversation(conversation_id):
     """특정 대화의 메시지 기록 반환"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         
         # 대화 소유권 확인
         conversation = Conversation.query.filter_by(
@@ -909,43 +1440,50 @@ def get_specific_conversation(conversation_id):
         ).first()
         
         if not conversation:
-            return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
-        
-        # 대화의 메시지들 가져오기
-        messages = Message.query.filter_by(
-            conversation_id=conversation_id
-        ).order_by(Message.created_at).all()
+            # 보관된 대화는 읽기 전용으로 반환 (현재 대화로 설정하지 않음)
+            archived = find_archived_conversation(conversation_id, user.id)
+            if not archived:
+                return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
+            
+            etag = make_etag('archived_conversation_messages', archived.id, archived.archived_at, user.name)
+            cached = not_modified(etag, archived.archived_at)
+            if cached:
+                return cached
+            
+            return set_validators(jsonify({
+                'conversation': archived_history_entries(archived, user.name),
+                'conversation_info': {
+                    'id': archived.id,
+                    'title': archived.title,
+                    'created_at': archived.created_at,
+                    'updated_at': archived.updated_at,
+                    'is_archived': True
+                }
+            }), etag, archived.archived_at)
         
         # 세션에 현재 대화 ID 설정
         session['conversation_id'] = conversation_id
         
-        # 메시지 데이터 변환
-        conversation_data = []
-        for msg in messages:
-            message_data = {
-                'type': msg.message_type,
-                'content': msg.content,
-                'timestamp': msg.created_at.isoformat(),
-                'question_type': msg.question_type
-            }
-            
-            if msg.message_type == 'assistant' and msg.citations:
-                message_data['citations'] = msg.citations
-                
-            if msg.message_type == 'user':
-                message_data['user_name'] = user.name
-                
-            conversation_data.append(message_data)
+        # 변경 여부 확인 (수정 시각, 메시지 수, 사용자 이름)
+        message_count = Message.query.filter_by(conversation_id=conversation_id).count()
+        etag = make_etag('conversation_messages', conversation.id, conversation.updated_at,
+                         message_count, user.name)
+        cached = not_modified(etag, conversation.updated_at)
+        if cached:
+            return cached
         
-        return jsonify({
+        # 대화의 메시지 기록 변환
+        conversation_data = history_entries(conversation_id, user.name)
+        
+        return set_validators(jsonify({
             'conversation': conversation_data,
             'conversation_info': {
                 'id': conversation.id,
                 'title': conversation.title,
-                'created_at': conversation.created_at.isoformat(),
-                'updated_at': conversation.updated_at.isoformat()
+                'created_at': conversation.created_at,
+                'updated_at': conversation.updated_at
             }
-        })
+        }), etag, conversation.updated_at)
         
     except Exception as e:
         logging.error(f"특정 대화 조회 오류: {str(e)}")
@@ -955,7 +1493,7 @@ def get_specific_conversation(conversation_id):
 def delete_specific_conversation(conversation_id):
     """특정 대화 삭제"""
     try:
-        user = get_or_create_user()
+        user = get_current_user()
         
         # 대화 소유권 확인
         conversation = Conversation.query.filter_by(
@@ -964,9 +1502,13 @@ def delete_specific_conversation(conversation_id):
         ).first()
         
         if not conversation:
-            return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
+            conversation = find_archived_conversation(conversation_id, user.id)
+            if not conversation:
+                return jsonify({'error': '대화를 찾을 수 없습니다.'}), 404
         
         # 대화와 관련 메시지 모두 삭제 (CASCADE로 자동 삭제됨)
+        detach_conversations([conversation_id])
+        forget_conversations([conversation_id])
         db.session.delete(conversation)
         db.session.commit()
         
@@ -980,25 +1522,66 @@ def delete_specific_conversation(conversation_id):
         logging.error(f"대화 삭제 오류: {str(e)}")
         return jsonify({'error': '대화 삭제 중 오류가 발생했습니다.'}), 500
 
+@app.route('/api/archive/conversations', methods=['GET'])
+def get_archived_conversations():
+    """보관된 대화 목록 조회 (압축된 메시지는 읽지 않음)"""
+    try:
+        user = get_current_user()
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        
+        stmt = db.select(
+            ArchivedConversation.id,
+            ArchivedConversation.title,
+            ArchivedConversation.created_at,
+            ArchivedConversation.updated_at,
+            ArchivedConversation.is_favorite,
+            ArchivedConversation.message_count,
+            ArchivedConversation.archived_at
+        ).where(ArchivedConversation.user_id == user.id).order_by(ArchivedConversation.updated_at.desc())
+        
+        conversations_list, pagination = paginate_rows(stmt, page, per_page)
+        
+        return jsonify({
+            'success': True,
+            'conversations': conversations_list,
+            'pagination': pagination
+        })
+        
+    except Exception as e:
+        logging.error(f"보관 대화 목록 조회 실패: {e}")
+        return jsonify({'success': False, 'error': '보관된 대화 목록을 불러올 수 없습니다.'}), 500
+
+@app.route('/api/export', methods=['GET'])
+def export_history():
+    """현재 사용자의 전체 대화 기록을 NDJSON으로 스트리밍"""
+    try:
+        user = get_current_user()
+        filename = f"pplx-history-{datetime.utcnow():%Y%m%d}.ndjson"
+        
+        return Response(
+            stream_with_context(iter_export_lines([user.id])),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+        
+    except Exception as e:
+        logging.error(f"기록 내보내기 오류: {str(e)}")
+        return jsonify({'error': '기록 내보내기 중 오류가 발생했습니다.'}), 500
+
 @app.route('/api/models', methods=['GET'])
 def get_available_models():
     """사용 가능한 PPLX 모델 목록 반환"""
     try:
-        models_info = []
-        for model_id, model_data in PPLX_MODELS.items():
-            models_info.append({
-                'id': model_id,
-                'name': model_data['name'],
-                'description': model_data['description'],
-                'has_web_search': model_data['has_web_search'],
-                'recommended_for': model_data['recommended_for'],
-                'icon': model_data['icon']
-            })
+        # 모델 목록은 배포 단위로만 바뀌므로 장기 캐시
+        cached = not_modified(MODELS_ETAG, cache_control=PUBLIC_LONG_LIVED)
+        if cached:
+            return cached
         
-        return jsonify({
-            'models': models_info,
+        return set_validators(jsonify({
+            'models': MODELS_INFO,
             'default_model': DEFAULT_MODEL
-        })
+        }), MODELS_ETAG, cache_control=PUBLIC_LONG_LIVED)
     except Exception as e:
         logging.error(f"모델 목록 조회 오류: {str(e)}")
         return jsonify({'error': '모델 목록을 가져올 수 없습니다.'}), 500
@@ -1037,9 +1620,21 @@ def recommend_model():
         logging.error(f"모델 추천 오류: {str(e)}")
         return jsonify({'error': '모델 추천 중 오류가 발생했습니다.'}), 500
 
-# 데이터베이스 테이블 생성
-with app.app_context():
-    db.create_all()
+# 일괄 질문 처리 명령 (flask chat-batch) - 처리 함수가 위에서 정의된 뒤 등록
+register_batch_commands(app, answer_batch_item, persist_batch_result, describe_batch_error)
+
+startup_timer.mark("routes")
+
+# 데이터베이스 테이블 생성은 `flask init-db`로 분리 (import 시 DB 왕복 없음)
+if SCHEMA_AUTO_CREATE:
+    ensure_schema(app)
+    startup_timer.mark("schema")
+
+# 규칙 테이블 예열 (gunicorn --preload면 마스터에서 한 번만 실행됨)
+warm_rule_tables()
+startup_timer.mark("rule_warmup")
+startup_timer.log("앱 로드")
 
 if __name__ == '__main__':
+    ensure_schema(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,196 @@
+"""
+비활성 대화 보관(핫/콜드 분리)
+정책 기간이 지난 대화와 종료(비활성)된 대화를 archived_conversations 테이블로 옮겨
+conversations/messages 테이블과 인덱스가 끝없이 커지지 않게 한다
+배치마다 별도 트랜잭션으로 처리하므로 중간에 멈춰도 다시 실행하면 이어서 진행된다
+"""
+
+import logging
+import os
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import delete, func, insert, or_, and_, select, update
+
+from models import db, Conversation, Message, MessageCitation, UserSession, ArchivedConversation
+from keyword_index import forget_conversations
+
+# 보관 정책 (일 단위)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_INACTIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_INACTIVE_AFTER_DAYS", "7"))
+
+ARCHIVE_BATCH_SIZE = 200
+COMPRESSION_LEVEL = 6
+
+_MESSAGE_COLUMNS = [column for column in Message.__table__.columns if column.name != 'conversation_id']
+_DATETIME_FIELDS = {column.name for column in _MESSAGE_COLUMNS if isinstance(column.type, db.DateTime)}
+
+
+def archive_criteria(now: Optional[datetime] = None,
+                     older_than_days: int = ARCHIVE_AFTER_DAYS,
+                     inactive_after_days: int = ARCHIVE_INACTIVE_AFTER_DAYS) -> List[Any]:
+    """보관 대상 조건: 즐겨찾기가 아니고, 오래됐거나 종료된 지 일정 기간이 지난 대화"""
+    now = now or datetime.utcnow()
+    return [
+        Conversation.is_favorite.is_(False),
+        or_(
+            Conversation.updated_at < now - timedelta(days=older_than_days),
+            and_(
+                Conversation.is_active.is_(False),
+                Conversation.updated_at < now - timedelta(days=inactive_after_days)
+            )
+        )
+    ]
+
+
+def compress_messages(messages: List[Dict[str, Any]]) -> bytes:
+    """메시지 dict 목록을 압축된 JSON 바이트로 변환"""
+    return zlib.compress(current_app.json.dumps_bytes(messages), COMPRESSION_LEVEL)
+
+
+def decompress_messages(blob: bytes) -> List[Dict[str, Any]]:
+    """압축된 메시지 묶음을 dict 목록으로 복원 (날짜 필드는 datetime으로 변환)"""
+    messages = current_app.json.loads(zlib.decompress(blob))
+    for message in messages:
+        for field in _DATETIME_FIELDS:
+            if isinstance(message.get(field), str):
+                message[field] = datetime.fromisoformat(message[field])
+    return messages
+
+
+def archive_batch(criteria: List[Any], batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """대상 대화 한 배치를 보관 테이블로 이동하고 이동한 개수 반환"""
+    conversations = db.session.execute(
+        select(Conversation.id, Conversation.user_id, Conversation.title, Conversation.created_at,
+               Conversation.updated_at, Conversation.is_favorite)
+        .where(*criteria)
+        .order_by(Conversation.updated_at, Conversation.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).mappings().all()
+
+    if not conversations:
+        db.session.rollback()
+        return 0
+
+    ids = [row['id'] for row in conversations]
+    grouped: Dict[str, List[Dict[str, Any]]] = {conversation_id: [] for conversation_id in ids}
+    message_rows = db.session.execute(
+        select(Message.conversation_id, *_MESSAGE_COLUMNS)
+        .where(Message.conversation_id.in_(ids))
+        .order_by(Message.conversation_id, Message.created_at)
+    ).mappings()
+    for row in message_rows:
+        message = dict(row)
+        grouped[message.pop('conversation_id')].append(message)
+
+    archived_at = datetime.utcnow()
+    db.session.execute(insert(ArchivedConversation.__table__), [
+        {
+            **row,
+            'message_count': len(grouped[row['id']]),
+            'messages_blob': compress_messages(grouped[row['id']]),
+            'archived_at': archived_at
+        }
+        for row in conversations
+    ])
+
+    # 세션이 가리키던 대화 참조를 끊고 핫 테이블에서 삭제
+    db.session.execute(
+        update(UserSession).where(UserSession.current_conversation_id.in_(ids)).values(current_conversation_id=None)
+    )
+    db.session.execute(delete(MessageCitation).where(
+        MessageCitation.message_id.in_(select(Message.id).where(Message.conversation_id.in_(ids)))
+    ))
+    db.session.execute(delete(Message).where(Message.conversation_id.in_(ids)))
+    forget_conversations(ids)
+    db.session.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+    db.session.commit()
+
+    return len(ids)
+
+
+def run_archiver(older_than_days: int = ARCHIVE_AFTER_DAYS,
+                 inactive_after_days: int = ARCHIVE_INACTIVE_AFTER_DAYS,
+                 batch_size: int = ARCHIVE_BATCH_SIZE,
+                 sleep_seconds: float = 0.5,
+                 max_batches: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """보관 작업 실행 (배치 사이에 sleep_seconds만큼 쉬어 운영 DB 부하를 제한)
+
+    Returns:
+        int: 보관한 대화 수
+    """
+    criteria = archive_criteria(None, older_than_days, inactive_after_days)
+    remaining = db.session.execute(select(func.count(Conversation.id)).where(*criteria)).scalar_one()
+    db.session.commit()
+
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(criteria, batch_size)
+        if moved == 0:
+            break
+        archived += moved
+        batches += 1
+        if progress is not None:
+            progress(archived, remaining)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return archived
+
+
+def find_archived_conversation(conversation_id: str, user_id: str) -> Optional[ArchivedConversation]:
+    """사용자의 보관된 대화 조회"""
+    return ArchivedConversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+
+
+def archived_message_dicts(archived: ArchivedConversation) -> List[Dict[str, Any]]:
+    """보관된 대화의 메시지 목록 (Message.to_dict()와 같은 키)"""
+    messages = decompress_messages(archived.messages_blob)
+    for message in messages:
+        message['conversation_id'] = archived.id
+    return messages
+
+
+def archived_history_entries(archived: ArchivedConversation, user_name: str) -> List[Dict[str, Any]]:
+    """보관된 대화의 채팅 화면 복원용 기록"""
+    entries = []
+    for message in decompress_messages(archived.messages_blob):
+        entry = {
+            'type': message['message_type'],
+            'content': message['content'],
+            'timestamp': message['created_at'],
+            'question_type': message['question_type']
+        }
+        if message['message_type'] == 'assistant' and message.get('citations'):
+            entry['citations'] = message['citations']
+        if message['message_type'] == 'user':
+            entry['user_name'] = user_name
+        entries.append(entry)
+    return entries
+
+
+def register_archive_commands(app: Flask):
+    """flask archive-conversations 명령 등록"""
+
+    @app.cli.command("archive-conversations")
+    @click.option("--older-than-days", default=ARCHIVE_AFTER_DAYS, show_default=True, help="마지막 수정 후 보관까지의 기간")
+    @click.option("--inactive-after-days", default=ARCHIVE_INACTIVE_AFTER_DAYS, show_default=True, help="종료된 대화의 보관 유예 기간")
+    @click.option("--batch-size", default=ARCHIVE_BATCH_SIZE, show_default=True)
+    @click.option("--sleep", "sleep_seconds", default=0.5, show_default=True, help="배치 사이 대기 시간(초)")
+    @click.option("--max-batches", default=None, type=int, help="이번 실행에서 처리할 최대 배치 수")
+    def archive_conversations(older_than_days, inactive_after_days, batch_size, sleep_seconds, max_batches):
+        """오래된/종료된 대화를 보관 테이블로 이동"""
+        def progress(done, total):
+            click.echo(f"보관 진행: {done}/{total}", err=True)
+
+        archived = run_archiver(older_than_days, inactive_after_days, batch_size,
+                                sleep_seconds, max_batches, progress)
+        logging.info(f"대화 보관 완료: {archived}건")
+        click.echo(f"보관 완료: {archived}건", err=True)
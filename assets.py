@@ -0,0 +1,404 @@
+"""
+정적 자산 빌드/서빙
+script.js, style.css를 축소(minify)하고 내용 해시를 파일명에 넣어 static/dist에 저장하고,
+미리 압축한 .gz/.br 파일과 manifest.json을 함께 만든다
+템플릿은 asset_url()로 해시된 경로를 받고, /assets/<파일> 경로는 Accept-Encoding에 맞는
+사전 압축 파일을 immutable 캐시 헤더와 함께 내려준다
+
+빌드: python -m assets  (또는 flask build-assets)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from typing import Any, Dict, Optional, Sequence
+
+from flask import abort, request, send_from_directory, url_for
+from flask.sessions import SessionInterface
+
+try:
+    import brotli
+except ImportError:  # brotli는 선택 의존성 (.br 파일 생략)
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # 없으면 내장 축소기 사용
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+ASSET_SOURCES = ("script.js", "style.css")
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_LENGTH = 12
+
+# 해시된 파일명은 내용이 바뀌면 이름도 바뀌므로 1년 + immutable
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 정규식 리터럴이 올 수 있는 직전 토큰
+_REGEX_PRECEDING_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_PRECEDING_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw"}
+_WORD_CHARS = re.compile(r"[\w$]")
+
+
+def _skip_quoted(source: str, start: int, quote: str) -> int:
+    """문자열/템플릿 리터럴 끝 다음 위치 반환 (이스케이프, 템플릿의 ${...} 중첩 처리)"""
+    i = start + 1
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if quote == "`" and c == "$" and source.startswith("{", i + 1):
+            i = _skip_template_expression(source, i + 2)
+            continue
+        if quote != "`" and c == "\n":  # 닫히지 않은 문자열
+            return i
+        i += 1
+    return n
+
+
+def _skip_template_expression(source: str, start: int) -> int:
+    """템플릿 리터럴 ${ 다음부터 짝이 맞는 } 다음 위치 반환
+
+    안쪽의 중괄호 깊이를 세고 문자열/중첩 템플릿/주석은 건너뛴다
+    (식 안의 정규식 리터럴은 구분하지 않음)
+    """
+    i = start
+    n = len(source)
+    depth = 0
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ""
+        if c in "\"'`":
+            i = _skip_quoted(source, i, c)
+            continue
+        if c == "/" and nxt == "/":
+            end = source.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if c == "/" and nxt == "*":
+            end = source.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    return n
+
+
+def _skip_regex(source: str, start: int) -> int:
+    """정규식 리터럴 끝(플래그 포함) 다음 위치 반환"""
+    i = start + 1
+    n = len(source)
+    in_class = False
+    while i < n:
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < n and _WORD_CHARS.match(source[i]):
+                i += 1
+            return i
+        elif c == "\n":
+            return i
+        i += 1
+    return n
+
+
+def _builtin_minify_js(source: str) -> str:
+    """보수적인 JS 축소: 주석 제거, 공백 축약 (줄바꿈은 ASI 때문에 유지)
+
+    문자열/템플릿/정규식 리터럴 내부는 그대로 둔다
+    """
+    out = []
+    i = 0
+    n = len(source)
+    last_char = ""  # 마지막으로 출력한 공백이 아닌 문자
+    last_word = ""
+
+    def emit_space(has_newline: bool, next_char: str):
+        if not out:
+            return
+        prev = out[-1][-1]
+        if has_newline:
+            if prev != "\n":
+                out.append("\n")
+        elif prev not in " \n" and (
+                (_WORD_CHARS.match(prev) and _WORD_CHARS.match(next_char))
+                or (prev in "+-" and next_char in "+-")):
+            out.append(" ")
+
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ""
+
+        if c in " \t\r\n" or (c == "/" and nxt in "/*"):
+            # 공백과 주석을 하나로 묶어 처리
+            has_newline = False
+            while i < n:
+                c = source[i]
+                nxt = source[i + 1] if i + 1 < n else ""
+                if c in " \t\r\n":
+                    has_newline = has_newline or c == "\n"
+                    i += 1
+                elif c == "/" and nxt == "/":
+                    end = source.find("\n", i)
+                    i = n if end == -1 else end
+                elif c == "/" and nxt == "*":
+                    end = source.find("*/", i + 2)
+                    end = n if end == -1 else end + 2
+                    has_newline = has_newline or "\n" in source[i:end]
+                    i = end
+                else:
+                    break
+            if i < n:
+                emit_space(has_newline, source[i])
+            continue
+
+        if c in "\"'`":
+            end = _skip_quoted(source, i, c)
+            out.append(source[i:end])
+            i = end
+            last_char, last_word = c, ""
+            continue
+
+        if c == "/" and (last_char in _REGEX_PRECEDING_CHARS or last_char == "" or last_word in _REGEX_PRECEDING_WORDS):
+            end = _skip_regex(source, i)
+            out.append(source[i:end])
+            i = end
+            last_char, last_word = "/", ""
+            continue
+
+        if _WORD_CHARS.match(c):
+            start = i
+            while i < n and _WORD_CHARS.match(source[i]):
+                i += 1
+            last_word = source[start:i]
+            out.append(last_word)
+            last_char = last_word[-1]
+            continue
+
+        out.append(c)
+        last_char, last_word = c, ""
+        i += 1
+
+    return "".join(out).strip() + "\n"
+
+
+def _builtin_minify_css(source: str) -> str:
+    """CSS 축소: 주석 제거, 공백 축약, 구분자 주변 공백과 마지막 세미콜론 제거"""
+    parts = re.split(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", source)
+    out = []
+    for index, part in enumerate(parts):
+        if index % 2:  # 문자열 리터럴
+            out.append(part)
+            continue
+        part = re.sub(r"/\*.*?\*/", "", part, flags=re.S)
+        part = re.sub(r"\s+", " ", part)
+        part = re.sub(r"\s*([{};,])\s*", r"\1", part)
+        part = re.sub(r":\s+", ":", part)
+        part = part.replace(";}", "}")
+        out.append(part)
+    return "".join(out).strip() + "\n"
+
+
+def minify_js(source: str) -> str:
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return _builtin_minify_js(source)
+
+
+def minify_css(source: str) -> str:
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    return _builtin_minify_css(source)
+
+
+MINIFIERS = {".js": minify_js, ".css": minify_css}
+
+
+def _write(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def build_assets(static_folder: str, sources: Sequence[str] = ASSET_SOURCES) -> Dict[str, Any]:
+    """자산 축소/해시/사전 압축 후 manifest 저장
+
+    Returns:
+        dict: manifest 내용
+    """
+    dist_dir = os.path.join(static_folder, DIST_DIRNAME)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    entries = {}
+    for name in sources:
+        with open(os.path.join(static_folder, name), "rb") as f:
+            raw = f.read()
+        stem, ext = os.path.splitext(name)
+        minified = MINIFIERS[ext](raw.decode("utf-8")).encode("utf-8")
+        digest = hashlib.sha256(minified).hexdigest()[:HASH_LENGTH]
+        filename = f"{stem}.{digest}{ext}"
+
+        _write(os.path.join(dist_dir, filename), minified)
+        gz = gzip.compress(minified, compresslevel=9, mtime=0)
+        _write(os.path.join(dist_dir, filename + ".gz"), gz)
+        entry = {
+            "file": filename,
+            "source_sha256": hashlib.sha256(raw).hexdigest(),
+            "size": len(raw),
+            "minified_size": len(minified),
+            "gzip_size": len(gz)
+        }
+        if brotli is not None:
+            br = brotli.compress(minified, quality=11)
+            _write(os.path.join(dist_dir, filename + ".br"), br)
+            entry["br_size"] = len(br)
+        entries[name] = entry
+
+        # 같은 자산의 이전 해시 파일 정리
+        stale = re.compile(rf"^{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(ext)}(\.gz|\.br)?$")
+        for existing in os.listdir(dist_dir):
+            if stale.match(existing) and not existing.startswith(filename):
+                os.remove(os.path.join(dist_dir, existing))
+
+    manifest = {"version": MANIFEST_VERSION, "assets": entries}
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    """원본 이름 -> 해시 파일명 매핑 (원본이 빌드 후 수정된 자산은 제외)"""
+    path = os.path.join(static_folder, DIST_DIRNAME, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logging.warning(f"자산 manifest 읽기 실패: {e}")
+        return {}
+
+    mapping = {}
+    for name, entry in manifest.get("assets", {}).items():
+        try:
+            with open(os.path.join(static_folder, name), "rb") as f:
+                current = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            continue
+        if current != entry.get("source_sha256"):
+            logging.warning(f"{name}이(가) 빌드 후 수정되어 원본 파일을 사용합니다 (python -m assets로 다시 빌드)")
+            continue
+        mapping[name] = entry["file"]
+    return mapping
+
+
+def _choose_variant(dist_dir: str, filename: str, accept_encodings) -> Optional[str]:
+    """Accept-Encoding에 맞는 사전 압축 파일 인코딩 선택"""
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accept_encodings[encoding] and os.path.isfile(os.path.join(dist_dir, filename + suffix)):
+            return encoding
+    return None
+
+
+# 세션 쿠키를 저장하지 않는 엔드포인트 (공유 캐시가 Set-Cookie 응답을 저장하지 않으므로)
+SESSIONLESS_ENDPOINTS = {"static", "hashed_asset"}
+
+
+class SessionlessAssetInterface(SessionInterface):
+    """정적 자산 응답에는 Set-Cookie / Vary: Cookie를 붙이지 않는 세션 인터페이스 래퍼"""
+
+    def __init__(self, inner: SessionInterface):
+        self.inner = inner
+
+    def open_session(self, app, request):
+        return self.inner.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if request.endpoint in SESSIONLESS_ENDPOINTS:
+            return None
+        return self.inner.save_session(app, session, response)
+
+
+def init_assets(app):
+    """manifest 로드, /assets 라우트와 asset_url() 템플릿 함수 등록"""
+
+    dist_dir = os.path.join(app.static_folder, DIST_DIRNAME)
+    manifest = load_manifest(app.static_folder)
+    hashed_files = set(manifest.values())
+
+    def asset_url(name: str) -> str:
+        if name in manifest and not app.debug:
+            return url_for("hashed_asset", filename=manifest[name])
+        return url_for("static", filename=name)
+
+    @app.route("/assets/<path:filename>", endpoint="hashed_asset")
+    def hashed_asset(filename):
+        if filename not in hashed_files:
+            abort(404)
+
+        encoding = _choose_variant(dist_dir, filename, request.accept_encodings)
+        suffix = {"br": ".br", "gzip": ".gz"}.get(encoding, "")
+        response = send_from_directory(dist_dir, filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=31536000)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.session_interface = SessionlessAssetInterface(app.session_interface)
+
+
+def register_asset_commands(app):
+    """flask build-assets 명령 등록"""
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """정적 자산 축소/해시/사전 압축"""
+        _print_summary(build_assets(app.static_folder))
+
+
+def _print_summary(manifest: Dict[str, Any]):
+    for name, entry in sorted(manifest["assets"].items()):
+        sizes = f"{entry['size']} -> {entry['minified_size']} (gzip {entry['gzip_size']}"
+        sizes += f", br {entry['br_size']})" if "br_size" in entry else ")"
+        print(f"{name:<12} {entry['file']:<28} {sizes}")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="정적 자산 빌드 (축소 + 내용 해시 + 사전 압축)")
+    parser.add_argument("--static-folder", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+    args = parser.parse_args(argv)
+    _print_summary(build_assets(args.static_folder))
+
+
+if __name__ == "__main__":
+    main()
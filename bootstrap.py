@@ -0,0 +1,126 @@
+"""
+워커 시작 경로
+- 스키마 생성은 import 시점이 아니라 `flask init-db` 명령으로 분리
+- gunicorn --preload 환경에서 마스터가 만든 DB 커넥션 풀을 워커가 물려받지 않도록 정리
+- 정규식/규칙 테이블과 업스트림 연결을 한 번만 예열
+- 시작 단계별 소요 시간 기록
+"""
+
+import time
+
+# 다른 무거운 모듈보다 먼저 import 되어야 import 시간까지 측정된다
+_PROCESS_MARK = time.perf_counter()
+
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+import click
+from flask import Flask
+
+# 로컬 개발용: true면 앱 import 시 스키마 생성 (운영은 flask init-db 사용)
+SCHEMA_AUTO_CREATE = os.environ.get("SCHEMA_AUTO_CREATE", "false").lower() == "true"
+# 워커 시작 시 업스트림(Perplexity) 연결 예열
+PPLX_WARMUP = os.environ.get("PPLX_WARMUP", "true").lower() == "true"
+PPLX_WARMUP_TIMEOUT = float(os.environ.get("PPLX_WARMUP_TIMEOUT", "2"))
+
+
+class StartupTimer:
+    """시작 단계별 소요 시간 기록"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self._last = started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "total_ms": round((self._last - self.started) * 1000, 1),
+            "phases": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases}
+        }
+
+    def log(self, label: str = "시작"):
+        report = self.report()
+        breakdown = ", ".join(f"{phase} {ms}ms" for phase, ms in report["phases"].items())
+        logging.info(f"{label} 완료 (pid {report['pid']}): 총 {report['total_ms']}ms [{breakdown}]")
+
+
+startup_timer = StartupTimer(_PROCESS_MARK)
+
+
+def ensure_schema(app: Flask):
+    """테이블과 인덱스가 없으면 생성 (이미 있으면 변경 없음)"""
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+        # create_all은 기존 테이블에 나중에 추가된 인덱스를 만들지 않으므로 따로 확인
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+
+
+def warm_rule_tables():
+    """정규식 캐시와 규칙 테이블을 예열 (preload 시 마스터에서 한 번 실행되어 워커가 공유)"""
+    from source_filter import filter_sources
+    from quality_scorer import IncrementalQualityScorer
+    from citation_store import normalize_url
+
+    sample_sources = [{"url": "https://ko.wikipedia.org/wiki/검색", "title": "검색 엔진 예열 문서"}]
+    for question_type in ("info_search", "learning", "realtime", "general"):
+        filter_sources(sample_sources, "검색 엔진은 어떻게 동작하나요?", question_type)
+        IncrementalQualityScorer(question_type).feed("## 예열\n\n- 항목 1. 2024년 기준입니다.").score([])
+    normalize_url(sample_sources[0]["url"])
+
+
+def reset_after_fork(app: Flask):
+    """포크된 워커에서 부모 프로세스의 DB 커넥션을 버리고 새 풀을 사용하도록 정리"""
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)  # 부모 소유 커넥션은 닫지 않고 참조만 버림
+
+
+def warm_upstream(url: str):
+    """업스트림 호스트와 TCP/TLS 연결을 미리 맺어 첫 요청 지연을 줄임 (실패해도 무시)"""
+    if not PPLX_WARMUP:
+        return
+    from pplx_client import warm_connection
+
+    warm_connection(url, timeout=PPLX_WARMUP_TIMEOUT)
+
+
+def init_worker(app: Flask, upstream_url: str):
+    """워커 프로세스 초기화 (gunicorn post_worker_init 훅에서 호출)"""
+    startup_timer.mark("fork")  # preload면 마스터 로드 후 포크까지 걸린 시간
+    reset_after_fork(app)
+    startup_timer.mark("fork_reset")
+    warm_upstream(upstream_url)
+    startup_timer.mark("upstream_warmup")
+    startup_timer.log("워커 시작")
+
+
+def register_bootstrap_commands(app: Flask):
+    """flask init-db / startup-report 명령 등록"""
+
+    @app.cli.command("init-db")
+    def init_db():
+        """데이터베이스 테이블 생성 (배포/개발 서버 시작 전에 한 번 실행)"""
+        started = time.perf_counter()
+        ensure_schema(app)
+        click.echo(f"스키마 준비 완료 ({(time.perf_counter() - started) * 1000:.1f}ms)", err=True)
+
+    @app.cli.command("startup-report")
+    def startup_report():
+        """앱 import 단계별 소요 시간 출력"""
+        report = startup_timer.report()
+        for phase, ms in report["phases"].items():
+            click.echo(f"{phase:<20} {ms:>8.1f}ms")
+        click.echo(f"{'total':<20} {report['total_ms']:>8.1f}ms")
@@ -0,0 +1,125 @@
+"""
+채팅 요청 취소 (중지 버튼, 페이지 이탈, 탭 닫기)
+요청마다 CancelToken을 만들어 업스트림 호출 직전, 스트리밍 청크 사이, 재시도 직전에 확인한다
+- 명시적 취소: 클라이언트가 request_id를 붙여 보낸 요청은 POST /api/chat/<request_id>/cancel로 취소
+  (동기 워커에서는 취소 요청이 다른 워커로 가므로 공유 캐시 플래그로 전달)
+  request_id는 클라이언트가 만든 추측할 수 없는 임의 값(UUID)이라 ID 자체를 취소 권한으로 보고,
+  사용자 ID로 묶지 않는다 (첫 채팅 중에는 새 사용자의 세션 쿠키가 아직 브라우저에 없어 취소 요청의
+  사용자가 달라지므로)
+- 연결 끊김: 클라이언트 소켓이 닫혔는지(읽을 데이터 없이 EOF) 주기적으로 확인
+업스트림 스트리밍(PPLX_STREAMING=true)이면 진행 중인 호출도 다음 청크에서 끊고,
+비스트리밍 호출은 응답을 받은 직후 취소되어 재시도/저장을 하지 않는다
+"""
+
+import logging
+import os
+import re
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import has_request_context, request
+
+from shared_cache import shared_cache
+
+# 취소/연결 확인 간격 (청크마다 확인하지 않도록 제한)
+CANCEL_POLL_INTERVAL = float(os.environ.get("CANCEL_POLL_INTERVAL", "0.25"))
+# 취소 플래그 보관 시간 (요청보다 먼저 도착한 취소도 반영)
+CANCEL_FLAG_TTL = float(os.environ.get("CANCEL_FLAG_TTL", "300"))
+# 추측할 수 없도록 최소 16자 (UUID는 36자)
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+_cancel_flags = shared_cache.namespace("cancelled_requests", ttl=CANCEL_FLAG_TTL, max_entries=10000)
+
+
+class RequestCancelled(Exception):
+    """클라이언트가 요청을 취소했거나 연결을 끊음"""
+
+
+def valid_request_id(request_id: Any) -> bool:
+    return isinstance(request_id, str) and bool(REQUEST_ID_PATTERN.match(request_id))
+
+
+def client_disconnected(environ: Dict[str, Any]) -> bool:
+    """요청 본문을 다 읽은 뒤 클라이언트 소켓이 닫혔는지 (gunicorn/werkzeug 소켓, 확인할 수 없으면 False)"""
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    if sock is None or isinstance(sock, ssl.SSLSocket):
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        # 읽을 수 있는데 데이터가 없으면 EOF (다음 요청 데이터가 와 있는 keep-alive 연결은 살아 있음)
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+
+class CancelToken:
+    """요청 하나의 취소 상태 (작업 스레드에서도 확인 가능)"""
+
+    def __init__(self, request_id: Optional[str] = None, environ: Optional[Dict[str, Any]] = None):
+        self.request_id = request_id
+        self.reason: Optional[str] = None
+        self._environ = environ
+        self._event = threading.Event()
+        self._next_poll = 0.0
+        self._poll_lock = threading.Lock()
+
+    def cancel(self, reason: str):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def _poll(self):
+        """취소 플래그와 클라이언트 연결 확인 (CANCEL_POLL_INTERVAL마다 한 번)"""
+        now = time.monotonic()
+        with self._poll_lock:
+            if now < self._next_poll:
+                return
+            self._next_poll = now + CANCEL_POLL_INTERVAL
+        try:
+            if self.request_id is not None and self.request_id in _cancel_flags:
+                self.cancel("client_cancel")
+        except Exception as e:
+            logging.error(f"취소 플래그 확인 오류: {str(e)}")
+        if self._environ is not None and client_disconnected(self._environ):
+            self.cancel("client_disconnect")
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set():
+            self._poll()
+        return self._event.is_set()
+
+    def check(self):
+        """취소되었으면 RequestCancelled 발생"""
+        if self.cancelled:
+            raise RequestCancelled(self.reason)
+
+
+def start_request(request_id: Any = None) -> CancelToken:
+    """현재 요청의 취소 토큰 생성 (request_id가 올바르지 않으면 연결 끊김만 확인)"""
+    if request_id is not None and not valid_request_id(request_id):
+        logging.warning(f"잘못된 request_id 무시: {request_id!r}")
+        request_id = None
+    environ = request.environ if has_request_context() else None
+    return CancelToken(request_id, environ)
+
+
+def finish_request(token: CancelToken):
+    """요청이 끝나면 남은 취소 플래그 정리"""
+    if token.request_id is None:
+        return
+    try:
+        _cancel_flags.delete(token.request_id)
+    except Exception as e:
+        logging.error(f"취소 플래그 정리 오류: {str(e)}")
+
+
+def request_cancel(request_id: str):
+    """다른 워커에서 실행 중인 요청에 취소 플래그 설정 (아직 시작 전이면 시작 시 바로 취소됨)"""
+    _cancel_flags.set(request_id, True)
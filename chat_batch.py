@@ -0,0 +1,163 @@
+"""
+질문 일괄 처리
+여러 질문을 동시 실행 수를 제한한 스레드 풀로 업스트림에 보내고 끝나는 순서대로 결과를 돌려준다
+작업 스레드는 DB에 접근하지 않고(답변 생성만 수행), 저장은 호출한 스레드에서 처리한다
+
+입력 항목 형식 (JSON 배열 또는 NDJSON 한 줄):
+    {"id": "q1", "message": "질문", "selected_model": "sonar-pro", "search_scope": "general"}
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import click
+from flask import Flask
+
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "200"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_DEFAULT_CONCURRENCY = 4
+
+
+def normalize_items(raw_items: Any) -> List[Dict[str, Any]]:
+    """요청 항목 검증 및 정규화 (문자열 항목은 질문으로 취급)
+
+    Raises:
+        ValueError: 항목 목록 형식이 잘못되었거나 최대 개수를 넘은 경우
+    """
+    if not isinstance(raw_items, list) or not raw_items:
+        raise ValueError("items는 비어 있지 않은 목록이어야 합니다.")
+    if len(raw_items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"한 번에 최대 {BATCH_MAX_ITEMS}개까지 처리할 수 있습니다.")
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        if isinstance(raw, str):
+            raw = {"message": raw}
+        if not isinstance(raw, dict):
+            raw = {}
+        items.append({
+            "index": index,
+            "id": raw.get("id"),
+            "message": str(raw.get("message") or "").strip(),
+            "selected_model": raw.get("selected_model") or raw.get("model"),
+            "search_scope": raw.get("search_scope") or "general"
+        })
+    return items
+
+
+def clamp_concurrency(concurrency: Any) -> int:
+    """동시 실행 수를 1..BATCH_MAX_CONCURRENCY로 제한 (없으면 기본값)
+
+    Raises:
+        ValueError: 정수로 해석할 수 없는 값
+    """
+    if not concurrency:
+        concurrency = BATCH_DEFAULT_CONCURRENCY
+    try:
+        concurrency = int(concurrency)
+    except (TypeError, ValueError):
+        raise ValueError("concurrency는 정수여야 합니다.")
+    return max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+
+def run_bounded(items: List[Dict[str, Any]], worker: Callable[[Dict[str, Any]], Dict[str, Any]],
+                concurrency: int) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Exception]]]:
+    """항목을 최대 concurrency개씩 동시에 처리하고 끝나는 순서대로 (항목, 결과, 예외) 반환
+
+    호출 측이 순회를 중단하면(클라이언트 연결 종료 등) 아직 시작하지 않은 항목은 취소된다
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chat-batch")
+    try:
+        futures = {executor.submit(worker, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:  # 항목별 실패는 다른 항목에 영향 없음
+                yield item, None, e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_batch_results(items: List[Dict[str, Any]], worker: Callable[[Dict[str, Any]], Dict[str, Any]],
+                       concurrency: int,
+                       on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None,
+                       describe_error: Callable[[Exception], str] = str) -> Iterator[Dict[str, Any]]:
+    """항목별 결과 레코드를 완료 순서대로 생성하고 마지막에 요약 레코드 생성
+
+    on_result는 성공한 결과마다 호출 스레드에서 실행되며 (저장 등) 추가 필드 dict를 반환한다
+    """
+    started = time.time()
+    succeeded = failed = 0
+
+    for item, result, error in run_bounded(items, worker, concurrency):
+        record = {"record": "result", "index": item["index"], "id": item["id"]}
+        if error is None and on_result is not None:
+            try:
+                result = {**result, **(on_result(item, result) or {})}
+            except Exception as e:
+                error = e
+
+        if error is None:
+            succeeded += 1
+            record.update({"success": True, **result})
+        else:
+            failed += 1
+            record.update({"success": False, "error": describe_error(error)})
+        yield record
+
+    yield {
+        "record": "summary",
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": failed,
+        "concurrency": concurrency,
+        "elapsed": round(time.time() - started, 3)
+    }
+
+
+def _read_items(source) -> List[Any]:
+    """JSON 배열 또는 NDJSON 파일에서 항목 읽기"""
+    text = source.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return json.loads(stripped)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def register_batch_commands(app: Flask, worker: Callable[[Dict[str, Any]], Dict[str, Any]],
+                            persist: Callable[[str, Dict[str, Any], Dict[str, Any]], Dict[str, Any]],
+                            describe_error: Callable[[Exception], str] = str):
+    """flask chat-batch 명령 등록
+
+    Args:
+        worker: 항목 하나의 답변 생성 함수 (작업 스레드에서 실행)
+        persist: (사용자 ID, 항목, 결과) 저장 함수 (명령 실행 스레드에서 실행)
+    """
+
+    @app.cli.command("chat-batch")
+    @click.argument("source", type=click.File("r", encoding="utf-8"))
+    @click.option("--concurrency", "-c", default=BATCH_DEFAULT_CONCURRENCY, show_default=True,
+                  help=f"동시 업스트림 요청 수 (최대 {BATCH_MAX_CONCURRENCY})")
+    @click.option("--persist/--no-persist", "persist_results", default=False, show_default=True, help="결과를 대화 기록으로 저장")
+    @click.option("--user-id", default=None, help="저장할 사용자 ID (--persist 사용 시 필수)")
+    @click.option("--output", "-o", type=click.File("w", encoding="utf-8"), default="-", help="NDJSON 결과 파일")
+    def chat_batch(source, concurrency, persist_results, user_id, output):
+        """JSON/NDJSON 파일의 질문들을 일괄 처리하고 결과를 NDJSON으로 출력"""
+        if persist_results and not user_id:
+            raise click.UsageError("--persist에는 --user-id가 필요합니다.")
+
+        try:
+            items = normalize_items(_read_items(source))
+        except ValueError as e:
+            raise click.UsageError(str(e))
+
+        on_result = (lambda item, result: persist(user_id, item, result)) if persist_results else None
+        for record in iter_batch_results(items, worker, clamp_concurrency(concurrency), on_result, describe_error):
+            output.write(app.json.dumps(record) + "\n")
+            output.flush()
+            if record["record"] == "summary":
+                click.echo(f"완료: 성공 {record['succeeded']}건, 실패 {record['failed']}건, {record['elapsed']}초", err=True)
@@ -0,0 +1,224 @@
+"""
+정규화된 인용 저장소
+Message.citations(JSON 목록)의 URL을 도메인/URL/연결 테이블로 분리해
+인기 URL의 중복 저장을 없애고, 도메인 단위 집계를 JSON 파싱 없이 SQL로 처리한다
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import click
+from flask import Flask
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Message, Domain, CitationUrl, MessageCitation
+from source_filter import get_domain_trust_score, get_source_type
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def normalize_url(url: str) -> Optional[Tuple[str, str]]:
+    """URL 정규화 (스킴/호스트 소문자, 기본 포트와 프래그먼트 제거)
+
+    Returns:
+        tuple: (정규화 URL, 호스트) - 호스트가 없거나 해석할 수 없는 값(잘못된 포트/IPv6)은 None
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    host = (parts.hostname or "").lower()
+    if not host:
+        return None
+
+    scheme = parts.scheme.lower() or "https"
+    netloc = host
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        netloc = f"{host}:{port}"
+
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, "")), host
+
+
+def url_hash(normalized_url: str) -> str:
+    return hashlib.sha256(normalized_url.encode("utf-8")).hexdigest()
+
+
+def _insert_ignore(model, rows: List[Dict[str, Any]], conflict_columns: Sequence[str]):
+    """충돌(이미 존재) 행은 무시하는 배치 INSERT (executemany)"""
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model.__table__).on_conflict_do_nothing(index_elements=list(conflict_columns))
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model.__table__).on_conflict_do_nothing(index_elements=list(conflict_columns))
+    else:
+        # ON CONFLICT 미지원 DB: 기존 키를 조회해서 제외
+        keys = [tuple(row[column] for column in conflict_columns) for row in rows]
+        key_columns = [getattr(model, column) for column in conflict_columns]
+        existing = {tuple(row) for row in db.session.execute(
+            select(*key_columns).where(key_columns[0].in_({key[0] for key in keys}))
+        )}
+        rows = [row for row, key in zip(rows, keys) if key not in existing]
+        if not rows:
+            return
+        stmt = insert(model.__table__)
+
+    db.session.execute(stmt, rows)
+
+
+def store_citations(items: Iterable[Tuple[str, Optional[List[Any]]]]) -> int:
+    """(메시지 ID, 인용 목록) 묶음을 도메인/URL/연결 테이블에 배치 upsert
+
+    Returns:
+        int: 저장한 연결 수
+    """
+    links: List[Tuple[str, int, str]] = []
+    urls: Dict[str, Tuple[str, str]] = {}
+
+    for message_id, citations in items:
+        for position, citation in enumerate(citations or []):
+            url = citation.get("url") if isinstance(citation, dict) else citation
+            if not isinstance(url, str) or not url.strip():
+                continue
+            normalized = normalize_url(url)
+            if normalized is None:
+                continue
+            digest = url_hash(normalized[0])
+            urls[digest] = normalized
+            links.append((message_id, position, digest))
+
+    if not links:
+        return 0
+
+    now = datetime.utcnow()
+    hosts = {host for _, host in urls.values()}
+
+    # 1) 도메인 (신뢰도/타입 점수 사전 계산)
+    _insert_ignore(Domain, [
+        {
+            "host": host,
+            "trust_score": float(get_domain_trust_score(f"https://{host}/")),
+            "source_type": get_source_type(f"https://{host}/"),
+            "created_at": now
+        }
+        for host in hosts
+    ], ["host"])
+    domain_ids = dict(db.session.execute(select(Domain.host, Domain.id).where(Domain.host.in_(hosts))).all())
+
+    # 2) URL (해시로 중복 제거)
+    _insert_ignore(CitationUrl, [
+        {"url_hash": digest, "url": url, "domain_id": domain_ids[host], "created_at": now}
+        for digest, (url, host) in urls.items()
+    ], ["url_hash"])
+    url_ids = dict(db.session.execute(
+        select(CitationUrl.url_hash, CitationUrl.id).where(CitationUrl.url_hash.in_(list(urls)))
+    ).all())
+
+    # 3) 메시지 - URL 연결
+    _insert_ignore(MessageCitation, [
+        {"message_id": message_id, "position": position, "citation_url_id": url_ids[digest]}
+        for message_id, position, digest in links
+    ], ["message_id", "position"])
+
+    db.session.commit()
+    return len(links)
+
+
+def store_message_citations(message_id: str, citations: Optional[List[Any]]):
+    """채팅 응답 저장 직후 호출 (실패해도 채팅 응답에는 영향 없음)"""
+    if not citations:
+        return
+    try:
+        store_citations([(message_id, citations)])
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"인용 저장 실패: {e}")
+
+
+def backfill_citations(batch_size: int = BACKFILL_BATCH_SIZE, start_after: str = "",
+                       sleep_seconds: float = 0.0, progress=None) -> int:
+    """기존 메시지의 citations JSON을 정규화 테이블로 옮기기
+
+    메시지 ID 순서로 키셋 페이지네이션하며, 이미 연결된 메시지는 건너뛰므로
+    중단 후 다시 실행해도 안전하다
+
+    Returns:
+        int: 처리한 메시지 수
+    """
+    last_id = start_after
+    processed = 0
+
+    while True:
+        rows = db.session.execute(
+            select(Message.id, Message.citations)
+            .where(Message.id > last_id, Message.message_type == 'assistant')
+            .order_by(Message.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        linked = set(db.session.execute(
+            select(MessageCitation.message_id).where(MessageCitation.message_id.in_(ids)).distinct()
+        ).scalars())
+
+        pending = [(row.id, row.citations) for row in rows if row.id not in linked and row.citations]
+        store_citations(pending)
+        db.session.commit()
+
+        processed += len(pending)
+        last_id = ids[-1]
+        if progress is not None:
+            progress(processed, last_id)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return processed
+
+
+def top_cited_domains(question_type: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """가장 많이 인용된 도메인 (질문 유형별 필터 가능)"""
+    stmt = (
+        select(Domain.host, Domain.source_type, Domain.trust_score, func.count().label("citations"))
+        .select_from(MessageCitation)
+        .join(CitationUrl, CitationUrl.id == MessageCitation.citation_url_id)
+        .join(Domain, Domain.id == CitationUrl.domain_id)
+    )
+    if question_type:
+        stmt = stmt.join(Message, Message.id == MessageCitation.message_id).where(Message.question_type == question_type)
+
+    stmt = stmt.group_by(Domain.host, Domain.source_type, Domain.trust_score).order_by(func.count().desc()).limit(limit)
+    return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+
+def register_citation_commands(app: Flask):
+    """flask backfill-citations / citation-stats 명령 등록"""
+
+    @app.cli.command("backfill-citations")
+    @click.option("--batch-size", default=BACKFILL_BATCH_SIZE, show_default=True)
+    @click.option("--start-after", default="", help="이 메시지 ID 다음부터 처리 (중단 지점 재개)")
+    @click.option("--sleep", "sleep_seconds", default=0.0, show_default=True, help="배치 사이 대기 시간(초)")
+    def backfill(batch_size, start_after, sleep_seconds):
+        """기존 메시지의 인용을 정규화 테이블로 백필"""
+        def progress(done, last_id):
+            click.echo(f"백필 진행: {done}건 (마지막 ID {last_id})", err=True)
+
+        processed = backfill_citations(batch_size, start_after, sleep_seconds, progress)
+        click.echo(f"백필 완료: {processed}건", err=True)
+
+    @app.cli.command("citation-stats")
+    @click.option("--question-type", default=None, help="질문 유형 (예: realtime)")
+    @click.option("--limit", default=20, show_default=True)
+    def citation_stats(question_type, limit):
+        """가장 많이 인용된 도메인 출력"""
+        for row in top_cited_domains(question_type, limit):
+            click.echo(f"{row['citations']:>8}  {row['host']:<40} {row['source_type']:<14} {row['trust_score']:.0f}")
@@ -0,0 +1,108 @@
+"""
+읽기 전용 복제본(replica) 라우팅
+DATABASE_REPLICA_URL을 설정하면 'replica' 바인드를 추가하고, @replica_read를 붙인 조회 라우트의
+SELECT만 복제본으로 보낸다 (쓰기/플러시와 그 밖의 라우트는 항상 기본 DB)
+
+쓰기 요청(POST/PUT/PATCH/DELETE)이 성공하면 REPLICA_STICKY_SECONDS 동안 그 브라우저의 조회를
+기본 DB로 보내 복제 지연 중에도 방금 쓴 내용을 읽을 수 있게 한다 (쿠키 기반이라 워커와 무관)
+
+로컬 테스트: 두 개의 SQLite 파일을 기본 DB/복제본으로 지정하고 flask replica-sync로 복제
+    DATABASE_URL=sqlite:////tmp/primary.db DATABASE_REPLICA_URL=sqlite:////tmp/replica.db
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from functools import wraps
+from typing import Any, Callable
+
+import click
+from flask import Flask, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_BIND_KEY = "replica"
+STICKY_COOKIE_NAME = "db_primary_until"
+
+_SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class RoutingSession(Session):
+    """조회 라우트의 SELECT는 복제본, 나머지(쓰기, 플러시, 일반 라우트)는 기본 DB로 보내는 세션"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_app_context() and g.get("db_route") == REPLICA_BIND_KEY):
+            engine = self._db.engines.get(REPLICA_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _recently_wrote() -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def replica_read(view: Callable[..., Any]) -> Callable[..., Any]:
+    """조회 라우트 데코레이터: 최근 쓰기가 없으면 이 요청의 SELECT를 복제본으로 보냄"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if DATABASE_REPLICA_URL and request.method in _SAFE_METHODS and not _recently_wrote():
+            g.db_route = REPLICA_BIND_KEY
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_db_routing(app: Flask):
+    """복제본 바인드 설정과 쓰기 후 고정(sticky) 쿠키 등록 (db.init_app보다 먼저 호출)"""
+    if not DATABASE_REPLICA_URL:
+        return
+
+    app.config.setdefault("SQLALCHEMY_BINDS", {})[REPLICA_BIND_KEY] = DATABASE_REPLICA_URL
+
+    @app.after_request
+    def stick_to_primary_after_write(response):
+        if request.method not in _SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(STICKY_COOKIE_NAME, str(int(time.time()) + REPLICA_STICKY_SECONDS),
+                                max_age=REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax")
+        return response
+
+
+def sync_sqlite_replica(primary_url: str, replica_url: str):
+    """로컬 테스트용: SQLite 기본 DB 파일을 복제본 파일로 통째로 복사 (온라인 백업 API)"""
+    primary, replica = make_url(primary_url), make_url(replica_url)
+    if primary.get_backend_name() != "sqlite" or replica.get_backend_name() != "sqlite":
+        raise ValueError("replica-sync는 SQLite 파일 DB끼리만 지원합니다.")
+
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def register_replica_commands(app: Flask):
+    """flask replica-sync 명령 등록"""
+
+    @app.cli.command("replica-sync")
+    def replica_sync():
+        """로컬 SQLite 복제본을 기본 DB와 같게 맞춤 (복제 지연 테스트용)"""
+        if not DATABASE_REPLICA_URL:
+            raise click.UsageError("DATABASE_REPLICA_URL이 설정되어 있지 않습니다.")
+        try:
+            sync_sqlite_replica(app.config["SQLALCHEMY_DATABASE_URI"], DATABASE_REPLICA_URL)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        logging.info("복제본 동기화 완료")
+        click.echo("복제본 동기화 완료", err=True)
@@ -0,0 +1,126 @@
+"""
+채팅 요청 전체 마감 시간(deadline) 관리
+요청마다 질문 유형별 시간 예산(클라이언트가 deadline_ms로 지정 가능)을 정하고,
+업스트림 호출에는 남은 시간만 타임아웃으로 넘긴다
+재시도는 남은 시간이 최근 관측한 모델 응답 시간(백분위)보다 짧으면 건너뛰고
+그때까지의 가장 좋은 답변을 degraded 표시와 함께 반환한다
+
+질문 유형별 예산 변경 예:
+    CHAT_DEADLINES="realtime=20,learning=60"
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+DEADLINE_DEFAULT_SECONDS = float(os.environ.get("DEADLINE_DEFAULT_SECONDS", "40"))
+# 클라이언트가 지정할 수 있는 범위
+DEADLINE_MIN_SECONDS = float(os.environ.get("DEADLINE_MIN_SECONDS", "3"))
+DEADLINE_MAX_SECONDS = float(os.environ.get("DEADLINE_MAX_SECONDS", "90"))
+# 이보다 적게 남으면 업스트림을 호출하지 않음
+DEADLINE_MIN_CALL_SECONDS = float(os.environ.get("DEADLINE_MIN_CALL_SECONDS", "1"))
+# 관측값이 부족할 때 가정하는 업스트림 호출 시간과 재시도 판단에 쓰는 백분위
+UPSTREAM_LATENCY_DEFAULT_SECONDS = float(os.environ.get("UPSTREAM_LATENCY_DEFAULT_SECONDS", "8"))
+UPSTREAM_LATENCY_PERCENTILE = float(os.environ.get("UPSTREAM_LATENCY_PERCENTILE", "0.9"))
+UPSTREAM_LATENCY_WINDOW = 100
+UPSTREAM_LATENCY_MIN_SAMPLES = 5
+
+QUESTION_DEADLINES: Dict[str, float] = {
+    "realtime": 25,
+    "info_search": 40,
+    "learning": 50,
+    "general": 40
+}
+
+
+def _parse_deadlines(raw: str) -> Dict[str, float]:
+    deadlines = {}
+    for entry in raw.split(","):
+        name, _, seconds = entry.partition("=")
+        if not name.strip() or not seconds.strip():
+            continue
+        try:
+            deadlines[name.strip()] = float(seconds)
+        except ValueError:
+            logging.warning(f"CHAT_DEADLINES 항목 무시: {entry}")
+    return deadlines
+
+
+QUESTION_DEADLINES.update(_parse_deadlines(os.environ.get("CHAT_DEADLINES", "")))
+
+
+class DeadlineExceeded(Exception):
+    """남은 시간이 없어 업스트림을 호출할 수 없음"""
+
+
+class Deadline:
+    """요청 하나의 마감 시각 (monotonic 기준)"""
+
+    def __init__(self, seconds: float, started: Optional[float] = None):
+        self.budget = seconds
+        self.expires_at = (started if started is not None else time.monotonic()) + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def fits(self, seconds: float) -> bool:
+        """남은 시간 안에 seconds짜리 작업을 끝낼 수 있는지"""
+        return self.remaining() >= seconds
+
+    def call_timeout(self) -> float:
+        """업스트림 호출에 넘길 타임아웃 (남은 시간)
+
+        Raises:
+            DeadlineExceeded: 남은 시간이 DEADLINE_MIN_CALL_SECONDS보다 적은 경우
+        """
+        remaining = self.remaining()
+        if remaining < DEADLINE_MIN_CALL_SECONDS:
+            raise DeadlineExceeded(f"남은 시간 {remaining:.2f}초")
+        return remaining
+
+
+def deadline_for(question_type: str, requested_ms: Any = None, started: Optional[float] = None) -> Deadline:
+    """질문 유형별 예산 또는 클라이언트 지정값(deadline_ms, 허용 범위로 제한 - 숫자가 아니거나 NaN/무한대면 무시)으로 마감 시간 생성"""
+    seconds = QUESTION_DEADLINES.get(question_type, DEADLINE_DEFAULT_SECONDS)
+    if requested_ms is not None:
+        try:
+            requested = float(requested_ms)
+            # NaN은 min/max 제한을 그대로 통과하므로 무한대와 함께 거부
+            if not math.isfinite(requested):
+                raise ValueError(requested_ms)
+            seconds = min(max(requested / 1000, DEADLINE_MIN_SECONDS), DEADLINE_MAX_SECONDS)
+        except (TypeError, ValueError):
+            logging.warning(f"잘못된 deadline_ms 무시: {requested_ms!r}")
+    return Deadline(seconds, started)
+
+
+class LatencyTracker:
+    """모델별 최근 업스트림 호출 시간 (워커 프로세스 단위)"""
+
+    def __init__(self, window: int = UPSTREAM_LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def estimate(self, model: str, percentile: float = UPSTREAM_LATENCY_PERCENTILE) -> float:
+        """현실적인 호출 시간 추정 (관측값이 적으면 기본값)"""
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < UPSTREAM_LATENCY_MIN_SAMPLES:
+            return UPSTREAM_LATENCY_DEFAULT_SECONDS
+        return samples[min(int(len(samples) * percentile), len(samples) - 1)]
+
+
+upstream_latency = LatencyTracker()
@@ -0,0 +1,18 @@
+"""
+gunicorn 설정 (작업 디렉터리의 gunicorn.conf.py는 자동으로 읽힌다)
+운영에서는 앱을 마스터에서 한 번만 import(preload)하고 워커는 포크만 하므로
+import/예열 비용이 워커 수만큼 반복되지 않는다
+--reload를 쓰는 개발 서버는 GUNICORN_PRELOAD=false로 실행한다
+"""
+
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def post_worker_init(worker):
+    """워커가 앱을 받은 직후: 상속된 DB 커넥션 정리, 업스트림 연결 예열, 시작 시간 보고"""
+    from app import app, PERPLEXITY_API_URL
+    from bootstrap import init_worker
+
+    init_worker(app, PERPLEXITY_API_URL)
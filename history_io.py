@@ -0,0 +1,195 @@
+"""
+대화 기록 NDJSON 내보내기/가져오기
+서버 측 커서(yield_per)로 한 줄씩 스트리밍하므로 기록 크기와 관계없이 메모리 사용량이 일정하고,
+가져오기는 배치 단위 executemany INSERT로 처리한다
+
+NDJSON 형식 (한 줄에 JSON 객체 하나):
+    {"record": "export", "version": 1, "exported_at": "..."}
+    {"record": "user", "id": "...", "name": "...", ...}
+    {"record": "conversation", "id": "...", "user_id": "...", ...}
+    {"record": "message", "id": "...", "conversation_id": "...", ...}
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import insert, select
+
+from models import db, User, Conversation, Message, ArchivedConversation
+from archive import decompress_messages
+from keyword_index import index_messages
+
+EXPORT_VERSION = 1
+YIELD_PER = 500
+IMPORT_BATCH_SIZE = 1000
+
+# 레코드 종류 -> 모델 (가져오기 시 외래 키 순서대로 처리)
+RECORD_MODELS = {
+    "user": User,
+    "conversation": Conversation,
+    "message": Message
+}
+
+
+def _dump_line(record: Dict[str, Any]) -> bytes:
+    return current_app.json.dumps_bytes(record) + b"\n"
+
+
+def _stream_table(model, *criteria, order_by=None) -> Iterator[Dict[str, Any]]:
+    """테이블 행을 서버 측 커서로 YIELD_PER개씩 읽어 dict로 반환"""
+    stmt = select(*model.__table__.columns).where(*criteria)
+    if order_by is not None:
+        stmt = stmt.order_by(*order_by)
+    result = db.session.execute(stmt.execution_options(yield_per=YIELD_PER, stream_results=True))
+    try:
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        result.close()
+
+
+def iter_export_lines(user_ids: Optional[List[str]] = None) -> Iterator[bytes]:
+    """사용자(들)의 전체 기록을 NDJSON 줄 단위로 생성 (user_ids가 None이면 전체)"""
+    def owned(column):
+        return [column.in_(user_ids)] if user_ids is not None else []
+
+    yield _dump_line({"record": "export", "version": EXPORT_VERSION, "exported_at": datetime.utcnow()})
+
+    for row in _stream_table(User, *owned(User.id), order_by=[User.id]):
+        yield _dump_line({"record": "user", **row})
+
+    for row in _stream_table(Conversation, *owned(Conversation.user_id), order_by=[Conversation.created_at, Conversation.id]):
+        yield _dump_line({"record": "conversation", **row})
+
+    for row in _stream_table(Message, *owned(Message.user_id), order_by=[Message.conversation_id, Message.created_at]):
+        yield _dump_line({"record": "message", **row})
+
+    # 보관된 대화는 일반 대화/메시지 레코드로 풀어서 내보냄 (대화 먼저, 메시지 나중)
+    archived_order = [ArchivedConversation.updated_at, ArchivedConversation.id]
+    for row in _stream_table(ArchivedConversation, *owned(ArchivedConversation.user_id), order_by=archived_order):
+        yield _dump_line({
+            "record": "conversation",
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "title": row["title"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "is_active": False,
+            "is_favorite": row["is_favorite"]
+        })
+
+    for row in _stream_table(ArchivedConversation, *owned(ArchivedConversation.user_id), order_by=archived_order):
+        for message in decompress_messages(row["messages_blob"]):
+            yield _dump_line({"record": "message", "conversation_id": row["id"], **message})
+
+
+def _coerce_row(model, record: Dict[str, Any]) -> Dict[str, Any]:
+    """NDJSON 레코드를 INSERT 파라미터로 변환 (알 수 없는 키 제거, 날짜 문자열 변환)"""
+    row = {}
+    for column in model.__table__.columns:
+        if column.name not in record:
+            continue
+        value = record[column.name]
+        if isinstance(value, str) and isinstance(column.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        row[column.name] = value
+    return row
+
+
+def _flush_batch(model, rows: List[Dict[str, Any]], stats: Dict[str, int]):
+    """이미 존재하는 ID(보관된 대화와 그 메시지 포함)를 제외하고 executemany INSERT 실행"""
+    if not rows:
+        return
+    ids = [row["id"] for row in rows]
+    existing = set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+    # 보관된 대화는 일반 테이블로 다시 가져오지 않음 (보관본과 중복되지 않도록)
+    if model is Conversation:
+        existing.update(db.session.execute(
+            select(ArchivedConversation.id).where(ArchivedConversation.id.in_(ids))
+        ).scalars())
+    elif model is Message:
+        conversation_ids = {row.get("conversation_id") for row in rows}
+        archived = set(db.session.execute(
+            select(ArchivedConversation.id).where(ArchivedConversation.id.in_(conversation_ids))
+        ).scalars())
+        existing.update(row["id"] for row in rows if row.get("conversation_id") in archived)
+    new_rows = [row for row in rows if row["id"] not in existing]
+
+    if new_rows:
+        db.session.execute(insert(model.__table__), new_rows)
+        if model is Message:
+            index_messages(new_rows)
+        db.session.commit()
+
+    name = model.__tablename__
+    stats[f"{name}_inserted"] = stats.get(f"{name}_inserted", 0) + len(new_rows)
+    stats[f"{name}_skipped"] = stats.get(f"{name}_skipped", 0) + len(rows) - len(new_rows)
+    rows.clear()
+
+
+def import_lines(lines: Iterable[bytes], batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, int]:
+    """NDJSON 줄들을 배치 INSERT로 가져오기
+
+    같은 종류의 레코드를 batch_size개씩 모아 INSERT 하며, 레코드 종류가 바뀌면
+    앞 종류를 먼저 반영해 외래 키 순서(사용자 -> 대화 -> 메시지)를 지킨다
+    """
+    loads = current_app.json.loads
+    stats: Dict[str, int] = {}
+    batch: List[Dict[str, Any]] = []
+    batch_model = None
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        record = loads(line)
+        kind = record.pop("record", None)
+        if kind == "export":
+            if record.get("version", EXPORT_VERSION) > EXPORT_VERSION:
+                raise ValueError(f"지원하지 않는 내보내기 버전: {record.get('version')}")
+            continue
+
+        model = RECORD_MODELS.get(kind)
+        if model is None:
+            logging.warning(f"가져오기: 알 수 없는 레코드 종류 무시 ({line_number}번째 줄: {kind})")
+            continue
+
+        if model is not batch_model:
+            if batch_model is not None:
+                _flush_batch(batch_model, batch, stats)
+            batch_model = model
+
+        batch.append(_coerce_row(model, record))
+        if len(batch) >= batch_size:
+            _flush_batch(model, batch, stats)
+
+    if batch_model is not None:
+        _flush_batch(batch_model, batch, stats)
+
+    return stats
+
+
+def register_history_commands(app: Flask):
+    """flask export-history / import-history 명령 등록"""
+
+    @app.cli.command("export-history")
+    @click.option("--user", "user_ids", multiple=True, help="내보낼 사용자 ID (여러 번 지정 가능, 생략 시 전체)")
+    @click.option("--output", "-o", type=click.File("wb"), default="-", help="출력 파일 (기본: 표준 출력)")
+    def export_history(user_ids, output):
+        """대화 기록을 NDJSON으로 내보내기"""
+        count = 0
+        for line in iter_export_lines(list(user_ids) or None):
+            output.write(line)
+            count += 1
+        click.echo(f"{count}줄 내보냄", err=True)
+
+    @app.cli.command("import-history")
+    @click.argument("source", type=click.File("rb"))
+    @click.option("--batch-size", default=IMPORT_BATCH_SIZE, show_default=True, help="INSERT 배치 크기")
+    def import_history(source, batch_size):
+        """NDJSON 대화 기록 가져오기 (이미 있는 ID는 건너뜀)"""
+        stats = import_lines(source, batch_size=batch_size)
+        for key, value in sorted(stats.items()):
+            click.echo(f"{key}: {value}", err=True)
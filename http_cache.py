@@ -0,0 +1,134 @@
+"""
+HTTP 조건부 요청(ETag/Last-Modified) 및 응답 압축
+변경되지 않은 대화 목록/기록/설정을 다시 내려받지 않도록 304 응답을 처리하고,
+일정 크기 이상의 응답은 gzip(가능하면 brotli)으로 압축한다
+"""
+
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli는 선택 의존성
+    brotli = None
+
+# 이 크기(바이트) 이상인 응답만 압축
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = 6
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "text/javascript"
+}
+
+# 사용자별 API 응답: 브라우저 캐시에 두되 매번 재검증
+PRIVATE_REVALIDATE = "private, no-cache"
+# 배포 단위로만 바뀌는 정적 API 응답
+PUBLIC_LONG_LIVED = "public, max-age=86400, stale-while-revalidate=604800"
+
+_ENCODING_SUFFIXES = ("", "-gzip", "-br")
+
+
+def make_etag(*parts: Any) -> str:
+    """검증 값들로부터 강한 ETag 값 생성 (따옴표 제외)"""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _to_utc_seconds(value: datetime) -> datetime:
+    """DB의 naive UTC 시각을 초 단위 aware 시각으로 변환 (HTTP 날짜 비교용)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None,
+                 cache_control: str = PRIVATE_REVALIDATE) -> Optional[Response]:
+    """요청의 조건부 헤더가 현재 표현과 일치하면 304 응답을, 아니면 None 반환
+
+    If-None-Match가 있으면 ETag만 비교하고, 없을 때만 If-Modified-Since를 본다 (RFC 7232)
+    압축된 표현에 붙인 인코딩 접미사(-gzip, -br)는 같은 표현으로 취급한다
+    """
+    matched = False
+    if request.if_none_match:
+        matched = any(request.if_none_match.contains(etag + suffix) for suffix in _ENCODING_SUFFIXES)
+    elif last_modified is not None and request.if_modified_since is not None:
+        matched = _to_utc_seconds(last_modified) <= request.if_modified_since
+
+    if not matched:
+        return None
+
+    response = Response(status=304)
+    set_validators(response, etag, last_modified, cache_control)
+    return response
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None,
+                   cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    """응답에 ETag/Last-Modified/Cache-Control 헤더 설정"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _to_utc_seconds(last_modified)
+    response.headers["Cache-Control"] = cache_control
+    if cache_control.startswith("private"):
+        response.vary.add("Cookie")
+    return response
+
+
+def _choose_encoding() -> Optional[str]:
+    """Accept-Encoding에서 사용할 압축 방식 선택"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response: Response) -> Response:
+    """조건을 만족하는 응답 본문을 압축 (after_request 훅)"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=5)
+    else:
+        compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    # 강한 ETag는 표현(인코딩)마다 달라야 하므로 접미사를 붙인다
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+
+    return response
+
+
+def init_http_cache(app: Flask):
+    """앱에 응답 압축 훅 등록"""
+    app.after_request(compress_response)
@@ -0,0 +1,87 @@
+"""
+API 응답용 고속 JSON 직렬화
+orjson이 설치되어 있으면 사용하고, 없으면 표준 json 모듈로 동작한다
+두 경우 모두 datetime을 ISO 8601 문자열로 직렬화하므로
+응답을 만드는 쪽에서 .isoformat()을 호출할 필요가 없다
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson은 선택 의존성
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """기본 인코더가 처리하지 못하는 타입 변환 (표준 json 경로용)"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_default(obj: Any) -> Any:
+    """orjson이 기본 지원하지 않는 타입 변환"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return _default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """orjson 우선, 표준 json 대체 Flask JSON 프로바이더"""
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """UTF-8 바이트로 직렬화 (응답 본문용)"""
+        if orjson is not None:
+            return orjson.dumps(obj, default=_orjson_default, option=self._orjson_options(indent))
+        return json.dumps(obj, default=_default, ensure_ascii=False, sort_keys=self.sort_keys,
+                          indent=2 if indent else None,
+                          separators=None if indent else (",", ":")).encode("utf-8")
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode("utf-8")
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", False)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """jsonify() 응답 생성 (문자열 변환 없이 바이트를 바로 본문으로 사용)"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app: Flask):
+    """앱의 JSON 프로바이더를 고속 프로바이더로 교체"""
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,273 @@
+"""
+사용자별 키워드 역색인 ("관련된 지난 대화" / "이전에 물어본 질문" 힌트)
+사용자 질문이 저장될 때마다 extract_keywords로 뽑은 키워드를 (사용자, 키워드, 대화) 행으로 upsert 해
+색인을 점진적으로 갱신하고, 조회는 질문 키워드의 포스팅만 기본 키 범위로 읽으므로
+대화 기록 전체를 훑지 않는다 (비용은 기록 크기가 아니라 일치하는 포스팅 수에 비례)
+
+- 답변(assistant) 메시지는 색인하지 않음: 길고 일반적인 단어가 많아 포스팅만 불리고 유사도를 흐린다
+- 점수: 일치한 키워드마다 1/df (df = 그 키워드가 나온 대화 수), 질문 키워드 전체 가중치 대비 비율(0~1)
+- 대화 삭제/보관 시 forget_conversations로 포스팅 제거
+
+기존 대화 색인: flask reindex-keywords
+"""
+
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import click
+from flask import Flask
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Conversation, Message, ConversationKeyword
+from source_filter import extract_keywords
+
+# 조회에 쓰는 질문 키워드 최대 수
+RELATED_MAX_QUERY_KEYWORDS = int(os.environ.get("RELATED_MAX_QUERY_KEYWORDS", "16"))
+# 한 사용자의 대화 중 이보다 많은 곳에 나온 키워드는 불용어로 보고 포스팅을 읽지 않음
+RELATED_MAX_DF = int(os.environ.get("RELATED_MAX_DF", "200"))
+# "이전에 물어본 질문" 힌트 기준 (질문 가중치 중 일치 비율, 최소 일치 키워드 수)
+ASKED_BEFORE_MIN_SCORE = float(os.environ.get("ASKED_BEFORE_MIN_SCORE", "0.6"))
+ASKED_BEFORE_MIN_MATCHES = 2
+ASKED_BEFORE_LIMIT = 3
+KEYWORD_MAX_LENGTH = 64
+REINDEX_BATCH_SIZE = 200
+
+Posting = Tuple[str, str, str]  # (사용자 ID, 키워드, 대화 ID)
+
+
+def question_keywords(text: str, limit: int = RELATED_MAX_QUERY_KEYWORDS) -> List[str]:
+    """색인/조회용 키워드 (정렬해서 결정적으로, 컬럼 길이 초과 키워드 제외)"""
+    keywords = sorted(k for k in extract_keywords(text or "") if len(k) <= KEYWORD_MAX_LENGTH)
+    return keywords[:limit] if limit else keywords
+
+
+def _upsert_postings(counts: Dict[Posting, int], last_seen: Dict[Posting, datetime]):
+    """포스팅 배치 upsert (있으면 hits 누적, last_seen_at 갱신)"""
+    if not counts:
+        return
+    keys = ["user_id", "keyword", "conversation_id"]
+    rows = [{**dict(zip(keys, key)), "hits": hits, "last_seen_at": last_seen[key]} for key, hits in counts.items()]
+    table = ConversationKeyword.__table__
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_={
+            "hits": table.c.hits + stmt.excluded.hits,
+            "last_seen_at": stmt.excluded.last_seen_at
+        })
+        db.session.execute(stmt, rows)
+        return
+
+    # ON CONFLICT 미지원 DB: 기존 포스팅은 UPDATE, 나머지는 INSERT
+    existing = {tuple(row) for row in db.session.execute(
+        select(table.c.user_id, table.c.keyword, table.c.conversation_id)
+        .where(table.c.conversation_id.in_({row["conversation_id"] for row in rows}))
+    )}
+    for row in rows:
+        key = (row["user_id"], row["keyword"], row["conversation_id"])
+        if key in existing:
+            db.session.execute(
+                update(table)
+                .where(*(table.c[column] == value for column, value in zip(keys, key)))
+                .values(hits=table.c.hits + row["hits"], last_seen_at=row["last_seen_at"])
+            )
+    new_rows = [row for row in rows if (row["user_id"], row["keyword"], row["conversation_id"]) not in existing]
+    if new_rows:
+        db.session.execute(insert(table), new_rows)
+
+
+def index_messages(messages: Iterable[Dict[str, Any]]) -> int:
+    """메시지 행(dict 또는 Message) 묶음을 색인에 반영 (사용자 질문만, 커밋은 호출자)
+
+    Returns:
+        int: 반영한 포스팅 수
+    """
+    counts: Dict[Posting, int] = defaultdict(int)
+    last_seen: Dict[Posting, datetime] = {}
+
+    for message in messages:
+        field = message.get if isinstance(message, dict) else lambda name: getattr(message, name, None)
+        if field("message_type") != "user" or field("question_type") == "greeting":
+            continue
+        seen_at = field("created_at") or datetime.utcnow()
+        for keyword in question_keywords(field("content"), limit=0):
+            key = (field("user_id"), keyword, field("conversation_id"))
+            counts[key] += 1
+            last_seen[key] = max(last_seen.get(key, seen_at), seen_at)
+
+    _upsert_postings(counts, last_seen)
+    return len(counts)
+
+
+def index_message(message: Message):
+    """채팅 질문 저장 직후 호출 (실패해도 채팅 응답에는 영향 없음)"""
+    try:
+        if index_messages([message]):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"키워드 색인 실패: {e}")
+
+
+def forget_conversations(conversation_ids: Sequence[str]):
+    """삭제/보관되는 대화의 포스팅 제거 (커밋은 호출자)"""
+    if conversation_ids:
+        db.session.execute(delete(ConversationKeyword).where(ConversationKeyword.conversation_id.in_(conversation_ids)))
+
+
+def _conversation_scores(user_id: str, keywords: Sequence[str],
+                         exclude_conversation_id: Optional[str] = None) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """질문 키워드와 겹치는 대화별 점수 (인덱스 범위 조회 2번: df, 포스팅)
+
+    Returns:
+        tuple: ({대화 ID: {'weight', 'matched', 'last_seen_at'}}, 질문 전체 가중치)
+    """
+    if not keywords:
+        return {}, 0.0
+
+    df = dict(db.session.execute(
+        select(ConversationKeyword.keyword, func.count())
+        .where(ConversationKeyword.user_id == user_id, ConversationKeyword.keyword.in_(keywords))
+        .group_by(ConversationKeyword.keyword)
+    ).all())
+    # 처음 보는 키워드도 질문의 정보량에 포함 (df=1로 가정)
+    weights = {keyword: 1.0 / max(df.get(keyword, 0), 1) for keyword in keywords}
+    total_weight = sum(weights.values())
+
+    searchable = [keyword for keyword in keywords if 0 < df.get(keyword, 0) <= RELATED_MAX_DF]
+    if not searchable:
+        return {}, total_weight
+
+    stmt = (
+        select(ConversationKeyword.conversation_id, ConversationKeyword.keyword, ConversationKeyword.last_seen_at)
+        .where(ConversationKeyword.user_id == user_id, ConversationKeyword.keyword.in_(searchable))
+    )
+    if exclude_conversation_id:
+        stmt = stmt.where(ConversationKeyword.conversation_id != exclude_conversation_id)
+
+    scores: Dict[str, Dict[str, Any]] = {}
+    for conversation_id, keyword, last_seen_at in db.session.execute(stmt):
+        entry = scores.setdefault(conversation_id, {"weight": 0.0, "matched": [], "last_seen_at": last_seen_at})
+        entry["weight"] += weights[keyword]
+        entry["matched"].append(keyword)
+        entry["last_seen_at"] = max(entry["last_seen_at"], last_seen_at)
+    return scores, total_weight
+
+
+def _ranked(user_id: str, scores: Dict[str, Dict[str, Any]], total_weight: float, limit: int,
+            min_score: float = 0.0, min_matches: int = 1) -> List[Dict[str, Any]]:
+    """점수순 상위 대화에 제목/수정 시각을 붙여 반환 (대화 조회 1번)"""
+    candidates = [
+        (conversation_id, entry["weight"] / total_weight, entry)
+        for conversation_id, entry in scores.items()
+        if len(entry["matched"]) >= min_matches and entry["weight"] / total_weight >= min_score
+    ]
+    candidates.sort(key=lambda item: (item[1], item[2]["last_seen_at"]), reverse=True)
+    candidates = candidates[:limit]
+    if not candidates:
+        return []
+
+    conversations = {
+        row.id: row for row in db.session.execute(
+            select(Conversation.id, Conversation.title, Conversation.updated_at)
+            .where(Conversation.id.in_([conversation_id for conversation_id, _, _ in candidates]),
+                   Conversation.user_id == user_id)
+        )
+    }
+    return [
+        {
+            "id": conversation_id,
+            "title": conversations[conversation_id].title,
+            "updated_at": conversations[conversation_id].updated_at.isoformat(),
+            "score": round(score, 3),
+            "matched": sorted(entry["matched"])
+        }
+        for conversation_id, score, entry in candidates
+        if conversation_id in conversations
+    ]
+
+
+def related_conversations(user_id: str, conversation_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """대화와 키워드가 겹치는 같은 사용자의 다른 대화 (색인된 대화 키워드를 질문으로 사용)"""
+    keywords = list(db.session.execute(
+        select(ConversationKeyword.keyword)
+        .where(ConversationKeyword.user_id == user_id, ConversationKeyword.conversation_id == conversation_id)
+        .order_by(ConversationKeyword.hits.desc(), ConversationKeyword.keyword)
+        .limit(RELATED_MAX_QUERY_KEYWORDS)
+    ).scalars())
+    scores, total_weight = _conversation_scores(user_id, keywords, exclude_conversation_id=conversation_id)
+    return _ranked(user_id, scores, total_weight, limit)
+
+
+def asked_before(user_id: str, question: str, current_conversation_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """새 질문과 거의 같은 질문을 했던 지난 대화 (현재 대화 제외, 실패해도 채팅 응답에는 영향 없음)"""
+    keywords = question_keywords(question)
+    try:
+        scores, total_weight = _conversation_scores(user_id, keywords, exclude_conversation_id=current_conversation_id)
+        return _ranked(user_id, scores, total_weight, ASKED_BEFORE_LIMIT, min_score=ASKED_BEFORE_MIN_SCORE,
+                       min_matches=min(ASKED_BEFORE_MIN_MATCHES, len(keywords)))
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"이전 질문 조회 실패: {e}")
+        return []
+
+
+def reindex_keywords(batch_size: int = REINDEX_BATCH_SIZE, start_after: str = "",
+                     sleep_seconds: float = 0.0, progress=None) -> int:
+    """기존 대화의 색인을 다시 만들기
+
+    대화 ID 순서로 키셋 페이지네이션하며 배치마다 해당 대화의 포스팅을 지우고 새로 쓰므로
+    중단 후 다시 실행해도 hits가 중복 누적되지 않는다
+
+    Returns:
+        int: 처리한 대화 수
+    """
+    last_id = start_after
+    processed = 0
+
+    while True:
+        ids = list(db.session.execute(
+            select(Conversation.id).where(Conversation.id > last_id).order_by(Conversation.id).limit(batch_size)
+        ).scalars())
+        if not ids:
+            break
+
+        messages = db.session.execute(
+            select(Message.user_id, Message.conversation_id, Message.content, Message.message_type,
+                   Message.question_type, Message.created_at)
+            .where(Message.conversation_id.in_(ids), Message.message_type == 'user')
+        ).mappings()
+        forget_conversations(ids)
+        index_messages(dict(row) for row in messages)
+        db.session.commit()
+
+        processed += len(ids)
+        last_id = ids[-1]
+        if progress is not None:
+            progress(processed, last_id)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return processed
+
+
+def register_keyword_commands(app: Flask):
+    """flask reindex-keywords 명령 등록"""
+
+    @app.cli.command("reindex-keywords")
+    @click.option("--batch-size", default=REINDEX_BATCH_SIZE, show_default=True)
+    @click.option("--start-after", default="", help="이 대화 ID 다음부터 처리 (중단 지점 재개)")
+    @click.option("--sleep", "sleep_seconds", default=0.0, show_default=True, help="배치 사이 대기 시간(초)")
+    def reindex(batch_size, start_after, sleep_seconds):
+        """기존 대화의 사용자 질문으로 키워드 색인 재구성"""
+        def progress(done, last_id):
+            click.echo(f"색인 진행: 대화 {done}건 (마지막 ID {last_id})", err=True)
+
+        processed = reindex_keywords(batch_size, start_after, sleep_seconds, progress)
+        click.echo(f"색인 완료: 대화 {processed}건", err=True)
@@ -1,4 +1,6 @@
 from app import app
+from bootstrap import ensure_schema
 
 if __name__ == '__main__':
+    ensure_schema(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
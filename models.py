@@ -2,7 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+# 조회 라우트의 SELECT는 복제본 바인드로 보낼 수 있는 세션 사용 (db_routing.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """사용자 정보 및 설정 모델"""
@@ -48,7 +51,12 @@ class Conversation(db.Model):
     # 관계 설정
     messages = db.relationship('Message', backref='conversation', lazy=True, cascade='all, delete-orphan', order_by='Message.created_at')
     
-    def to_dict(self):
+    __table_args__ = (
+        db.Index('ix_conversations_user_updated', 'user_id', 'updated_at'),
+    )
+    
+    def to_dict(self, message_count=None):
+        # message_count를 넘기면 메시지 전체를 로드하지 않음
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -57,7 +65,7 @@ class Conversation(db.Model):
             'updated_at': self.updated_at.isoformat(),
             'is_active': self.is_active,
             'is_favorite': self.is_favorite,
-            'message_count': len(self.messages)
+            'message_count': len(self.messages) if message_count is None else message_count
         }
 
 class Message(db.Model):
@@ -123,4 +131,91 @@ class UserSession(db.Model):
             'last_activity': self.last_activity.isoformat(),
             'expires_at': self.expires_at.isoformat(),
             'is_active': self.is_active
-        }
\ No newline at end of file
+        }
+
+class ArchivedConversation(db.Model):
+    """보관(콜드) 대화 - 메시지는 zlib 압축 JSON 묶음 하나로 저장"""
+    __tablename__ = 'archived_conversations'
+    
+    id = db.Column(db.String(36), primary_key=True)  # 원래 대화 ID 유지
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    is_favorite = db.Column(db.Boolean, nullable=False, default=False)
+    
+    # 압축된 메시지 목록 (Message 컬럼 dict 리스트의 JSON)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    messages_blob = db.Column(db.LargeBinary, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_archived_conversations_user_updated', 'user_id', 'updated_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'title': self.title,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'is_active': False,
+            'is_favorite': self.is_favorite,
+            'message_count': self.message_count,
+            'is_archived': True,
+            'archived_at': self.archived_at.isoformat()
+        }
+
+class Domain(db.Model):
+    """인용 도메인 - source_filter 신뢰도/타입 점수를 미리 계산해 저장"""
+    __tablename__ = 'domains'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    host = db.Column(db.String(255), nullable=False, unique=True)
+    trust_score = db.Column(db.Float, nullable=False)
+    source_type = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'host': self.host,
+            'trust_score': self.trust_score,
+            'source_type': self.source_type,
+            'created_at': self.created_at.isoformat()
+        }
+
+class CitationUrl(db.Model):
+    """정규화된 인용 URL (URL 해시로 중복 제거)"""
+    __tablename__ = 'citation_urls'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    url_hash = db.Column(db.String(64), nullable=False, unique=True)  # 정규화 URL의 SHA-256
+    url = db.Column(db.Text, nullable=False)
+    domain_id = db.Column(db.Integer, db.ForeignKey('domains.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    domain = db.relationship('Domain', backref='urls')
+
+class MessageCitation(db.Model):
+    """메시지 - 인용 URL 연결 (메시지 내 인용 순서 유지)"""
+    __tablename__ = 'message_citations'
+    
+    message_id = db.Column(db.String(36), db.ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    citation_url_id = db.Column(db.Integer, db.ForeignKey('citation_urls.id'), nullable=False, index=True)
+
+class ConversationKeyword(db.Model):
+    """사용자별 역색인 (키워드 -> 그 키워드를 질문한 대화), 기본 키 앞부분 (user_id, keyword)로 조회"""
+    __tablename__ = 'conversation_keywords'
+    
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    keyword = db.Column(db.String(64), primary_key=True)
+    conversation_id = db.Column(db.String(36), db.ForeignKey('conversations.id', ondelete='CASCADE'), primary_key=True)
+    hits = db.Column(db.Integer, nullable=False, default=1)  # 대화 안에서 이 키워드가 나온 질문 수
+    last_seen_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_conversation_keywords_conversation', 'conversation_id'),
+    )
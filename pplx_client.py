@@ -0,0 +1,102 @@
+"""
+Perplexity chat/completions 호출 클라이언트
+스트리밍(SSE) 응답을 비스트리밍 응답과 같은 형태로 모아 주고,
+청크마다 콜백을 호출해 호출 측이 스트림을 중단할 수 있게 한다
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+# 청크 콜백: (이번 청크 텍스트, 현재까지의 참고자료) -> 계속 받을지 여부
+ChunkCallback = Callable[[str, List[Any]], bool]
+
+# 프로세스별 HTTP 세션 (keep-alive 연결 재사용, 포크된 워커는 새 세션 사용)
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+
+
+def get_session() -> requests.Session:
+    """현재 프로세스의 HTTP 세션 반환 (포크 후에는 부모의 소켓을 공유하지 않도록 새로 생성)"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        _session = requests.Session()
+        _session_pid = os.getpid()
+    return _session
+
+
+def warm_connection(url: str, timeout: float = 2) -> bool:
+    """업스트림 호스트에 미리 연결해 커넥션 풀에 keep-alive 연결을 만들어 둠"""
+    try:
+        get_session().head(url, timeout=timeout).close()
+        return True
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"업스트림 연결 예열 실패: {e}")
+        return False
+
+
+def _iter_sse_data(response: requests.Response):
+    """SSE 스트림에서 data: 줄의 JSON 객체를 순서대로 반환"""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[5:].strip()
+        if data == '[DONE]':
+            break
+        try:
+            yield json.loads(data)
+        except ValueError:
+            logging.warning(f"스트리밍 청크 파싱 실패: {data[:100]}")
+
+
+def _collect_stream(response: requests.Response, on_chunk: Optional[ChunkCallback]) -> Dict[str, Any]:
+    """스트리밍 응답을 모아 비스트리밍 응답 형태의 dict로 변환"""
+    parts: List[str] = []
+    result: Dict[str, Any] = {"citations": [], "stream_aborted": False}
+
+    try:
+        for chunk in _iter_sse_data(response):
+            for key in ("id", "model", "created", "usage"):
+                if key in chunk:
+                    result[key] = chunk[key]
+            if chunk.get("citations"):
+                result["citations"] = chunk["citations"]
+            if chunk.get("related_questions"):
+                result["related_questions"] = chunk["related_questions"]
+
+            choices = chunk.get("choices") or [{}]
+            piece = (choices[0].get("delta") or {}).get("content") or ""
+            parts.append(piece)
+
+            if on_chunk is not None and not on_chunk(piece, result["citations"]):
+                result["stream_aborted"] = True
+                break
+    finally:
+        response.close()
+
+    result["choices"] = [{"index": 0, "message": {"role": "assistant", "content": ''.join(parts)}}]
+    return result
+
+
+def request_chat_completion(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: float = 30,
+                            on_chunk: Optional[ChunkCallback] = None) -> Dict[str, Any]:
+    """chat/completions 요청 후 응답 JSON 반환
+
+    payload["stream"]이 True이면 SSE 스트림을 읽어 비스트리밍 응답과 같은 형태로 모은다
+    on_chunk가 False를 반환하면 스트림을 중단하고 결과에 stream_aborted=True를 표시한다
+    HTTP 오류는 requests.exceptions.HTTPError로 전달된다
+    """
+    stream = bool(payload.get("stream"))
+    response = get_session().post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError:
+        response.close()
+        raise
+
+    if stream:
+        return _collect_stream(response, on_chunk)
+    return response.json()
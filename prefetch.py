@@ -0,0 +1,183 @@
+"""
+관련 질문 추측 선조회(speculative prefetch)
+답변과 함께 받은 관련 질문 중 상위 N개를 낮은 우선순위 백그라운드 스레드에서 미리 답변해
+답변 캐시에 넣어 두고, 사용자가 관련 질문을 누르면 업스트림 호출 없이 바로 응답한다
+업스트림 비용이 드는 기능이므로 기본은 꺼져 있고(PREFETCH_ENABLED), 사용자별/전체 시간당 예산을 둔다
+
+답변 캐시는 워커 간 공유 캐시(shared_cache의 answers 이름공간)에 두어 어느 워커가 선조회했든 적중하며,
+같은 질문을 여러 워커가 동시에 선조회해도 업스트림은 한 번만 호출한다 (예산/통계는 워커별)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from shared_cache import shared_cache
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "false").lower() == "true"
+PREFETCH_TOP_N = int(os.environ.get("PREFETCH_TOP_N", "2"))
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "2"))
+PREFETCH_QUEUE_MAX = int(os.environ.get("PREFETCH_QUEUE_MAX", "50"))
+# 시간당 선조회 예산 (선조회한 질문 수 기준)
+PREFETCH_USER_BUDGET = int(os.environ.get("PREFETCH_USER_BUDGET", "20"))
+PREFETCH_GLOBAL_BUDGET = int(os.environ.get("PREFETCH_GLOBAL_BUDGET", "500"))
+PREFETCH_TTL = int(os.environ.get("PREFETCH_TTL", "600"))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "1000"))
+
+BUDGET_WINDOW_SECONDS = 3600
+PREFETCH_NICE = 10  # 작업 스레드 nice 값 (요청 처리 스레드보다 낮은 우선순위)
+
+
+def normalize_question(question: str) -> str:
+    """캐시 키용 질문 정규화 (공백 축약, 소문자, 끝 물음표 제거)"""
+    return " ".join(question.lower().split()).rstrip("?？ ")
+
+
+def answer_key(question: str, search_scope: str, model: str) -> tuple:
+    return normalize_question(question), search_scope, model
+
+
+class BudgetWindow:
+    """최근 window초 동안의 사용량으로 사용자별/전체 예산 확인 (스레드 안전)"""
+
+    def __init__(self, per_user: int, global_limit: int, window: float = BUDGET_WINDOW_SECONDS):
+        self.per_user = per_user
+        self.global_limit = global_limit
+        self.window = window
+        self._global: Deque[float] = deque()
+        self._users: Dict[str, Deque[float]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def _trim(self, events: Deque[float], now: float):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def try_acquire(self, user_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            user_events = self._users[user_id]
+            self._trim(self._global, now)
+            self._trim(user_events, now)
+            if len(self._global) >= self.global_limit or len(user_events) >= self.per_user:
+                if not user_events:
+                    del self._users[user_id]
+                return False
+            self._global.append(now)
+            user_events.append(now)
+            return True
+
+
+def _lower_thread_priority():
+    """작업 스레드 우선순위 낮추기 (Linux는 스레드 단위로 nice 적용, 지원하지 않으면 무시)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+class Prefetcher:
+    """관련 질문 선조회 스케줄러 + 답변 캐시 + 적중률 통계"""
+
+    def __init__(self, answer_fn: Callable[[str, str, str], Dict[str, Any]],
+                 workers: int = PREFETCH_WORKERS, top_n: int = PREFETCH_TOP_N,
+                 queue_max: int = PREFETCH_QUEUE_MAX):
+        self.answer_fn = answer_fn
+        self.top_n = top_n
+        self.queue_max = queue_max
+        self.cache = shared_cache.namespace("answers", ttl=PREFETCH_TTL, max_entries=ANSWER_CACHE_SIZE)
+        self.budget = BudgetWindow(PREFETCH_USER_BUDGET, PREFETCH_GLOBAL_BUDGET)
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            "scheduled": 0,
+            "completed": 0,
+            "failed": 0,
+            "skipped_budget": 0,
+            "skipped_queue": 0,
+            "skipped_cached": 0,
+            "hits": 0,
+            "lookups": 0
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # 포크된 워커에서는 부모의 스레드 풀을 쓸 수 없으므로 프로세스별로 생성
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="prefetch",
+                                                    initializer=_lower_thread_priority)
+                self._executor_pid = os.getpid()
+                self._inflight = set()
+            return self._executor
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def schedule(self, user_id: str, questions: List[str], search_scope: str, model: str) -> int:
+        """관련 질문 상위 N개를 예산 안에서 선조회 예약하고 예약한 개수 반환"""
+        executor = self._get_executor()
+        scheduled = 0
+        for question in questions[:self.top_n]:
+            if not isinstance(question, str) or not question.strip():
+                continue
+            key = answer_key(question, search_scope, model)
+
+            with self._lock:
+                if key in self._inflight or key in self.cache:
+                    self.stats["skipped_cached"] += 1
+                    continue
+                if len(self._inflight) >= self.queue_max:
+                    self.stats["skipped_queue"] += 1
+                    continue
+            if not self.budget.try_acquire(user_id):
+                self._count("skipped_budget")
+                continue
+
+            with self._lock:
+                self._inflight.add(key)
+                self.stats["scheduled"] += 1
+            executor.submit(self._run, key, question, search_scope, model)
+            scheduled += 1
+        return scheduled
+
+    def _run(self, key: tuple, question: str, search_scope: str, model: str):
+        try:
+            self.cache.get_or_compute(key, lambda: self.answer_fn(question, search_scope, model))
+            self._count("completed")
+        except Exception as e:
+            self._count("failed")
+            logging.warning(f"관련 질문 선조회 실패 ({question[:30]}): {e}")
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def lookup(self, question: str, search_scope: str, model: str) -> Optional[Dict[str, Any]]:
+        """선조회된 답변이 있으면 반환 (적중 통계 기록)"""
+        result = self.cache.get(answer_key(question, search_scope, model))
+        with self._lock:
+            self.stats["lookups"] += 1
+            if result is not None:
+                self.stats["hits"] += 1
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """통계 (hit_rate: 선조회 완료 대비 실제 사용 비율, lookup_hit_rate: 전체 질문 대비 적중 비율)"""
+        with self._lock:
+            stats = dict(self.stats)
+            inflight = len(self._inflight)
+        stats.update({
+            "enabled": PREFETCH_ENABLED,
+            "inflight": inflight,
+            "cached": len(self.cache),
+            "cache": self.cache.stats(),
+            "hit_rate": round(stats["hits"] / stats["completed"], 4) if stats["completed"] else 0.0,
+            "lookup_hit_rate": round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        })
+        return stats
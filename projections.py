@@ -0,0 +1,214 @@
+"""
+목록 조회용 컬럼 프로젝션
+대화/메시지 목록을 ORM 인스턴스로 만들지 않고 필요한 컬럼만 SELECT 해서
+응답용 dict로 바로 변환한다 (datetime은 JSON 프로바이더가 직렬화)
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, false, func, or_, select
+from sqlalchemy.sql import Select
+
+from models import db, Conversation, Message
+
+# 대화별 메시지 수 (상관 서브쿼리, 대화 목록 한 번의 쿼리로 함께 조회)
+_message_count = (
+    select(func.count(Message.id))
+    .where(Message.conversation_id == Conversation.id)
+    .correlate(Conversation)
+    .scalar_subquery()
+    .label('message_count')
+)
+
+CONVERSATION_COLUMNS = (
+    Conversation.id,
+    Conversation.user_id,
+    Conversation.title,
+    Conversation.created_at,
+    Conversation.updated_at,
+    Conversation.is_active,
+    Conversation.is_favorite
+)
+
+CONVERSATION_LIST_COLUMNS = (*CONVERSATION_COLUMNS, _message_count)
+
+MESSAGE_COLUMNS = (
+    Message.id,
+    Message.conversation_id,
+    Message.user_id,
+    Message.content,
+    Message.message_type,
+    Message.question_type,
+    Message.citations,
+    Message.search_scope,
+    Message.created_at,
+    Message.processing_time
+)
+
+# 사이드바 날짜 그룹 (즐겨찾기 우선, 나머지는 UTC 기준 수정일)
+CONVERSATION_BUCKETS = ('favorites', 'today', 'yesterday', 'this_week', 'older')
+
+HISTORY_COLUMNS = (
+    Message.message_type,
+    Message.content,
+    Message.created_at,
+    Message.question_type,
+    Message.citations
+)
+
+
+def conversation_list_select(*criteria: Any) -> Select:
+    """대화 목록 SELECT (Conversation.to_dict()와 같은 키 + message_count)"""
+    return select(*CONVERSATION_LIST_COLUMNS).where(*criteria)
+
+
+def paginate_rows(stmt: Select, page: int, per_page: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """프로젝션 SELECT를 페이지 단위로 실행 (Flask-SQLAlchemy paginate와 같은 메타데이터 반환)"""
+    page = max(1, page)
+    per_page = max(1, per_page)
+
+    total = db.session.execute(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    ).scalar_one()
+    rows = db.session.execute(stmt.limit(per_page).offset((page - 1) * per_page)).mappings().all()
+
+    pages = (total + per_page - 1) // per_page if total else 0
+    pagination = {
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'total': total,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+    return [dict(row) for row in rows], pagination
+
+
+def _bucket_pagination(count: int, page: int, per_page: int) -> Dict[str, Any]:
+    pages = (count + per_page - 1) // per_page if count else 0
+    return {
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'total': count,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+
+def conversation_buckets(criteria: List[Any], pages: Dict[str, int], per_page: int,
+                         now: Optional[datetime] = None) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """대화 목록을 DB에서 날짜 그룹으로 나눠 그룹별 개수와 그룹별 페이지를 한 번의 쿼리로 조회
+
+    Args:
+        criteria: 대화 필터 조건 (사용자, 검색어)
+        pages: 그룹별 페이지 번호 (없는 그룹은 행을 가져오지 않고 개수만 반환)
+        per_page: 그룹별 페이지 크기
+
+    Returns:
+        tuple: (그룹별 대화 목록, 그룹별 페이지네이션 정보)
+    """
+    per_page = max(1, per_page)
+    pages = {name: max(1, page) for name, page in pages.items() if name in CONVERSATION_BUCKETS}
+
+    # 그룹 경계는 파이썬에서 한 번 계산해 바인드 파라미터로 넘김 (DB 방언별 날짜 함수 차이 회피)
+    today_start = datetime.combine((now or datetime.utcnow()).date(), datetime.min.time())
+    bucket = case(
+        (Conversation.is_favorite, 'favorites'),
+        (Conversation.updated_at >= today_start, 'today'),
+        (Conversation.updated_at >= today_start - timedelta(days=1), 'yesterday'),
+        (Conversation.updated_at >= today_start - timedelta(days=7), 'this_week'),
+        else_='older'
+    )
+
+    ranked = (
+        select(
+            *CONVERSATION_COLUMNS,
+            bucket.label('bucket'),
+            func.row_number().over(
+                partition_by=bucket,
+                order_by=(Conversation.updated_at.desc(), Conversation.id)
+            ).label('position')
+        )
+        .where(*criteria)
+        .cte('ranked_conversations')
+    )
+    counts = (
+        select(ranked.c.bucket, func.count().label('bucket_count'))
+        .group_by(ranked.c.bucket)
+        .cte('bucket_counts')
+    )
+
+    # 그룹별로 요청한 페이지 구간의 행만 조인 (행이 없는 그룹도 개수 행은 남음)
+    windows = [
+        and_(ranked.c.bucket == name,
+             ranked.c.position > (page - 1) * per_page,
+             ranked.c.position <= page * per_page)
+        for name, page in pages.items()
+    ]
+    message_count = (
+        select(func.count(Message.id))
+        .where(Message.conversation_id == ranked.c.id)
+        .scalar_subquery()
+        .label('message_count')
+    )
+    stmt = (
+        select(counts.c.bucket, counts.c.bucket_count,
+               *(ranked.c[column.key] for column in CONVERSATION_COLUMNS),
+               message_count)
+        .select_from(counts.outerjoin(
+            ranked,
+            and_(ranked.c.bucket == counts.c.bucket, or_(*windows) if windows else false())
+        ))
+        .order_by(counts.c.bucket, ranked.c.position)
+    )
+
+    grouped = {name: [] for name in CONVERSATION_BUCKETS}
+    bucket_counts = dict.fromkeys(CONVERSATION_BUCKETS, 0)
+    for row in db.session.execute(stmt).mappings():
+        row = dict(row)
+        name = row.pop('bucket')
+        bucket_counts[name] = row.pop('bucket_count')
+        if row['id'] is not None:
+            grouped[name].append(row)
+
+    pagination = {
+        name: _bucket_pagination(bucket_counts[name], pages.get(name, 1), per_page)
+        for name in CONVERSATION_BUCKETS
+    }
+    return grouped, pagination
+
+
+def message_dicts(conversation_id: str) -> List[Dict[str, Any]]:
+    """대화의 메시지 목록 (Message.to_dict()와 같은 키)"""
+    stmt = (
+        select(*MESSAGE_COLUMNS)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at.asc())
+    )
+    return [dict(row) for row in db.session.execute(stmt).mappings()]
+
+
+def history_entries(conversation_id: str, user_name: str) -> List[Dict[str, Any]]:
+    """채팅 화면 복원용 메시지 기록 (type/content/timestamp/question_type 형식)"""
+    stmt = (
+        select(*HISTORY_COLUMNS)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at)
+    )
+
+    entries = []
+    for message_type, content, created_at, question_type, citations in db.session.execute(stmt):
+        entry = {
+            'type': message_type,
+            'content': content,
+            'timestamp': created_at,
+            'question_type': question_type
+        }
+        if message_type == 'assistant' and citations:
+            entry['citations'] = citations
+        if message_type == 'user':
+            entry['user_name'] = user_name
+        entries.append(entry)
+    return entries
@@ -0,0 +1,168 @@
+"""
+증분 답변 품질 채점기
+스트리밍으로 도착하는 답변 청크를 한 번씩만 검사하면서 품질 지표를 누적하고,
+답변이 끝나기 전에 최종 점수가 낮을지 예측한다
+최종 점수는 evaluate_response_quality()의 기존 채점 규칙과 정확히 일치해야 한다
+(tools/quality_golden.py로 검증)
+"""
+
+from typing import Any, Dict, List, Optional
+
+# 구조 지표: (지표 이름, 포함 여부를 확인할 패턴들)
+STRUCTURE_FEATURES = [
+    ("bold", ("**",)),
+    ("heading", ("##",)),
+    ("list", ("\n-", "\n•")),
+    ("paragraph", ("\n\n",)),
+    ("colon", (":",))
+]
+
+# 콘텐츠 지표 (문장 수 지표는 마침표 개수로 따로 계산)
+CONTENT_FEATURES = [
+    ("example", ("예시", "예를 들어")),
+    ("conclusion", ("요약", "결론")),
+    ("systematic", ("정의", "의미", "특징", "방법", "종류")),
+    ("connective", ("다음", "이러한"))
+]
+
+# 청크 경계에 걸친 패턴을 찾기 위해 이전 텍스트 끝부분을 유지할 길이
+_CARRY_LENGTH = max(len(p) for _, patterns in STRUCTURE_FEATURES + CONTENT_FEATURES for p in patterns) - 1
+
+# 아직 나타나지 않은 지표가 이후에 나타날 사전 확률 (조기 예측용)
+# 마크다운 구조는 보통 답변 앞부분에 나타나고, 요약/결론은 끝에 나타난다
+LATE_FEATURE_PRIORS = {
+    "bold": 0.5,
+    "heading": 0.4,
+    "list": 0.5,
+    "paragraph": 0.7,
+    "colon": 0.6,
+    "example": 0.4,
+    "conclusion": 0.8,
+    "sentences": 0.9,
+    "systematic": 0.5,
+    "connective": 0.5
+}
+
+# 조기 예측을 시작할 최소 글자 수와, 사전 확률이 0으로 감소하는 글자 수
+EARLY_DECISION_CHARS = 400
+PRIOR_DECAY_CHARS = 2000
+
+
+def length_score(length: int) -> int:
+    """길이 점수 (25점 만점)"""
+    if length >= 300:
+        return 25
+    elif length >= 200:
+        return 20
+    elif length >= 100:
+        return 15
+    return 10
+
+
+def citation_score(citations: Optional[List[Any]], question_type: str) -> int:
+    """참고자료 점수 (25점 만점)"""
+    citation_count = len(citations) if citations else 0
+    if citation_count >= 3:
+        return 25
+    elif citation_count >= 2:
+        return 20
+    elif citation_count >= 1:
+        return 15
+    return 5 if question_type == 'greeting' else 0
+
+
+_STRUCTURE_NAMES = frozenset(name for name, _ in STRUCTURE_FEATURES)
+_CONTENT_NAMES = frozenset(name for name, _ in CONTENT_FEATURES)
+_ALL_FEATURES = tuple(STRUCTURE_FEATURES + CONTENT_FEATURES)
+
+
+class IncrementalQualityScorer:
+    """청크 단위로 답변을 받아 품질 지표를 누적하는 채점기"""
+
+    __slots__ = ('question_type', 'length', 'dot_count', 'found', '_pending', '_carry')
+
+    def __init__(self, question_type: str):
+        self.question_type = question_type
+        self.length = 0
+        self.dot_count = 0
+        self.found = set()
+        self._pending = _ALL_FEATURES
+        self._carry = ""
+
+    def feed(self, chunk: str) -> "IncrementalQualityScorer":
+        """답변 청크 누적 (이미 찾은 지표는 더 이상 검사하지 않음)"""
+        if not chunk:
+            return self
+
+        self.length += len(chunk)
+        if self.dot_count < 2:
+            self.dot_count += chunk.count('.')
+
+        if self._pending:
+            window = self._carry + chunk if self._carry else chunk
+            still_pending = []
+            for feature in self._pending:
+                for pattern in feature[1]:
+                    if pattern in window:
+                        self.found.add(feature[0])
+                        break
+                else:
+                    still_pending.append(feature)
+            if len(still_pending) != len(self._pending):
+                self._pending = tuple(still_pending)
+            self._carry = window[-_CARRY_LENGTH:]
+
+        return self
+
+    def _counts(self):
+        """(구조 지표 수, 콘텐츠 지표 수) - 문장 수 지표 포함"""
+        structure = len(self.found & _STRUCTURE_NAMES)
+        content = len(self.found & _CONTENT_NAMES) + (self.dot_count >= 2)
+        return structure, content
+
+    def score(self, citations: Optional[List[Any]]) -> Dict[str, int]:
+        """현재까지 받은 텍스트 기준 점수 (답변 완료 후 호출하면 최종 점수)"""
+        structure, content = self._counts()
+
+        score = {
+            'length_score': length_score(self.length),
+            'structure_score': min(25, structure * 5),
+            'citation_score': citation_score(citations, self.question_type),
+            'content_score': min(25, content * 5),
+            'total_score': 0
+        }
+        score['total_score'] = sum([
+            score['length_score'],
+            score['structure_score'],
+            score['citation_score'],
+            score['content_score']
+        ])
+        return score
+
+    def predicted_score(self, citations: Optional[List[Any]]) -> float:
+        """최종 점수 예측치
+
+        이미 나타난 지표는 확정 점수로, 아직 나타나지 않은 지표는 사전 확률에
+        지금까지 읽은 분량만큼 감쇠를 적용한 기대 점수로 계산한다
+        스트리밍 중인 답변은 계속 길어지므로 길이 점수는 만점으로 본다
+        """
+        structure, content = self._counts()
+        decay = max(0.0, 1 - self.length / PRIOR_DECAY_CHARS)
+
+        expected_structure = structure * 5.0
+        expected_content = content * 5.0
+        for name, _ in self._pending:
+            if name in _STRUCTURE_NAMES:
+                expected_structure += 5.0 * LATE_FEATURE_PRIORS[name] * decay
+            else:
+                expected_content += 5.0 * LATE_FEATURE_PRIORS[name] * decay
+        if self.dot_count < 2:
+            expected_content += 5.0 * LATE_FEATURE_PRIORS["sentences"] * decay
+
+        return 25 + min(25.0, expected_structure) + min(25.0, expected_content) + citation_score(citations, self.question_type)
+
+    def predicts_low(self, threshold: float, citations: Optional[List[Any]]) -> bool:
+        """충분한 분량을 읽은 뒤 최종 점수가 기준 미달일 것으로 예측되는지 여부"""
+        if self.length < EARLY_DECISION_CHARS:
+            return False
+        return self.predicted_score(citations) < threshold
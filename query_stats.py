@@ -0,0 +1,216 @@
+"""
+요청별 쿼리 계측과 N+1 탐지
+SQLAlchemy 이벤트로 요청마다 쿼리 수, DB 시간, 커넥션 풀 대기 시간, pool_pre_ping 시간,
+같은 문장(지문)의 반복 횟수를 모으고 로그와 디버그 응답 헤더(X-Query-Stats)로 내보낸다
+한 요청에서 같은 문장이 QUERY_REPEAT_THRESHOLD번 이상 실행되면 N+1 의심 경고를 남긴다
+
+쿼리 수 상한 검사 (회귀 방지):
+    with assert_max_queries(app, 3):
+        client.get('/api/conversations')
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Tuple
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db
+
+QUERY_STATS = os.environ.get("QUERY_STATS", "false").lower() == "true"
+# 응답 헤더 출력 (기본: 디버그 모드에서만)
+QUERY_STATS_HEADER = os.environ.get("QUERY_STATS_HEADER", "false").lower() == "true"
+QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", "5"))
+SLOW_REQUEST_QUERIES = int(os.environ.get("SLOW_REQUEST_QUERIES", "20"))
+
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """파라미터 개수만 다른 문장(IN 목록 등)이 같은 지문이 되도록 정규화"""
+    statement = _POSTCOMPILE.sub("(?)", statement)
+    statement = _IN_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """쿼리 통계 수집기 (요청 하나 또는 assert_max_queries 블록 하나)"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.checkouts = 0
+        self.checkout_time = 0.0
+        self.pings = 0
+        self.ping_time = 0.0
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.db_time * 1000, 2),
+            "checkouts": self.checkouts,
+            # 풀 대기 = 커넥션 획득 전체 시간 - pre-ping 시간
+            "pool_wait_ms": round(max(self.checkout_time - self.ping_time, 0.0) * 1000, 2),
+            "pings": self.pings,
+            "ping_ms": round(self.ping_time * 1000, 2),
+            "repeated": len(self.repeated())
+        }
+
+    def header_value(self) -> str:
+        return ", ".join(f"{key}={value}" for key, value in self.summary().items())
+
+
+# 현재 스레드에서 활성화된 수집기 (요청 수집기와 assert_max_queries 수집기가 겹칠 수 있음)
+_active = threading.local()
+
+
+def _collectors() -> List[QueryStats]:
+    return getattr(_active, "stack", [])
+
+
+def _start(stats: QueryStats):
+    _active.__dict__.setdefault("stack", []).append(stats)
+
+
+def _stop(stats: QueryStats):
+    stack = _collectors()
+    if stats in stack:
+        stack.remove(stats)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """블록 안에서 실행된 쿼리 통계 수집"""
+    stats = QueryStats()
+    _start(stats)
+    try:
+        yield stats
+    finally:
+        _stop(stats)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors()
+    started = conn.info.get("query_started")
+    if not collectors or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    key = fingerprint(statement)
+    for stats in collectors:
+        stats.count += 1
+        stats.db_time += elapsed
+        stats.statements[key] += 1
+
+
+def _timed(func, on_elapsed):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if _collectors():
+                on_elapsed(time.perf_counter() - started)
+    wrapper.__query_stats__ = True
+    return wrapper
+
+
+def _record_checkout(elapsed: float):
+    for stats in _collectors():
+        stats.checkouts += 1
+        stats.checkout_time += elapsed
+
+
+def _record_ping(elapsed: float):
+    for stats in _collectors():
+        stats.pings += 1
+        stats.ping_time += elapsed
+
+
+def _instrument_pool(engine: Engine):
+    """풀 커넥션 획득과 pre-ping 시간을 측정하도록 감쌈 (이벤트가 없는 구간이라 메서드를 감싼다)"""
+    if not getattr(engine.pool.connect, "__query_stats__", False):
+        engine.pool.connect = _timed(engine.pool.connect, _record_checkout)
+    if not getattr(engine.dialect.do_ping, "__query_stats__", False):
+        engine.dialect.do_ping = _timed(engine.dialect.do_ping, _record_ping)
+
+
+def instrument_engines(app: Flask):
+    """앱의 모든 엔진(복제본 바인드 포함)에 계측 이벤트 등록 (여러 번 호출해도 한 번만 등록)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            _instrument_pool(engine)
+            if not event.contains(engine, "engine_disposed", _instrument_pool):
+                # dispose()는 풀을 새로 만들므로 다시 감싼다 (포크된 워커 정리 등)
+                event.listen(engine, "engine_disposed", _instrument_pool)
+
+
+@contextmanager
+def assert_max_queries(app: Flask, max_count: int) -> Iterator[QueryStats]:
+    """블록 안의 쿼리 수가 max_count를 넘으면 AssertionError (N+1 회귀 검사용)"""
+    instrument_engines(app)
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_count:
+        details = "\n".join(f"  {count}x {statement[:160]}" for statement, count in stats.statements.most_common(5))
+        raise AssertionError(f"쿼리 {stats.count}개 실행 (최대 {max_count}개)\n{details}")
+
+
+def init_query_stats(app: Flask):
+    """QUERY_STATS=true면 요청별 쿼리 통계를 로그와 X-Query-Stats 헤더로 내보냄"""
+    if not QUERY_STATS:
+        return
+    instrument_engines(app)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats()
+        _start(g.query_stats)
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+
+        summary = stats.summary()
+        label = f"{request.method} {request.path}"
+        logging.debug(f"쿼리 통계 {label}: {summary}")
+        for statement, count in stats.repeated():
+            logging.warning(f"N+1 의심 {label}: 같은 쿼리 {count}회 실행 - {statement[:200]}")
+        if stats.count >= SLOW_REQUEST_QUERIES:
+            logging.warning(f"쿼리 과다 {label}: {stats.count}개")
+
+        if QUERY_STATS_HEADER or app.debug:
+            response.headers["X-Query-Stats"] = stats.header_value()
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc):
+        stats = g.pop("query_stats", None)
+        if stats is not None:
+            _stop(stats)
@@ -0,0 +1,265 @@
+"""
+서버 측 세션 저장소 (user_sessions 테이블)
+쿠키에는 임의 토큰만 넣고, 세션 값(user_id, conversation_id)은 DB에 저장한다
+- 토큰은 SHA-256 해시로 저장 (DB가 유출되어도 쿠키를 만들 수 없음)
+- 워커 간 공유 캐시(shared_cache의 sessions 이름공간)를 앞에 두어 매 요청 DB 조회를 피한다
+  쿠키 값은 "토큰.세대"이며 세션을 바꿀 때마다 세대를 새로 발급하므로, 바뀐 세션은
+  세대가 달라 바로 DB에서 다시 읽는다 (폐기는 캐시에서도 지워 바로 반영)
+- 만료는 활동할 때마다 연장(슬라이딩)하되 DB 갱신은 SESSION_TOUCH_INTERVAL마다 한 번만 한다
+- 만료/폐기된 세션은 flask sweep-sessions로 배치 삭제
+
+이 앱의 세션 값은 user_id와 conversation_id 두 개뿐이며, 그 밖의 키는 저장되지 않는다
+"""
+
+import hashlib
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import click
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from sqlalchemy import delete, insert, or_, select, update
+from werkzeug.datastructures import CallbackDict
+
+from models import db, UserSession
+from shared_cache import shared_cache
+
+# db: user_sessions 테이블 사용, cookie: 기존 서명 쿠키 세션 사용
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "db")
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.environ.get("SESSION_CACHE_TTL", "10"))
+SESSION_TOUCH_INTERVAL = int(os.environ.get("SESSION_TOUCH_INTERVAL", "300"))
+
+SWEEP_BATCH_SIZE = 500
+
+# 세션 키 -> user_sessions 컬럼
+SESSION_FIELDS = {
+    "user_id": "user_id",
+    "conversation_id": "current_conversation_id"
+}
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """DB에 저장되는 세션 (변경 여부만 추적하고 값은 SESSION_FIELDS만 저장)"""
+
+    def __init__(self, initial: Optional[Dict[str, Any]] = None, token: Optional[str] = None,
+                 generation: str = "", last_activity: Optional[datetime] = None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.token = token
+        self.generation = generation
+        self.last_activity = last_activity
+        self.new = token is None
+        self.permanent = True
+        self.modified = False
+
+
+# 토큰 해시 -> 세션 레코드 (워커 간 공유, TTL 경과 시 DB에서 다시 읽음)
+session_cache = shared_cache.namespace("sessions", ttl=SESSION_CACHE_TTL, max_entries=SESSION_CACHE_SIZE)
+
+
+def _record_tags(record: Dict[str, Any]) -> List[str]:
+    """사용자/대화 단위로 무효화할 수 있도록 세션 레코드에 다는 태그"""
+    tags = [f"user:{record['user_id']}"]
+    if record.get("current_conversation_id"):
+        tags.append(f"conversation:{record['current_conversation_id']}")
+    return tags
+
+
+def _load_record(token_hash: str, generation: str) -> Optional[Dict[str, Any]]:
+    """유효한 세션 레코드 조회 (세대가 같은 캐시 우선, 만료/폐기된 세션은 None)"""
+    record = session_cache.get(token_hash)
+    if record is None or record["generation"] != generation:
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                select(UserSession.user_id, UserSession.current_conversation_id,
+                       UserSession.last_activity, UserSession.expires_at)
+                .where(UserSession.session_token == token_hash, UserSession.is_active.is_(True))
+            ).mappings().first()
+        if row is None:
+            return None
+        record = {**row, "generation": generation}
+        session_cache.set(token_hash, record, tags=_record_tags(record))
+
+    if record["expires_at"] <= datetime.utcnow():
+        session_cache.delete(token_hash)
+        return None
+    return record
+
+
+class DatabaseSessionInterface(SessionInterface):
+    """user_sessions 테이블 기반 세션 인터페이스"""
+
+    def __init__(self):
+        # 전환 전에 발급된 서명 쿠키 세션은 한 번 읽어서 서버 측 세션으로 옮긴다
+        self.legacy = SecureCookieSessionInterface()
+
+    def open_session(self, app: Flask, request) -> ServerSideSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return ServerSideSession()
+
+        token, _, generation = cookie.partition(".")
+        record = _load_record(hash_token(token), generation)
+        if record is not None:
+            data = {key: record[column] for key, column in SESSION_FIELDS.items() if record[column] is not None}
+            return ServerSideSession(data, token=token, generation=generation,
+                                     last_activity=record["last_activity"])
+
+        legacy = self.legacy.open_session(app, request)
+        session = ServerSideSession()
+        if legacy:
+            session.update({key: legacy[key] for key in SESSION_FIELDS if key in legacy})
+        return session
+
+    def save_session(self, app: Flask, session: ServerSideSession, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session.get("user_id"):
+            # 사용자 없는 세션은 저장하지 않음 (비워진 기존 세션은 폐기)
+            if session.token:
+                revoke_session(session.token)
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        now = datetime.utcnow()
+        expires_at = now + app.permanent_session_lifetime
+        values = {column: session.get(key) for key, column in SESSION_FIELDS.items()}
+
+        if session.new:
+            session.token = secrets.token_urlsafe(32)
+            token_hash = hash_token(session.token)
+            with db.engine.begin() as connection:
+                connection.execute(insert(UserSession).values(
+                    session_token=token_hash, created_at=now, last_activity=now,
+                    expires_at=expires_at, is_active=True, **values
+                ))
+        else:
+            touch = session.last_activity is None or \
+                now - session.last_activity >= timedelta(seconds=SESSION_TOUCH_INTERVAL)
+            if not (session.modified or touch):
+                return
+
+            token_hash = hash_token(session.token)
+            changes = dict(values) if session.modified else {}
+            if touch:
+                changes.update(last_activity=now, expires_at=expires_at)
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(UserSession).where(UserSession.session_token == token_hash).values(**changes)
+                )
+
+        # 값이 바뀌면 새 세대를 발급해 다른 워커의 캐시를 무효화
+        if session.new or session.modified:
+            session.generation = secrets.token_hex(4)
+        session_cache.delete(token_hash)
+        response.set_cookie(
+            cookie_name,
+            f"{session.token}.{session.generation}",
+            expires=expires_at,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+        response.vary.add("Cookie")
+
+
+def revoke_session(token: str):
+    """세션 하나 폐기 (공유 캐시에서도 지우므로 모든 워커에 바로 반영)"""
+    token_hash = hash_token(token)
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(UserSession).where(UserSession.session_token == token_hash).values(is_active=False)
+        )
+    session_cache.delete(token_hash)
+
+
+def revoke_user_sessions(user_id: str) -> int:
+    """사용자의 모든 세션 폐기"""
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.is_active.is_(True))
+            .values(is_active=False)
+        )
+    session_cache.delete_tagged([f"user:{user_id}"])
+    return result.rowcount
+
+
+def detach_conversations(conversation_ids: Iterable[str]):
+    """삭제할 대화를 가리키는 세션 연결 해제 (호출한 트랜잭션 안에서 실행)"""
+    conversation_ids = list(conversation_ids)
+    db.session.execute(
+        update(UserSession)
+        .where(UserSession.current_conversation_id.in_(conversation_ids))
+        .values(current_conversation_id=None)
+    )
+    session_cache.delete_tagged(f"conversation:{conversation_id}" for conversation_id in conversation_ids)
+
+
+def sweep_expired_sessions(batch_size: int = SWEEP_BATCH_SIZE, sleep_seconds: float = 0.0,
+                           max_batches: Optional[int] = None,
+                           progress: Optional[Callable[[int], None]] = None) -> int:
+    """만료/폐기된 세션을 배치 단위로 삭제하고 삭제한 수 반환 (배치마다 커밋)"""
+    now = datetime.utcnow()
+    expired = or_(UserSession.expires_at < now, UserSession.is_active.is_(False))
+    deleted = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            select(UserSession.id).where(expired).order_by(UserSession.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.session.execute(delete(UserSession).where(UserSession.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        batches += 1
+        if progress:
+            progress(deleted)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return deleted
+
+
+def init_session_store(app: Flask):
+    """SESSION_BACKEND=db면 서버 측 세션 인터페이스 사용"""
+    if SESSION_BACKEND == "db":
+        app.session_interface = DatabaseSessionInterface()
+
+
+def register_session_commands(app: Flask):
+    """flask sweep-sessions / revoke-sessions 명령 등록"""
+
+    @app.cli.command("sweep-sessions")
+    @click.option("--batch-size", default=SWEEP_BATCH_SIZE, show_default=True)
+    @click.option("--sleep", "sleep_seconds", default=0.0, show_default=True, help="배치 사이 대기 시간(초)")
+    @click.option("--max-batches", default=None, type=int, help="이번 실행에서 처리할 최대 배치 수")
+    def sweep_sessions(batch_size, sleep_seconds, max_batches):
+        """만료/폐기된 세션 삭제"""
+        deleted = sweep_expired_sessions(batch_size, sleep_seconds, max_batches,
+                                         lambda done: click.echo(f"삭제 진행: {done}건", err=True))
+        logging.info(f"만료 세션 정리 완료: {deleted}건")
+        click.echo(f"삭제 완료: {deleted}건", err=True)
+
+    @app.cli.command("revoke-sessions")
+    @click.argument("user_id")
+    def revoke_sessions(user_id):
+        """사용자의 모든 세션 폐기"""
+        click.echo(f"폐기 완료: {revoke_user_sessions(user_id)}건", err=True)
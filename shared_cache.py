@@ -0,0 +1,422 @@
+"""
+워커 간 공유 캐시 계층
+같은 호스트의 모든 gunicorn 워커가 함께 쓰는 캐시 (기본: /dev/shm의 SQLite 파일, WAL + mmap)
+워커마다 따로 두는 캐시는 적중률이 워커 수로 나뉘고 같은 값이 워커마다 중복되므로,
+답변 캐시(prefetch)와 세션 캐시(session_store)를 이름공간(namespace)별로 여기에 둔다
+
+- 항목별 TTL, 이름공간별 최대 개수/바이트 제한 (넘으면 만료 항목 -> 오래 쓰지 않은 항목 순으로 제거)
+- get_or_compute: 여러 워커/스레드가 같은 키를 동시에 요청해도 한 곳에서만 계산하고 나머지는 결과를 기다림
+- 태그: 항목에 태그를 달아 한 번에 무효화 (예: 사용자의 모든 세션)
+- 이름공간별 통계 (워커 합산, SHARED_CACHE_STATS_FLUSH초마다 반영): flask cache-stats
+
+값은 pickle로 저장하므로 캐시 파일은 앱 사용자만 읽고 쓸 수 있게(0600) 만든다
+SHARED_CACHE_PATH=:memory:이면 같은 인터페이스로 프로세스 내 메모리 DB를 쓴다 (워커별 캐시, 검사 도구용)
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional
+
+import click
+from flask import Flask
+
+
+def _default_path() -> str:
+    # 같은 앱 디렉터리 + 같은 DB를 쓰는 프로세스끼리만 공유 (tmpfs가 있으면 메모리에 둠)
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    scope = hashlib.sha256(f"{os.getcwd()}|{os.environ.get('DATABASE_URL', '')}".encode()).hexdigest()[:12]
+    return os.path.join(directory, f"search-cache-{scope}.sqlite")
+
+
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH") or _default_path()
+SHARED_CACHE_MMAP_SIZE = int(os.environ.get("SHARED_CACHE_MMAP_SIZE", str(64 * 1024 * 1024)))
+# 이름공간별 기본 최대 크기
+SHARED_CACHE_NAMESPACE_MAX_MB = float(os.environ.get("SHARED_CACHE_NAMESPACE_MAX_MB", "64"))
+# 조회 시 LRU 접근 시각 갱신 간격 (조회마다 쓰기를 하지 않도록)
+SHARED_CACHE_TOUCH_SECONDS = float(os.environ.get("SHARED_CACHE_TOUCH_SECONDS", "5"))
+SHARED_CACHE_STATS_FLUSH = float(os.environ.get("SHARED_CACHE_STATS_FLUSH", "5"))
+# get_or_compute 계산 락 유지 시간 (계산하던 워커가 죽어도 이 시간이 지나면 다른 워커가 계산)
+SHARED_CACHE_LOCK_TIMEOUT = float(os.environ.get("SHARED_CACHE_LOCK_TIMEOUT", "60"))
+SHARED_CACHE_POLL_SECONDS = 0.05
+
+STAT_FIELDS = ("hits", "misses", "sets", "evictions", "computes", "compute_waits")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    tags TEXT NOT NULL DEFAULT '',
+    UNIQUE (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_lru ON cache_entries (namespace, accessed_at);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_expiry ON cache_entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS cache_locks (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    sets INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0,
+    computes INTEGER NOT NULL DEFAULT 0,
+    compute_waits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_MISSING = object()
+
+
+def encode_key(key: Hashable) -> str:
+    """캐시 키를 문자열로 (튜플 키는 JSON 배열)"""
+    if isinstance(key, str):
+        return key
+    return json.dumps(key, ensure_ascii=False, default=str)
+
+
+def _tag_text(tags: Iterable[str]) -> str:
+    tags = [tag for tag in tags if tag]
+    return f"|{'|'.join(tags)}|" if tags else ""
+
+
+class SharedCacheStore:
+    """캐시 파일 하나 (파일 모드: 스레드별 커넥션, 메모리 모드: 커넥션 하나를 락으로 공유)"""
+
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        self.path = path
+        self.in_memory = path == ":memory:"
+        self._local = threading.local()
+        self._memory_connection: Optional[sqlite3.Connection] = None
+        self._memory_pid: Optional[int] = None
+        self._memory_lock = threading.RLock()
+        self._namespaces: Dict[str, "CacheNamespace"] = {}
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Counter] = {}
+        self._pending_pid = os.getpid()
+        self._flushed_at = time.monotonic()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self.in_memory and not os.path.exists(self.path):
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=not self.in_memory)
+        if not self.in_memory:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")  # 캐시라 유실돼도 다시 계산하면 됨
+            connection.execute(f"PRAGMA mmap_size={SHARED_CACHE_MMAP_SIZE}")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """현재 스레드가 쓸 커넥션 (포크된 워커는 새로 연결)"""
+        pid = os.getpid()
+        if self.in_memory:
+            with self._memory_lock:
+                if self._memory_connection is None or self._memory_pid != pid:
+                    self._memory_connection = self._connect()
+                    self._memory_pid = pid
+                yield self._memory_connection
+            return
+        if getattr(self._local, "pid", None) != pid:
+            self._local.connection = self._connect()
+            self._local.pid = pid
+        yield self._local.connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션 (BEGIN IMMEDIATE로 시작해 워커 간 쓰기 충돌을 대기로 처리)"""
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def namespace(self, name: str, ttl: float, max_entries: int,
+                  max_bytes: float = SHARED_CACHE_NAMESPACE_MAX_MB * 1024 * 1024) -> "CacheNamespace":
+        """이름공간 등록 (같은 이름이면 기존 객체 반환)"""
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = CacheNamespace(self, name, ttl, max_entries, max_bytes)
+            return self._namespaces[name]
+
+    def count(self, namespace: str, field: str, amount: int = 1):
+        with self._lock:
+            if self._pending_pid != os.getpid():
+                # 포크 전 부모가 모은 통계는 부모가 기록하므로 버림
+                self._pending, self._pending_pid = {}, os.getpid()
+            self._pending.setdefault(namespace, Counter())[field] += amount
+            due = time.monotonic() - self._flushed_at >= SHARED_CACHE_STATS_FLUSH
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """이 프로세스에서 모은 통계를 공유 통계 테이블에 더함"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            with self.transaction() as connection:
+                for namespace, counts in pending.items():
+                    connection.execute("INSERT OR IGNORE INTO cache_stats (namespace) VALUES (?)", (namespace,))
+                    connection.execute(
+                        f"UPDATE cache_stats SET {', '.join(f'{field} = {field} + ?' for field in STAT_FIELDS)} "
+                        "WHERE namespace = ?",
+                        (*(counts[field] for field in STAT_FIELDS), namespace)
+                    )
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 통계 기록 실패: {e}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """이름공간별 통계 (모든 워커 합산 + 항목 수/크기)"""
+        self.flush_stats()
+        with self.connection() as connection:
+            totals = {row[0]: dict(zip(STAT_FIELDS, row[1:])) for row in connection.execute(
+                f"SELECT namespace, {', '.join(STAT_FIELDS)} FROM cache_stats")}
+            sizes = {row[0]: row[1:] for row in connection.execute(
+                "SELECT namespace, count(*), total(size) FROM cache_entries GROUP BY namespace")}
+
+        result = {}
+        for namespace in sorted(set(totals) | set(sizes) | set(self._namespaces)):
+            stats = totals.get(namespace) or dict.fromkeys(STAT_FIELDS, 0)
+            entries, size = sizes.get(namespace, (0, 0))
+            lookups = stats["hits"] + stats["misses"]
+            result[namespace] = {
+                **stats,
+                "entries": entries,
+                "bytes": int(size),
+                "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0
+            }
+        return result
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        with self.transaction() as connection:
+            if namespace is None:
+                connection.execute("DELETE FROM cache_locks")
+                connection.execute("DELETE FROM cache_stats")
+                return connection.execute("DELETE FROM cache_entries").rowcount
+            connection.execute("DELETE FROM cache_locks WHERE namespace = ?", (namespace,))
+            connection.execute("DELETE FROM cache_stats WHERE namespace = ?", (namespace,))
+            return connection.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,)).rowcount
+
+
+class CacheNamespace:
+    """공유 캐시의 이름공간 하나 (캐시 오류는 로그만 남기고 미스로 처리해 요청을 막지 않음)"""
+
+    def __init__(self, store: SharedCacheStore, name: str, ttl: float, max_entries: int, max_bytes: float):
+        self.store = store
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _lookup(self, key: str) -> Any:
+        now = time.time()
+        with self.store.connection() as connection:
+            row = connection.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.name, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return _MISSING
+            if now - row[2] >= SHARED_CACHE_TOUCH_SECONDS:
+                try:
+                    connection.execute("UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                                       (now, self.name, key))
+                except sqlite3.OperationalError:
+                    pass  # 다른 워커가 쓰는 중이면 접근 시각 갱신은 건너뜀
+        return pickle.loads(row[0])
+
+    def _peek(self, key: str) -> Any:
+        """통계 없이 조회 (캐시 오류는 미스)"""
+        try:
+            return self._lookup(key)
+        except (sqlite3.Error, pickle.UnpicklingError):
+            return _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self._lookup(encode_key(key))
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logging.warning(f"공유 캐시 조회 실패 ({self.name}): {e}")
+            value = _MISSING
+        self.store.count(self.name, "misses" if value is _MISSING else "hits")
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._peek(encode_key(key)) is not _MISSING
+
+    def __len__(self) -> int:
+        with self.store.connection() as connection:
+            return connection.execute("SELECT count(*) FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+                                      (self.name, time.time())).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """이 이름공간의 통계 (모든 워커 합산)"""
+        return self.store.stats().get(self.name, {})
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        try:
+            with self.store.transaction() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at, tags) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.name, encode_key(key), data, len(data), now + (ttl or self.ttl), now, _tag_text(tags))
+                )
+                evicted = self._evict(connection, now)
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 저장 실패 ({self.name}): {e}")
+            return
+        self.store.count(self.name, "sets")
+        if evicted:
+            self.store.count(self.name, "evictions", evicted)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> int:
+        """만료 항목을 지우고, 그래도 개수/크기 제한을 넘으면 오래 쓰지 않은 항목부터 제거"""
+        evicted = connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+                                     (self.name, now)).rowcount
+        count, size = connection.execute("SELECT count(*), total(size) FROM cache_entries WHERE namespace = ?",
+                                         (self.name,)).fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return evicted
+
+        victims = []
+        for key, entry_size in connection.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at", (self.name,)):
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            victims.append((self.name, key))
+            count -= 1
+            size -= entry_size
+        connection.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        return evicted + len(victims)
+
+    def delete(self, key: Hashable):
+        try:
+            with self.store.connection() as connection:
+                connection.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                                   (self.name, encode_key(key)))
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 삭제 실패 ({self.name}): {e}")
+
+    def delete_tagged(self, tags: Iterable[str]) -> int:
+        """태그 중 하나라도 달린 항목 삭제"""
+        deleted = 0
+        try:
+            with self.store.transaction() as connection:
+                for tag in tags:
+                    deleted += connection.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND instr(tags, ?) > 0",
+                        (self.name, f"|{tag}|")
+                    ).rowcount
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 태그 삭제 실패 ({self.name}): {e}")
+        return deleted
+
+    def _try_lock(self, key: str, owner: str) -> bool:
+        now = time.time()
+        with self.store.transaction() as connection:
+            connection.execute("DELETE FROM cache_locks WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                               (self.name, key, now))
+            return connection.execute(
+                "INSERT OR IGNORE INTO cache_locks (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, owner, now + SHARED_CACHE_LOCK_TIMEOUT)
+            ).rowcount == 1
+
+    def _unlock(self, key: str, owner: str):
+        try:
+            with self.store.connection() as connection:
+                connection.execute("DELETE FROM cache_locks WHERE namespace = ? AND key = ? AND owner = ?",
+                                   (self.name, key, owner))
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 락 해제 실패 ({self.name}): {e}")
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       tags: Iterable[str] = ()) -> Any:
+        """캐시에 있으면 반환하고, 없으면 한 워커/스레드만 계산해 저장 (나머지는 결과를 기다림)
+
+        계산이 예외로 끝나면 저장하지 않고 예외를 전달하며, 기다리던 쪽이 이어서 계산한다
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        encoded = encode_key(key)
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        give_up_at = time.monotonic() + SHARED_CACHE_LOCK_TIMEOUT
+        waited = False
+        while time.monotonic() < give_up_at:
+            try:
+                locked = self._try_lock(encoded, owner)
+            except sqlite3.Error as e:
+                logging.warning(f"공유 캐시 계산 락 실패 ({self.name}), 직접 계산: {e}")
+                break
+            if locked:
+                try:
+                    # 락을 얻기 직전에 다른 쪽이 계산을 끝냈을 수 있음
+                    value = self._peek(encoded)
+                    if value is _MISSING:
+                        value = compute()
+                        self.store.count(self.name, "computes")
+                        self.set(key, value, ttl, tags)
+                    return value
+                finally:
+                    self._unlock(encoded, owner)
+
+            if not waited:
+                self.store.count(self.name, "compute_waits")
+                waited = True
+            time.sleep(SHARED_CACHE_POLL_SECONDS)
+            value = self._peek(encoded)
+            if value is not _MISSING:
+                return value
+
+        # 락을 쓸 수 없거나 계산하던 쪽이 끝나지 않으면 직접 계산
+        self.store.count(self.name, "computes")
+        return compute()
+
+
+# 프로세스 전체에서 공유하는 캐시 저장소
+shared_cache = SharedCacheStore()
+atexit.register(shared_cache.flush_stats)
+
+
+def register_cache_commands(app: Flask):
+    """flask cache-stats / cache-clear 명령 등록"""
+
+    @app.cli.command("cache-stats")
+    def cache_stats():
+        """공유 캐시 이름공간별 통계 출력 (모든 워커 합산)"""
+        click.echo(json.dumps(shared_cache.stats(), ensure_ascii=False, indent=2))
+
+    @app.cli.command("cache-clear")
+    @click.option("--namespace", default=None, help="비울 이름공간 (기본: 전체)")
+    def cache_clear(namespace):
+        """공유 캐시 비우기"""
+        deleted = shared_cache.clear(namespace)
+        logging.info(f"공유 캐시 삭제: {deleted}건")
+        click.echo(f"삭제 완료: {deleted}건", err=True)
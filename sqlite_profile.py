@@ -0,0 +1,138 @@
+"""
+단일 노드 SQLite 저장소 프로필
+DATABASE_URL이 SQLite 파일이면 (SQLITE_PROFILE=false로 끌 수 있음)
+- WAL 모드와 튜닝된 PRAGMA (synchronous=NORMAL, mmap_size, cache_size, busy_timeout)
+- 스레드마다 커넥션 하나를 재사용하는 풀 (SingletonThreadPool)
+- 쓰기 직렬화: 쓰기 트랜잭션은 프로세스 내 락 + 파일 락(다른 gunicorn 워커와 공유)을 잡은 뒤 시작하고
+  커넥션을 풀에 반납할 때 놓는다. 쓰기끼리 SQLITE_BUSY로 재시도하며 멈추는 대신 순서대로 대기한다
+
+WAL에서는 읽기가 쓰기를 막지 않으므로 조회는 락 없이 동시에 실행된다
+쓰기 트랜잭션 안에서 업스트림 호출처럼 오래 걸리는 작업을 하면 다른 쓰기가 모두 기다리므로
+쓰기는 짧게 커밋해야 한다 (기존 라우트는 업스트림 호출 전에 커밋한다)
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import SingletonThreadPool
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 내 직렬화만 적용
+    fcntl = None
+
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "true").lower() == "true"
+# 커넥션을 유지할 스레드 수 (넘으면 오래된 스레드의 커넥션을 닫으므로 워커 스레드 수보다 크게)
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "64"))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+
+_READ_PREFIXES = ("SELECT", "PRAGMA", "WITH", "EXPLAIN")
+_LOCK_KEY = "sqlite_write_lock"
+
+
+def is_sqlite_file(url: Optional[str]) -> bool:
+    """파일 기반 SQLite URL인지 확인 (메모리 DB 제외)"""
+    if not url:
+        return False
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_engine_options() -> Dict[str, Any]:
+    """SQLite 프로필용 엔진 옵션 (네트워크 DB용 pre-ping/recycle 대신 스레드별 커넥션)"""
+    return {
+        "poolclass": SingletonThreadPool,
+        "pool_size": SQLITE_POOL_SIZE,
+        "connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    }
+
+
+class WriterGate:
+    """쓰기 트랜잭션 직렬화 (프로세스 내 락 + 같은 DB 파일을 쓰는 모든 프로세스가 공유하는 파일 락)"""
+
+    def __init__(self, database_path: str):
+        self.lock_path = database_path + ".write-lock"
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+
+    def _file(self) -> int:
+        # 포크된 워커는 부모와 다른 파일 기술자를 써야 서로 배제된다
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def acquire(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file(), fcntl.LOCK_EX)
+            except Exception:
+                self._lock.release()
+                raise
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self._file(), fcntl.LOCK_UN)
+        self._lock.release()
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def install_sqlite_profile(engine: Engine):
+    """SQLite 엔진에 PRAGMA 설정과 쓰기 직렬화 이벤트 등록"""
+    gate = WriterGate(engine.url.database)
+
+    def acquire_for_write(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get(_LOCK_KEY) or statement.lstrip()[:7].upper().startswith(_READ_PREFIXES):
+            return
+        gate.acquire()
+        conn.info[_LOCK_KEY] = True
+
+    def release_on_checkin(dbapi_connection, connection_record):
+        # 커밋/롤백 후 커넥션이 풀로 돌아올 때 해제 (트랜잭션이 끝난 뒤라 다음 쓰기가 바로 시작 가능)
+        if connection_record is not None and connection_record.info.pop(_LOCK_KEY, False):
+            gate.release()
+
+    # 풀 이벤트는 dispose()로 풀을 새로 만들어도 유지된다
+    event.listen(engine.pool, "connect", _apply_pragmas)
+    event.listen(engine.pool, "checkin", release_on_checkin)
+    event.listen(engine, "before_cursor_execute", acquire_for_write)
+
+
+def configure_sqlite_profile(app: Flask) -> bool:
+    """db.init_app 전에 호출: SQLite 파일 DB면 엔진 옵션을 프로필용으로 교체"""
+    if not (SQLITE_PROFILE and is_sqlite_file(app.config.get("SQLALCHEMY_DATABASE_URI"))):
+        return False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqlite_engine_options()
+    return True
+
+
+def init_sqlite_profile(app: Flask):
+    """db.init_app 후에 호출: SQLite 파일 엔진마다 PRAGMA/쓰기 직렬화 설치"""
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if is_sqlite_file(str(engine.url)):
+                install_sqlite_profile(engine)
+                logging.info(f"SQLite 프로필 적용: {engine.url.database} (WAL, 쓰기 직렬화)")
@@ -14,11 +14,13 @@ class PPLXChatApp {
         this.selectedModel = 'sonar-pro';
         this.availableModels = {};
         this.isLoading = false;
+        this.currentRequest = null; // 진행 중인 채팅 요청 { id, controller } (취소용)
         this.currentState = 'welcome'; // 'welcome' | 'chat'
         this.currentConversationId = null;
         this.conversationHistory = [];
         this.searchHistory = {
             conversations: [],
+            pagination: null,
             currentPage: 1,
             totalPages: 1,
             isLoading: false,
@@ -34,8 +36,14 @@ class PPLXChatApp {
         // 테마 초기화
         this.initTheme();
         
+        // 서버가 페이지에 넣어준 초기 데이터 (없으면 API로 조회)
+        const bootstrap = this.readBootstrapData();
+        
         // 설정 로드
         await this.loadSettings();
+        if (bootstrap) {
+            this.applyBootstrapSettings(bootstrap);
+        }
         
         // 이벤트 바인딩
         this.bindModernUIEvents();
@@ -43,8 +51,14 @@ class PPLXChatApp {
         // 초기 상태 설정
         this.setState('welcome');
         
-        // 대화 이력 초기 로드
-        this.loadConversationHistory();
+        // 대화 이력 초기 로드 (초기 데이터에 포함되어 있으면 요청 생략)
+        if (bootstrap) {
+            this.searchHistory.conversations = bootstrap.conversations || {};
+            this.searchHistory.pagination = bootstrap.pagination || null;
+            this.renderConversationList();
+        } else {
+            this.loadConversationHistory();
+        }
         
         // 사용자 인사말 업데이트
         this.updateUserGreeting();
@@ -77,6 +91,38 @@ class PPLXChatApp {
         }
     }
 
+    /**
+     * 페이지에 포함된 초기 데이터 읽기
+     */
+    readBootstrapData() {
+        const element = document.getElementById('bootstrapData');
+        if (!element) return null;
+        
+        try {
+            return JSON.parse(element.textContent);
+        } catch (error) {
+            console.error('초기 데이터 파싱 실패:', error);
+            return null;
+        }
+    }
+
+    /**
+     * 초기 데이터의 설정/모델 목록 적용
+     */
+    applyBootstrapSettings(data) {
+        this.availableModels = {};
+        (data.models || []).forEach(model => {
+            this.availableModels[model.id] = model;
+        });
+        
+        // 브라우저에 저장된 설정이 없으면 서버 설정 사용 (테마는 브라우저 값 유지)
+        if (!localStorage.getItem('userSettings') && data.settings) {
+            const { theme, ...serverSettings } = data.settings;
+            this.userSettings = { ...this.userSettings, ...serverSettings };
+            this.selectedModel = this.userSettings.preferred_model;
+        }
+    }
+
     /**
      * 모던 UI 이벤트 바인딩
      */
@@ -192,7 +238,12 @@ class PPLXChatApp {
         
         if (chatSendBtn) {
             chatSendBtn.addEventListener('click', () => {
-                this.handleChatSubmit();
+                // 응답 대기 중에는 중지 버튼으로 동작
+                if (this.isLoading) {
+                    this.cancelMessage();
+                } else {
+                    this.handleChatSubmit();
+                }
             });
         }
         
@@ -298,6 +349,17 @@ class PPLXChatApp {
                 e.preventDefault();
                 this.createNewConversation();
             }
+            // Esc로 응답 중지
+            if (e.key === 'Escape' && this.isLoading) {
+                this.cancelMessage();
+            }
+        });
+        
+        // 페이지를 떠나면 진행 중인 요청 취소 (서버가 업스트림 호출과 재시도를 멈추도록)
+        window.addEventListener('pagehide', () => {
+            if (this.currentRequest) {
+                navigator.sendBeacon(`/api/chat/${this.currentRequest.id}/cancel`);
+            }
         });
     }
 
@@ -339,6 +401,7 @@ class PPLXChatApp {
             
             if (response.ok && data.success) {
                 this.searchHistory.conversations = data.conversations || {};
+                this.searchHistory.pagination = data.pagination || null;
                 this.renderConversationList();
             } else {
                 console.error('대화 이력 로드 실패:', data.error);
@@ -388,7 +451,13 @@ class PPLXChatApp {
         // 최신순으로 정렬
         allConversations.sort((a, b) => new Date(b.updated_at) - new Date(a.updated_at));
         
-        conversationList.innerHTML = allConversations.map(conv => this.createConversationItemHTML(conv)).join('');
+        conversationList.innerHTML = allConversations.map(conv => this.createConversationItemHTML(conv)).join('')
+            + this.createLoadMoreHTML();
+        
+        // 그룹별 더 보기 버튼 (첫 페이지 이후의 대화)
+        conversationList.querySelectorAll('.load-more-btn').forEach(btn => {
+            btn.addEventListener('click', () => this.loadMoreConversations(btn.dataset.bucket, btn));
+        });
         
         // 이벤트 리스너 추가
         conversationList.querySelectorAll('.conversation-item').forEach(item => {
@@ -415,6 +484,74 @@ class PPLXChatApp {
         });
     }
 
+    /**
+     * 다음 페이지가 남은 날짜 그룹마다 더 보기 버튼 HTML 생성
+     */
+    createLoadMoreHTML() {
+        const pagination = this.searchHistory.pagination;
+        if (!pagination || !pagination.buckets) return '';
+        
+        const labels = {
+            favorites: '즐겨찾기',
+            today: '오늘',
+            yesterday: '어제',
+            this_week: '이번 주',
+            older: '이전'
+        };
+        
+        return Object.keys(labels)
+            .filter(bucket => pagination.buckets[bucket] && pagination.buckets[bucket].has_next)
+            .map(bucket => {
+                const loaded = (this.searchHistory.conversations[bucket] || []).length;
+                const remaining = Math.max(0, pagination.buckets[bucket].total - loaded);
+                return `
+                    <div class="load-more-section">
+                        <button class="load-more-btn" data-bucket="${bucket}">
+                            <i class="fas fa-chevron-down"></i>
+                            ${labels[bucket]} 대화 더 보기 (${remaining}개)
+                        </button>
+                    </div>
+                `;
+            })
+            .join('');
+    }
+
+    /**
+     * 날짜 그룹 하나의 다음 페이지를 불러와 목록에 추가
+     */
+    async loadMoreConversations(bucket, button) {
+        const pagination = this.searchHistory.pagination;
+        const info = pagination && pagination.buckets ? pagination.buckets[bucket] : null;
+        if (!info || !info.has_next || this.searchHistory.isLoading) return;
+        
+        this.searchHistory.isLoading = true;
+        if (button) button.disabled = true;
+        
+        try {
+            const params = new URLSearchParams({ bucket, page: info.page + 1, per_page: info.per_page });
+            const response = await fetch(`/api/conversations?${params}`);
+            const data = await response.json();
+            
+            if (response.ok && data.success) {
+                // 그 사이 새 대화가 생겨 페이지가 밀린 경우의 중복 제거
+                const existing = this.searchHistory.conversations[bucket] || [];
+                const seen = new Set(existing.map(conv => conv.id));
+                const added = (data.conversations[bucket] || []).filter(conv => !seen.has(conv.id));
+                this.searchHistory.conversations[bucket] = existing.concat(added);
+                pagination.buckets[bucket] = data.pagination.buckets[bucket];
+                this.renderConversationList();
+            } else {
+                console.error('대화 목록 추가 로드 실패:', data.error);
+                if (button) button.disabled = false;
+            }
+        } catch (error) {
+            console.error('대화 목록 추가 로드 오류:', error);
+            if (button) button.disabled = false;
+        } finally {
+            this.searchHistory.isLoading = false;
+        }
+    }
+
     /**
      * 이력 섹션 렌더링
      */
@@ -576,6 +713,8 @@ class PPLXChatApp {
                     data.messages.forEach(msg => {
                         if (msg.message_type === 'user') {
                             this.displayUserMessage(msg.content, false);
+                        } else if (msg.message_type === 'cancelled') {
+                            this.displayCancelledNotice(false, msg.content);
                         } else {
                             this.displayAssistantMessage(msg.content, msg.citations || [], false);
                         }
@@ -868,7 +1007,8 @@ class PPLXChatApp {
                 }
             }
             
-            // API 요청
+            // API 요청 (중지 버튼/페이지 이탈 시 취소할 수 있도록 요청 ID 부여)
+            this.currentRequest = { id: this.generateRequestId(), controller: new AbortController() };
             const response = await fetch('/api/chat', {
                 method: 'POST',
                 headers: {
@@ -877,8 +1017,10 @@ class PPLXChatApp {
                 body: JSON.stringify({
                     message: message,
                     model: this.selectedModel,
-                    search_scope: this.userSettings.search_scope
-                })
+                    search_scope: this.userSettings.search_scope,
+                    request_id: this.currentRequest.id
+                }),
+                signal: this.currentRequest.controller.signal
             });
             
             this.hideTypingIndicator();
@@ -894,23 +1036,68 @@ class PPLXChatApp {
                     data.model_used,
                     data.source_filtering,
                     data.quality_score,
-                    data.retry_count || 0
+                    data.retry_count || 0,
+                    data.degraded || false
                 );
+                
+                if (data.related_questions && data.related_questions.length > 0) {
+                    this.displayRelatedQuestions(data.related_questions);
+                }
+                
+                if (data.asked_before && data.asked_before.length > 0) {
+                    this.displayAskedBefore(data.asked_before);
+                }
             } else {
                 const errorData = await response.json();
-                this.displayErrorMessage(errorData.error || '오류가 발생했습니다.');
+                if (errorData.cancelled) {
+                    this.displayCancelledNotice();
+                } else {
+                    this.displayErrorMessage(errorData.error || '오류가 발생했습니다.');
+                }
             }
             
         } catch (error) {
-            console.error('메시지 전송 실패:', error);
             this.hideTypingIndicator();
-            this.displayErrorMessage('네트워크 오류가 발생했습니다.');
+            if (error.name === 'AbortError') {
+                this.displayCancelledNotice();
+            } else {
+                console.error('메시지 전송 실패:', error);
+                this.displayErrorMessage('네트워크 오류가 발생했습니다.');
+            }
         } finally {
+            this.currentRequest = null;
             this.isLoading = false;
             this.setLoadingState(false);
         }
     }
 
+    /**
+     * 진행 중인 채팅 요청 중지 (서버에 취소를 알린 뒤 응답 대기 중단)
+     */
+    cancelMessage() {
+        const current = this.currentRequest;
+        if (!current) return;
+        
+        fetch(`/api/chat/${current.id}/cancel`, { method: 'POST', keepalive: true })
+            .catch(error => console.error('요청 취소 실패:', error));
+        current.controller.abort();
+    }
+
+    /**
+     * 취소용 요청 ID 생성
+     */
+    generateRequestId() {
+        // 서버는 ID 자체를 취소 권한으로 보므로 추측할 수 없는 값이어야 함 (HTTP에서는 randomUUID 없음)
+        if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+            return window.crypto.randomUUID();
+        }
+        if (window.crypto && typeof window.crypto.getRandomValues === 'function') {
+            const bytes = window.crypto.getRandomValues(new Uint8Array(16));
+            return Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}${Math.random().toString(36).slice(2, 12)}`;
+    }
+
     /**
      * 사용자 메시지 표시
      */
@@ -937,7 +1124,7 @@ class PPLXChatApp {
     /**
      * AI 응답 메시지 표시
      */
-    displayAssistantMessage(message, citations = [], timestamp = null, scroll = true, questionType = null, modelUsed = null, sourceFiltering = null, qualityScore = null, retryCount = 0) {
+    displayAssistantMessage(message, citations = [], timestamp = null, scroll = true, questionType = null, modelUsed = null, sourceFiltering = null, qualityScore = null, retryCount = 0, degraded = false) {
         const chatMessages = document.getElementById('chatMessages');
         if (!chatMessages) return;
         
@@ -982,12 +1169,13 @@ class PPLXChatApp {
             const scoreColor = qualityScore.total_score >= 80 ? 'success' : 
                              qualityScore.total_score >= 60 ? 'warning' : 'danger';
             const retryText = retryCount > 0 ? ` (${retryCount}회 재시도)` : '';
+            const degradedText = degraded ? ' <span class="badge bg-secondary" title="응답 시간 제한으로 추가 재시도를 생략했습니다">시간 제한</span>' : '';
             
             qualityHtml = `
                 <div class="quality-indicator">
                     <small class="text-muted quality-score">
                         <i class="fas fa-chart-line me-1"></i>
-                        답변 품질: <span class="badge bg-${scoreColor}">${qualityScore.total_score}점</span>${retryText}
+                        답변 품질: <span class="badge bg-${scoreColor}">${qualityScore.total_score}점</span>${retryText}${degradedText}
                         <button class="btn btn-link btn-sm quality-details-btn" type="button" data-bs-toggle="collapse" data-bs-target="#quality-${Date.now()}" aria-expanded="false">
                             <i class="fas fa-info-circle"></i>
                         </button>
@@ -1024,6 +1212,83 @@ class PPLXChatApp {
         }
     }
 
+    /**
+     * 관련 질문 표시 (클릭 시 해당 질문 전송)
+     */
+    displayRelatedQuestions(questions) {
+        const chatMessages = document.getElementById('chatMessages');
+        if (!chatMessages) return;
+        
+        const container = document.createElement('div');
+        container.className = 'related-questions';
+        container.innerHTML = `<h6><i class="fas fa-comments me-1"></i>관련 질문</h6>`;
+        
+        questions.forEach(question => {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'related-question-btn';
+            button.textContent = question;
+            button.addEventListener('click', () => {
+                container.remove();
+                this.sendMessage(question);
+            });
+            container.appendChild(button);
+        });
+        
+        chatMessages.appendChild(container);
+        this.scrollToBottom();
+    }
+
+    /**
+     * 이전에 비슷한 질문을 했던 대화 표시 (클릭 시 해당 대화 열기)
+     */
+    displayAskedBefore(conversations) {
+        const chatMessages = document.getElementById('chatMessages');
+        if (!chatMessages) return;
+        
+        const container = document.createElement('div');
+        container.className = 'related-questions asked-before';
+        container.innerHTML = `<h6><i class="fas fa-history me-1"></i>이전에 비슷한 질문을 했어요</h6>`;
+        
+        conversations.forEach(conversation => {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'related-question-btn';
+            button.textContent = conversation.title || '제목 없는 대화';
+            button.addEventListener('click', () => this.loadConversation(conversation.id));
+            container.appendChild(button);
+        });
+        
+        chatMessages.appendChild(container);
+        this.scrollToBottom();
+    }
+
+    /**
+     * 취소된(또는 과부하로 답변하지 못한) 응답 표시
+     */
+    displayCancelledNotice(scroll = true, text = '응답이 취소되었습니다.') {
+        const chatMessages = document.getElementById('chatMessages');
+        if (!chatMessages) return;
+        
+        const messageElement = document.createElement('div');
+        messageElement.className = 'message assistant-message cancelled-message';
+        
+        messageElement.innerHTML = `
+            <div class="assistant-avatar">
+                <i class="fas fa-robot"></i>
+            </div>
+            <div class="message-content">
+                <small class="text-muted"><i class="fas fa-stop-circle me-1"></i>${this.escapeHtml(text)}</small>
+            </div>
+        `;
+        
+        chatMessages.appendChild(messageElement);
+        
+        if (scroll) {
+            this.scrollToBottom();
+        }
+    }
+
     /**
      * 에러 메시지 표시
      */
@@ -1180,7 +1445,12 @@ class PPLXChatApp {
         const chatBtn = document.getElementById('chatSendBtn');
         
         if (welcomeBtn) welcomeBtn.disabled = loading;
-        if (chatBtn) chatBtn.disabled = loading;
+        if (chatBtn) {
+            // 응답 대기 중에는 중지 버튼으로 전환
+            chatBtn.disabled = false;
+            chatBtn.title = loading ? '응답 중지' : '';
+            chatBtn.innerHTML = loading ? '<i class="fas fa-stop"></i>' : '<i class="fas fa-arrow-up"></i>';
+        }
     }
 
     /**
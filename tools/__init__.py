@@ -0,0 +1,4 @@
+"""
+개발 및 성능 측정용 도구 모음
+운영 코드(app.py 등)에서는 import 하지 않는다
+"""
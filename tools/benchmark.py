@@ -0,0 +1,452 @@
+"""
+요청 경로 CPU 핫패스 마이크로 벤치마크
+pytest-benchmark와 같은 방식(보정된 반복 횟수, 라운드별 통계)으로 측정하고
+JSON 기준선과 비교해 허용 오차를 넘는 성능 저하가 있으면 실패(종료 코드 1)한다
+
+사용 예:
+    python -m tools.benchmark --save            # 현재 결과를 기준선으로 저장
+    python -m tools.benchmark                   # 기준선과 비교 (기본 허용 오차 25%)
+    python -m tools.benchmark --filter quality --tolerance 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+# app.py는 import 시 DB 설정이 필요하므로 메모리 SQLite로 대체
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SHARED_CACHE_PATH', ':memory:')
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'bench_baseline.json')
+DEFAULT_TOLERANCE = 0.25
+
+# 벤치마크 레지스트리: 이름 -> 측정 대상 함수(인자 없음)를 만드는 팩토리
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    """벤치마크 등록 데코레이터"""
+    def decorator(factory: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = factory
+        return factory
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# 측정용 코퍼스
+# ---------------------------------------------------------------------------
+
+QUESTIONS = [
+    "안녕하세요",
+    "오늘 서울 날씨 어때?",
+    "최신 반도체 산업 뉴스와 현재 주가 동향을 알려줘",
+    "파이썬 비동기 프로그래밍의 원리와 asyncio 사용 방법을 예시와 함께 설명해줘",
+    "양자컴퓨터와 고전 컴퓨터의 차이는 무엇인가요?",
+    "제주도 3박 4일 여행 정보 찾아줘",
+    "세종대왕은 언제 태어났고 어떤 업적이 있어?",
+    "How does HTTP/2 multiplexing differ from HTTP/1.1 pipelining?",
+    "What is the latest news about the Federal Reserve interest rate decision?",
+    "gunicorn worker 개수와 스레드 수는 어떻게 정하는 것이 좋을까",
+    "김치찌개 맛있게 끓이는 방법",
+    "머신러닝 공부를 처음 시작하려면 어떤 순서로 해야 할까",
+    "Explain the CAP theorem with concrete database examples",
+    "SQLAlchemy 에서 N+1 쿼리 문제를 해결하는 방법 알려줘",
+    "1997년 외환위기의 원인과 결과에 대한 학술 연구 자료",
+    "javascript 이벤트 루프 코딩 예제 보여줘"
+]
+
+ANSWER_PARAGRAPH = (
+    "## 개요\n\n**{topic}**의 정의와 의미를 먼저 살펴보겠습니다. 다음 내용은 여러 참고자료를 종합한 것입니다.\n\n"
+    "## 상세 설명\n\n- **특징**: 이러한 특징은 실제 사례에서 자주 확인됩니다. The core idea is simple.\n"
+    "- **방법**: 단계별로 접근하면 이해하기 쉽습니다: 준비, 실행, 검증.\n"
+    "- **종류**: 크게 세 가지로 나눌 수 있습니다.\n\n"
+    "예를 들어, 실무에서는 다음과 같은 방식으로 적용합니다. Performance matters in production systems.\n\n"
+)
+
+SOURCE_DOMAINS = [
+    "https://ko.wikipedia.org/wiki/", "https://news.naver.com/article/", "https://www.kbs.co.kr/news/",
+    "https://docs.python.org/3/library/", "https://github.com/", "https://stackoverflow.com/questions/",
+    "https://www.gov.kr/portal/", "https://blog.naver.com/", "https://www.youtube.com/watch?v=",
+    "https://arxiv.org/abs/", "https://medium.com/@", "https://example-unknown-site.com/post/",
+    "https://www.instagram.com/p/", "https://dev.to/", "https://www.snu.ac.kr/research/"
+]
+
+
+def build_long_answer(topic: str, paragraphs: int) -> str:
+    """구조화된 긴 답변 생성 (마지막에 요약 포함)"""
+    body = ''.join(ANSWER_PARAGRAPH.format(topic=topic) for _ in range(paragraphs))
+    return body + "## 요약\n\n결론적으로 이 주제는 꾸준히 주목받고 있습니다."
+
+
+def build_sources(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """제목/URL/발췌문을 가진 대량 참고자료 목록 생성"""
+    sources = []
+    for index in range(count):
+        question = rng.choice(QUESTIONS)
+        sources.append({
+            "title": f"{question} - 참고자료 {index}",
+            "url": f"{rng.choice(SOURCE_DOMAINS)}{index}",
+            "excerpt": (question + " 관련 자료입니다. ") * rng.randint(1, 6)
+        })
+    return sources
+
+
+def build_conversation_dicts(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """to_dict() 결과와 같은 모양의 대화 목록 생성"""
+    now = datetime.utcnow()
+    conversations = []
+    for index in range(count):
+        updated = now - timedelta(hours=rng.randint(0, 24 * 60))
+        conversations.append({
+            "id": f"conv-{index}",
+            "user_id": "user-1",
+            "title": rng.choice(QUESTIONS)[:50],
+            "created_at": (updated - timedelta(minutes=5)).isoformat(),
+            "updated_at": updated.isoformat(),
+            "is_active": True,
+            "is_favorite": rng.random() < 0.05,
+            "message_count": rng.randint(2, 40)
+        })
+    return conversations
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크 정의
+# ---------------------------------------------------------------------------
+
+@benchmark("classify_question")
+def bench_classify_question():
+    from app import classify_question
+
+    def run():
+        for question in QUESTIONS:
+            classify_question(question)
+    return run
+
+
+@benchmark("get_response_config")
+def bench_get_response_config():
+    from app import get_response_config
+    cases = [(t, s) for t in ["greeting", "info_search", "learning", "realtime", "general"]
+             for s in ["general", "news", "academic"]]
+
+    def run():
+        for question_type, scope in cases:
+            get_response_config(question_type, scope)
+    return run
+
+
+@benchmark("evaluate_response_quality/short")
+def bench_quality_short():
+    from app import evaluate_response_quality
+    answer = build_long_answer("파이썬", 1)
+    citations = ["https://example.com/a", "https://example.com/b"]
+
+    def run():
+        evaluate_response_quality(answer, citations, "learning")
+    return run
+
+
+@benchmark("evaluate_response_quality/long")
+def bench_quality_long():
+    from app import evaluate_response_quality
+    answer = build_long_answer("양자컴퓨터", 40)
+    citations = [f"https://example.com/{i}" for i in range(10)]
+
+    def run():
+        evaluate_response_quality(answer, citations, "info_search")
+    return run
+
+
+@benchmark("quality_scorer/streamed_long")
+def bench_quality_streamed():
+    from quality_scorer import IncrementalQualityScorer
+    answer = build_long_answer("양자컴퓨터", 40)
+    chunks = [answer[i:i + 40] for i in range(0, len(answer), 40)]
+    citations = [f"https://example.com/{i}" for i in range(10)]
+
+    def run():
+        scorer = IncrementalQualityScorer("info_search")
+        for chunk in chunks:
+            scorer.feed(chunk)
+            scorer.predicts_low(70, citations)
+        scorer.score(citations)
+    return run
+
+
+@benchmark("extract_keywords/long_answer")
+def bench_extract_keywords():
+    from source_filter import extract_keywords
+    text = build_long_answer("머신러닝", 20)
+
+    def run():
+        extract_keywords(text)
+    return run
+
+
+@benchmark("calculate_keyword_match")
+def bench_keyword_match():
+    from source_filter import calculate_keyword_match, extract_keywords
+    question_keywords = extract_keywords(QUESTIONS[3] + " " + QUESTIONS[7])
+    source_keywords = extract_keywords(build_long_answer("asyncio", 5))
+
+    def run():
+        calculate_keyword_match(question_keywords, source_keywords)
+    return run
+
+
+@benchmark("filter_sources/50")
+def bench_filter_sources():
+    from source_filter import filter_sources
+    sources = build_sources(50, random.Random(7))
+
+    def run():
+        filter_sources(sources, QUESTIONS[13], "info_search")
+    return run
+
+
+_BUCKET_USER_ID = "bench-bucket-user"
+
+
+def _seed_bucket_conversations(app, count: int = 500) -> str:
+    """메모리 DB에 사이드바 그룹 측정용 대화 500개 생성 (한 번만)"""
+    from models import db, User, Conversation
+
+    with app.app_context():
+        db.create_all()
+        if db.session.get(User, _BUCKET_USER_ID) is None:
+            db.session.add(User(id=_BUCKET_USER_ID, name="벤치"))
+            for conversation in build_conversation_dicts(count, random.Random(11)):
+                db.session.add(Conversation(
+                    user_id=_BUCKET_USER_ID,
+                    title=conversation["title"],
+                    created_at=datetime.fromisoformat(conversation["created_at"]),
+                    updated_at=datetime.fromisoformat(conversation["updated_at"]),
+                    is_favorite=conversation["is_favorite"]
+                ))
+            db.session.commit()
+    return _BUCKET_USER_ID
+
+
+@benchmark("conversation_buckets/500")
+def bench_conversation_buckets():
+    """사이드바 날짜 그룹 (DB에서 그룹 분류 + 그룹별 개수/페이지)"""
+    from app import app, conversation_page
+    user_id = _seed_bucket_conversations(app)
+
+    def run():
+        with app.app_context():
+            conversation_page(user_id)
+    return run
+
+
+_LARGE_CONVERSATION_ID = "bench-conversation-1000"
+
+
+def _seed_large_conversation(app, message_count: int = 1000) -> str:
+    """메모리 DB에 메시지 1,000개짜리 대화 생성 (한 번만)"""
+    from models import db, User, Conversation, Message
+
+    with app.app_context():
+        db.create_all()
+        if db.session.get(Conversation, _LARGE_CONVERSATION_ID) is None:
+            rng = random.Random(5)
+            user = User(id="bench-user", name="벤치")
+            conversation = Conversation(id=_LARGE_CONVERSATION_ID, user_id=user.id, title="대용량 대화")
+            db.session.add_all([user, conversation])
+            started = datetime(2026, 1, 1)
+            for index in range(message_count):
+                is_user = index % 2 == 0
+                db.session.add(Message(
+                    conversation_id=conversation.id,
+                    user_id=user.id,
+                    content=rng.choice(QUESTIONS) if is_user else build_long_answer("주제", 2),
+                    message_type='user' if is_user else 'assistant',
+                    question_type='general',
+                    citations=None if is_user else [f"{d}{index}" for d in SOURCE_DOMAINS[:5]],
+                    created_at=started + timedelta(seconds=index)
+                ))
+            db.session.commit()
+    return _LARGE_CONVERSATION_ID
+
+
+@benchmark("history_serialization/orm_stdlib_1000")
+def bench_history_orm():
+    """기존 방식: ORM 인스턴스 로드 + isoformat + 표준 json 직렬화"""
+    from flask.json.provider import DefaultJSONProvider
+    from app import app
+    from models import Message
+    conversation_id = _seed_large_conversation(app)
+    provider = DefaultJSONProvider(app)
+
+    def run():
+        with app.app_context():
+            messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.created_at).all()
+            data = []
+            for msg in messages:
+                entry = {'type': msg.message_type, 'content': msg.content,
+                         'timestamp': msg.created_at.isoformat(), 'question_type': msg.question_type}
+                if msg.message_type == 'assistant' and msg.citations:
+                    entry['citations'] = msg.citations
+                if msg.message_type == 'user':
+                    entry['user_name'] = "벤치"
+                data.append(entry)
+            provider.dumps({'conversation': data})
+    return run
+
+
+@benchmark("history_serialization/projection_1000")
+def bench_history_projection():
+    """컬럼 프로젝션 + 고속 JSON 프로바이더"""
+    from app import app
+    from projections import history_entries
+    conversation_id = _seed_large_conversation(app)
+
+    def run():
+        with app.app_context():
+            app.json.dumps_bytes({'conversation': history_entries(conversation_id, "벤치")})
+    return run
+
+
+# ---------------------------------------------------------------------------
+# 측정 및 비교
+# ---------------------------------------------------------------------------
+
+def measure(func: Callable[[], Any], rounds: int = 15, min_round_time: float = 0.02) -> Dict[str, Any]:
+    """반복 횟수를 보정한 뒤 라운드별 1회 실행 시간 통계 산출"""
+    func()  # 워밍업 (지연 import, 캐시 등)
+
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_round_time or iterations >= 1_000_000:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        samples.append((time.perf_counter() - started) / iterations)
+
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.mean(samples),
+        "stddev": statistics.pstdev(samples),
+        "rounds": rounds,
+        "iterations": iterations
+    }
+
+
+def run_benchmarks(name_filter: Optional[str] = None, rounds: int = 15) -> Dict[str, Dict[str, Any]]:
+    """등록된 벤치마크 실행"""
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(factory(), rounds=rounds)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """기준선 대비 최솟값이 허용 오차 이상 느려진 벤치마크 목록 반환
+
+    마이크로 벤치마크에서는 스케줄링 잡음이 한쪽(느린 쪽)으로만 작용하므로
+    중앙값보다 라운드별 최솟값이 비교 기준으로 안정적이다
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            continue
+        ratio = stats["min"] / base["min"] if base["min"] else 1.0
+        stats["baseline_min"] = base["min"]
+        stats["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Any]], regressions: List[str]):
+    header = f"{'benchmark':<38}{'median(us)':>12}{'min(us)':>10}{'stddev':>9}{'vs base':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in results.items():
+        ratio = f"{stats['ratio']:.2f}x" if "ratio" in stats else "-"
+        flag = "  << 성능 저하" if name in regressions else ""
+        print(f"{name:<38}{stats['median'] * 1e6:>12.2f}{stats['min'] * 1e6:>10.2f}"
+              f"{stats['stddev'] * 1e6:>9.2f}{ratio:>10}{flag}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CPU 핫패스 마이크로 벤치마크")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="기준선 JSON 경로")
+    parser.add_argument("--save", action="store_true", help="현재 결과를 기준선으로 저장")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="허용 성능 저하 비율 (0.25 = 25%%)")
+    parser.add_argument("--filter", default=None, help="이름에 포함된 벤치마크만 실행")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--confirm", type=int, default=2, help="성능 저하 항목 재측정 횟수")
+    parser.add_argument("--json-out", default=None, help="이번 실행 결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.filter, args.rounds)
+    document = {
+        "created_at": datetime.utcnow().isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "benchmarks": results
+    }
+
+    regressions: List[str] = []
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+
+        # 일시적인 CPU 경합으로 인한 오탐을 줄이기 위해 저하 항목만 재측정
+        for _ in range(args.confirm):
+            if not regressions:
+                break
+            for name in regressions:
+                stats = measure(BENCHMARKS[name](), rounds=args.rounds)
+                if stats["min"] < results[name]["min"]:
+                    results[name] = stats
+            regressions = compare(results, baseline, args.tolerance)
+
+    print_results(results, regressions)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        if args.filter and os.path.exists(args.baseline):
+            # 일부만 실행한 경우 기존 기준선에 병합
+            with open(args.baseline, encoding='utf-8') as f:
+                previous = json.load(f)
+            previous["benchmarks"].update(results)
+            results = previous["benchmarks"]
+            document["benchmarks"] = results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+        print(f"기준선 저장: {args.baseline}")
+
+    if regressions:
+        print(f"성능 저하 감지 (허용 오차 {args.tolerance:.0%} 초과): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+인용 정규화/백필 회귀 검사
+normalize_url()이 고정된 사례에서 기대한 결과를 내는지, 그리고 잘못된 URL이 섞인
+기존 메시지에서도 backfill_citations()가 끝까지 진행하며 올바른 URL은 연결하는지 검증한다
+
+사용 예:
+    python -m tools.citation_check   # 실패 시 종료 코드 1
+"""
+
+import os
+import sys
+from typing import List, Optional, Tuple
+
+# app.py는 import 시 DB 설정이 필요하므로 메모리 SQLite로 대체
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SHARED_CACHE_PATH', ':memory:')
+
+# (원본, 기대 결과)
+NORMALIZE_CASES: List[Tuple[str, Optional[Tuple[str, str]]]] = [
+    ("https://Example.com:443/a?b=1#frag", ("https://example.com/a?b=1", "example.com")),
+    ("http://example.com:80", ("http://example.com/", "example.com")),
+    ("http://example.com:8080/x", ("http://example.com:8080/x", "example.com")),
+    ("  https://news.example.org/path  ", ("https://news.example.org/path", "news.example.org")),
+    ("not a url", None),
+    ("http://a:abc/", None),  # 포트가 숫자가 아님
+    ("http://[", None),  # 닫히지 않은 IPv6
+    ("http://example.com:99999/", None),  # 포트 범위 초과
+]
+
+# 백필 대상 기존 메시지의 citations (잘못된 URL이 올바른 URL 사이에 섞인 경우 포함)
+LEGACY_CITATIONS = [
+    ["https://a.example.com/1"],
+    ["https://b.example.com/1", "http://a:abc/", {"url": "https://c.example.com/1"}],
+    ["http://["],
+    ["https://a.example.com/1", "https://d.example.com/2"],
+    [{"url": "http://[::1"}, "https://e.example.com/"],
+]
+
+
+def check_normalize() -> List[str]:
+    from citation_store import normalize_url
+
+    failures = []
+    for url, expected in NORMALIZE_CASES:
+        try:
+            actual = normalize_url(url)
+        except Exception as e:
+            actual = f"{type(e).__name__}: {e}"
+        if actual != expected:
+            failures.append(f"normalize_url({url!r})\n  기대: {expected!r}\n  결과: {actual!r}")
+    return failures
+
+
+def check_backfill() -> List[str]:
+    from app import app
+    from models import db, User, Conversation, Message, MessageCitation
+    from citation_store import backfill_citations
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='검사')
+        db.session.add(user)
+        db.session.flush()
+        conversation = Conversation(user_id=user.id, title='인용 백필 검사')
+        db.session.add(conversation)
+        db.session.flush()
+        message_ids = []
+        for index, citations in enumerate(LEGACY_CITATIONS):
+            message = Message(conversation_id=conversation.id, user_id=user.id, content=f"답변 {index}",
+                              message_type='assistant', question_type='general', citations=citations)
+            db.session.add(message)
+            db.session.flush()
+            message_ids.append(message.id)
+        db.session.commit()
+
+        failures = []
+        try:
+            # 배치를 작게 잡아 잘못된 URL이 배치 중간에 있어도 다음 배치로 넘어가는지 확인
+            processed = backfill_citations(batch_size=2)
+        except Exception as e:
+            return [f"backfill_citations 실패: {type(e).__name__}: {e}"]
+        if processed != len(LEGACY_CITATIONS):
+            failures.append(f"처리한 메시지 수: 기대 {len(LEGACY_CITATIONS)}, 결과 {processed}")
+
+        expected_links = [1, 2, 0, 2, 1]
+        for message_id, expected in zip(message_ids, expected_links):
+            actual = MessageCitation.query.filter_by(message_id=message_id).count()
+            if actual != expected:
+                failures.append(f"메시지 {message_id} 연결 수: 기대 {expected}, 결과 {actual}")
+        return failures
+
+
+def main() -> int:
+    failures = check_normalize() + check_backfill()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("통과" if not failures else f"{len(failures)}건 실패")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+부하 테스트 드라이버
+실제 사용 패턴(채팅, 사이드바 목록, 대화 기록 조회)을 섞어 앱에 요청을 보내고
+엔드포인트별 처리량과 p50/p95/p99 지연을 보고한다
+
+사용 예:
+    python -m tools.perplexity_stub --port 5055 &
+    flask --app main init-db
+    PERPLEXITY_API_URL=http://127.0.0.1:5055/chat/completions gunicorn -w 4 main:app &
+    python -m tools.loadtest --base-url http://127.0.0.1:8000 --users 20 --duration 60 --json-out baseline.json
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+# 기본 요청 비율 (가중치)
+DEFAULT_MIX = {
+    "chat": 2,
+    "conversations": 5,
+    "history": 3
+}
+
+# 질문 유형이 고르게 섞이도록 구성한 질문 목록
+SAMPLE_QUESTIONS = [
+    "안녕",
+    "오늘 서울 날씨 어때?",
+    "최신 반도체 뉴스 알려줘",
+    "파이썬 데코레이터 원리를 설명해줘",
+    "양자컴퓨터와 고전 컴퓨터의 차이는 무엇인가요?",
+    "제주도 여행 정보 찾아줘",
+    "세종대왕은 언제 태어났어?",
+    "How does HTTP/2 multiplexing work?",
+    "What is the latest news about the Fed interest rate?",
+    "flask 에서 gunicorn worker 개수는 어떻게 정하나요",
+    "김치찌개 맛있게 끓이는 방법",
+    "머신러닝 공부 순서 추천",
+    "Explain the CAP theorem with examples",
+    "비트코인 현재 시세",
+    "SQLAlchemy N+1 문제 해결 방법 알려줘"
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """정렬된 값 목록에서 nearest-rank 방식 백분위수 계산"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, int]:
+    """'chat=2,conversations=5' 형식의 요청 비율 파싱"""
+    if not text:
+        return dict(DEFAULT_MIX)
+
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"알 수 없는 요청 종류: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class LoadRecorder:
+    """엔드포인트별 지연 시간 및 상태 코드 기록"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, latency: float, status: int):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            if status == 0 or status >= 400:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """엔드포인트별 통계 요약"""
+        endpoints = {}
+        total = 0
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            total += len(ordered)
+            endpoints[endpoint] = {
+                "count": len(ordered),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+                "statuses": {str(code): count for code, count in sorted(self.statuses[endpoint].items())}
+            }
+
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints
+        }
+
+
+class VirtualUser(threading.Thread):
+    """쿠키(세션)를 유지하며 요청을 반복하는 가상 사용자"""
+
+    def __init__(self, base_url: str, mix: Dict[str, int], recorder: LoadRecorder,
+                 stop_at: float, max_requests: Optional[int], seed: Optional[int], timeout: float):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.actions = list(mix.keys())
+        self.weights = list(mix.values())
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.http = requests.Session()
+        self.known_conversations: List[str] = []
+
+    def _request(self, endpoint: str, method: str, path: str, **kwargs) -> Tuple[int, Any]:
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            status = response.status_code
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+        except requests.exceptions.RequestException:
+            status, body = 0, None
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+        return status, body
+
+    def do_chat(self):
+        self._request("POST /api/chat", "POST", "/api/chat", json={
+            "message": self.random.choice(SAMPLE_QUESTIONS),
+            "search_scope": self.random.choice(["general", "general", "news", "academic"])
+        })
+
+    def do_conversations(self):
+        params = {"per_page": 50}
+        if self.random.random() < 0.2:
+            params["search"] = self.random.choice(["파이썬", "뉴스", "HTTP", "여행"])
+        status, body = self._request("GET /api/conversations", "GET", "/api/conversations", params=params)
+        if status == 200 and body:
+            for group in body.get("conversations", {}).values():
+                for conversation in group:
+                    if conversation["id"] not in self.known_conversations:
+                        self.known_conversations.append(conversation["id"])
+
+    def do_history(self):
+        if not self.known_conversations:
+            self.do_conversations()
+            return
+        conversation_id = self.random.choice(self.known_conversations)
+        if self.random.random() < 0.5:
+            self._request("GET /api/conversation/<id>", "GET", f"/api/conversation/{conversation_id}")
+        else:
+            self._request("GET /api/conversations/<id>", "GET", f"/api/conversations/{conversation_id}")
+
+    def run(self):
+        sent = 0
+        while time.time() < self.stop_at and (self.max_requests is None or sent < self.max_requests):
+            action = self.random.choices(self.actions, weights=self.weights)[0]
+            getattr(self, f"do_{action}")()
+            sent += 1
+
+
+def run_load(base_url: str, users: int, duration: float, mix: Dict[str, int],
+             max_requests: Optional[int] = None, seed: Optional[int] = None, timeout: float = 120) -> Dict[str, Any]:
+    """가상 사용자들을 동시에 실행하고 통계 요약 반환"""
+    recorder = LoadRecorder()
+    started = time.time()
+    stop_at = started + duration
+    workers = [
+        VirtualUser(base_url, mix, recorder, stop_at, max_requests,
+                    None if seed is None else seed + index, timeout)
+        for index in range(users)
+    ]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    result = recorder.summary(time.time() - started)
+    result["config"] = {"base_url": base_url, "users": users, "duration_s": duration, "mix": mix}
+    return result
+
+
+def print_report(result: Dict[str, Any]):
+    """통계 요약을 표 형식으로 출력"""
+    print(f"총 {result['total_requests']}건 / {result['elapsed_s']}s / {result['throughput_rps']} req/s")
+    header = f"{'endpoint':<32}{'count':>7}{'err':>6}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<32}{stats['count']:>7}{stats['errors']:>6}{stats['throughput_rps']:>8}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['max_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PPLX 검색 서비스 부하 테스트")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=10, help="동시 가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=30, help="실행 시간(초)")
+    parser.add_argument("--requests", type=int, default=None, help="사용자당 최대 요청 수")
+    parser.add_argument("--mix", default=None, help="요청 비율 (예: chat=2,conversations=5,history=3)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json-out", default=None, help="결과 JSON 저장 경로 (기준선)")
+    args = parser.parse_args()
+
+    result = run_load(args.base_url, args.users, args.duration, parse_mix(args.mix),
+                      args.requests, args.seed, args.timeout)
+    print_report(result)
+
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
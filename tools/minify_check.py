@@ -0,0 +1,59 @@
+"""
+내장 JS 축소기 회귀 검사
+rjsmin이 없을 때 쓰는 assets._builtin_minify_js()가 리터럴 내부를 건드리지 않고
+주석/공백만 줄이는지 고정된 사례로 검증한다 (축소 규칙을 바꾸면 사례도 함께 갱신)
+
+사용 예:
+    python -m tools.minify_check   # 불일치 시 종료 코드 1
+"""
+
+import sys
+from typing import List, Tuple
+
+from assets import _builtin_minify_js
+
+# (이름, 원본, 기대 결과)
+CASES: List[Tuple[str, str, str]] = [
+    ("comments_and_spaces",
+     "let  a = 1; // 주석\n/* 블록\n주석 */ let b = a + 1;",
+     "let a=1;\nlet b=a+1;\n"),
+    ("increment_operators",
+     "a + +b; c - -d; e++ + f;",
+     "a+ +b;c- -d;e++ +f;\n"),
+    ("string_with_comment_markers",
+     "const s = 'http://x /* y */';",
+     "const s='http://x /* y */';\n"),
+    ("regex_literal",
+     "const r = /\\/\\/[a-z/]+/g; // 끝",
+     "const r=/\\/\\/[a-z/]+/g;\n"),
+    ("template_with_comment_markers",
+     "const t = `a // b /* c */`;",
+     "const t=`a // b /* c */`;\n"),
+    ("nested_template",
+     "const s = `x ${ `inner // c` } y`; // tail\nlet  a = 1;",
+     "const s=`x ${ `inner // c` } y`;\nlet a=1;\n"),
+    ("template_expression_braces",
+     "f(`a ${ {b: 1}.b } c`)  /* x */ ;",
+     "f(`a ${ {b: 1}.b } c`);\n"),
+    ("template_expression_backtick_string",
+     "x = `${ \"`\" } ${ a /* } */ }`",
+     "x=`${ \"`\" } ${ a /* } */ }`\n"),
+    ("deeply_nested_template",
+     "html = `<ul>${ items.map(i => `<li>${ i.name || `#${ i.id }` }</li>`).join('') }</ul>`;  // 목록",
+     "html=`<ul>${ items.map(i => `<li>${ i.name || `#${ i.id }` }</li>`).join('') }</ul>`;\n"),
+]
+
+
+def main() -> int:
+    failures = 0
+    for name, source, expected in CASES:
+        actual = _builtin_minify_js(source)
+        if actual != expected:
+            failures += 1
+            print(f"FAIL {name}\n  기대: {expected!r}\n  결과: {actual!r}")
+    print(f"{len(CASES) - failures}/{len(CASES)} 사례 통과")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Perplexity API 스텁 서버
+실제 API 쿼터를 쓰지 않고 부하 테스트를 하기 위한 가짜 `/chat/completions` 서버
+
+사용 예:
+    python -m tools.perplexity_stub --port 5055 --latency-ms 800 --error-rate 0.02 --low-quality-rate 0.2
+    PERPLEXITY_API_URL=http://127.0.0.1:5055/chat/completions gunicorn main:app
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from flask import Flask, Response, jsonify, request
+
+# 스텁 동작 설정 (명령행 인자로 덮어씀)
+STUB_CONFIG = {
+    "latency_ms": 800.0,       # 평균 응답 지연
+    "jitter_ms": 200.0,        # 지연 표준편차
+    "error_rate": 0.0,         # 5xx/429 오류 비율
+    "low_quality_rate": 0.0,   # 품질 기준 미달 답변 비율 (재시도 유발)
+    "citation_count": 5,       # 기본 참고자료 개수
+    "stream_chunk_chars": 40,  # 스트리밍 청크 크기
+    "seed": None
+}
+
+SAMPLE_CITATIONS = [
+    "https://ko.wikipedia.org/wiki/%EC%9D%B8%EA%B3%B5%EC%A7%80%EB%8A%A5",
+    "https://news.naver.com/main/read.naver?oid=001&aid=0014567890",
+    "https://www.kbs.co.kr/news/view.do?ncd=7890123",
+    "https://docs.python.org/3/library/asyncio.html",
+    "https://github.com/pallets/flask",
+    "https://stackoverflow.com/questions/11828270",
+    "https://www.gov.kr/portal/main",
+    "https://blog.naver.com/example/223456789",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://arxiv.org/abs/2305.10403"
+]
+
+HIGH_QUALITY_TEMPLATE = """## 개요
+
+**{topic}**에 대해 정리해 드리겠습니다. 다음 내용은 여러 참고자료를 종합한 결과입니다.
+
+## 상세 설명
+
+- **정의**: {topic}의 의미와 기본 개념을 먼저 살펴보면 다음과 같습니다.
+- **특징**: 이러한 특징은 실제 사례에서 자주 확인됩니다.
+- **방법**: 단계별로 접근하면 이해하기 쉽습니다.
+
+예를 들어, 일상적인 상황에서 {topic}을(를) 적용하면 효과를 바로 확인할 수 있습니다. 관련 통계와 자료도 이를 뒷받침합니다.
+
+## 요약
+
+결론적으로 {topic}은(는) 꾸준히 주목받는 주제이며, 앞으로도 관련 정보가 계속 업데이트될 예정입니다."""
+
+# 마크다운 구조, 예시, 요약이 없고 참고자료도 없는 긴 답변 (품질 점수 70점 미만)
+LOW_QUALITY_TEMPLATE = (
+    "{topic}에 대한 정보를 찾아보았지만 명확한 자료는 많지 않았습니다 "
+    "여러 가지 이야기가 있지만 확실하게 말씀드리기는 어렵고 상황에 따라 다를 수 있습니다 " * 6
+).strip()
+
+
+# 공유 난수 생성기 (seed 지정 시 실행 단위로 재현 가능)
+_random = random.Random()
+
+
+RELATED_QUESTION_TEMPLATES = [
+    "{topic}의 장단점은 무엇인가요",
+    "{topic} 관련 최신 동향 알려줘",
+    "{topic}을(를) 실제로 적용한 예시는?"
+]
+
+
+def _last_user_message(messages: List[Dict[str, Any]]) -> str:
+    """마지막 사용자 메시지 추출"""
+    for message in reversed(messages or []):
+        if message.get("role") == "user":
+            return str(message.get("content", ""))
+    return ""
+
+
+def build_completion(payload: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """chat/completions 응답 본문 생성"""
+    question = _last_user_message(payload.get("messages", []))
+    topic = question[:30] or "질문"
+    low_quality = rng.random() < STUB_CONFIG["low_quality_rate"]
+
+    if low_quality:
+        content = LOW_QUALITY_TEMPLATE.format(topic=topic)
+        citations: List[str] = []
+    else:
+        content = HIGH_QUALITY_TEMPLATE.format(topic=topic)
+        count = min(len(SAMPLE_CITATIONS), max(0, int(STUB_CONFIG["citation_count"])))
+        citations = rng.sample(SAMPLE_CITATIONS, count)
+
+    completion = {
+        "id": str(uuid.uuid4()),
+        "model": payload.get("model", "sonar-pro"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "citations": citations,
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+            "delta": {"role": "assistant", "content": ""}
+        }],
+        "usage": {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) for m in payload.get("messages", [])) // 2,
+            "completion_tokens": len(content) // 2,
+            "total_tokens": 0
+        }
+    }
+    if payload.get("return_related_questions"):
+        completion["related_questions"] = [template.format(topic=topic) for template in RELATED_QUESTION_TEMPLATES]
+    return completion
+
+
+def _stream_completion(completion: Dict[str, Any], delay: float):
+    """SSE(text/event-stream) 형식으로 답변을 나눠 전송"""
+    content = completion["choices"][0]["message"]["content"]
+    size = max(1, int(STUB_CONFIG["stream_chunk_chars"]))
+    chunks = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+    per_chunk = delay / len(chunks)
+
+    for index, piece in enumerate(chunks):
+        time.sleep(per_chunk)
+        chunk = {
+            "id": completion["id"],
+            "model": completion["model"],
+            "object": "chat.completion.chunk",
+            "created": completion["created"],
+            "citations": completion["citations"],
+            **({"related_questions": completion["related_questions"]} if "related_questions" in completion else {}),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop" if index == len(chunks) - 1 else None,
+                "delta": {"role": "assistant", "content": piece}
+            }]
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    yield "data: [DONE]\n\n"
+
+
+def create_stub_app() -> Flask:
+    """스텁 Flask 앱 생성"""
+    stub = Flask(__name__)
+
+    @stub.route('/chat/completions', methods=['POST'])
+    def chat_completions():
+        payload = request.get_json(silent=True) or {}
+        rng = _random
+
+        delay = max(0.0, rng.gauss(STUB_CONFIG["latency_ms"], STUB_CONFIG["jitter_ms"])) / 1000
+
+        if not payload.get("messages"):
+            return jsonify({"error": {"message": "messages is required", "type": "invalid_request_error"}}), 400
+
+        if rng.random() < STUB_CONFIG["error_rate"]:
+            time.sleep(delay / 2)
+            status = rng.choice([429, 500, 502, 503])
+            return jsonify({"error": {"message": "stub injected error", "code": status}}), status
+
+        completion = build_completion(payload, rng)
+
+        if payload.get("stream"):
+            return Response(_stream_completion(completion, delay), mimetype='text/event-stream')
+
+        time.sleep(delay)
+        return jsonify(completion)
+
+    @stub.route('/health', methods=['GET'])
+    def health():
+        return jsonify({"status": "ok", "config": STUB_CONFIG})
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perplexity API 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--latency-ms", type=float, default=STUB_CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=STUB_CONFIG["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=STUB_CONFIG["error_rate"])
+    parser.add_argument("--low-quality-rate", type=float, default=STUB_CONFIG["low_quality_rate"])
+    parser.add_argument("--citation-count", type=int, default=STUB_CONFIG["citation_count"])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    STUB_CONFIG.update({
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "low_quality_rate": args.low_quality_rate,
+        "citation_count": args.citation_count,
+        "seed": args.seed
+    })
+    _random.seed(args.seed)
+
+    create_stub_app().run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+답변 품질 점수 골든 코퍼스
+evaluate_response_quality()와 증분 채점기(quality_scorer)가 기존 채점 결과와
+정확히 같은 점수를 내는지 검증한다
+
+사용 예:
+    python -m tools.quality_golden               # 검증 (불일치 시 종료 코드 1)
+    python -m tools.quality_golden --regenerate  # 채점 규칙을 의도적으로 바꾼 경우에만 사용
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'quality_golden.json')
+
+QUESTION_TYPES = ['greeting', 'info_search', 'learning', 'realtime', 'general']
+
+# 채점 지표가 되는 조각들 (청크 경계에 걸치도록 섞어서 사용)
+FRAGMENTS = [
+    '**굵게**', '## 제목', '\n- 항목', '\n• 항목', '\n\n', '설명: ', '예시', '예를 들어', '요약', '결론',
+    '정의', '의미', '특징', '방법', '종류', '다음', '이러한', '. ', '문장입니다. ', 'plain english text ',
+    '*', '#', '\n', '-', '예를', '들어', '다', '음', '이러', '한', '요', '약', 'http://a.b/c. ', '가나다라마바사 '
+]
+
+HANDCRAFTED = [
+    "",
+    "안녕하세요! 무엇을 도와드릴까요? 궁금한 것이 있으시면 언제든 말씀해 주세요.",
+    "정보를 찾지 못했습니다",
+    "a" * 99, "a" * 100, "b" * 199, "b" * 200, "c" * 299, "c" * 300,
+    "하나. 둘", "하나. 둘. 셋", "...",
+    "예를 들\n어 분리된 패턴", "*\n*", "#\n#", "\n\n", "\n-", "\n•",
+    "## 개요\n\n**파이썬**의 정의와 의미를 살펴보겠습니다. 다음 내용은 예시입니다.\n\n- 특징: 간결함\n- 방법: 설치 후 실행\n\n## 요약\n\n결론적으로 좋습니다."
+]
+
+
+def build_corpus(size: int = 300, seed: int = 20250623) -> List[Dict[str, Any]]:
+    """손으로 만든 사례와 무작위 조합 사례로 코퍼스 구성"""
+    rng = random.Random(seed)
+    cases = []
+
+    for index, text in enumerate(HANDCRAFTED):
+        cases.append({
+            "response": text,
+            "citations": ["https://example.com/%d" % i for i in range(index % 5)],
+            "question_type": QUESTION_TYPES[index % len(QUESTION_TYPES)]
+        })
+
+    for _ in range(size):
+        pieces = rng.randint(0, 120)
+        text = ''.join(rng.choice(FRAGMENTS) for _ in range(pieces))
+        citation_count = rng.choice([0, 0, 1, 2, 3, 4, 8])
+        cases.append({
+            "response": text,
+            "citations": None if citation_count == 0 and rng.random() < 0.3 else
+            ["https://example.com/%d" % i for i in range(citation_count)],
+            "question_type": rng.choice(QUESTION_TYPES)
+        })
+
+    return cases
+
+
+def chunkings(text: str, rng: random.Random) -> List[List[str]]:
+    """같은 텍스트를 여러 방식으로 나눈 청크 목록"""
+    results = [[text]]
+    for size in (1, 2, 3, 7, 40):
+        results.append([text[i:i + size] for i in range(0, len(text), size)])
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 12))))
+    bounds = [0] + cuts + [len(text)]
+    results.append([text[a:b] for a, b in zip(bounds, bounds[1:])])
+    return results
+
+
+def check(cases: List[Dict[str, Any]]) -> List[str]:
+    """골든 결과와 다른 사례 목록 반환"""
+    from app import evaluate_response_quality
+    from quality_scorer import IncrementalQualityScorer
+
+    rng = random.Random(1)
+    failures = []
+    for index, case in enumerate(cases):
+        expected = case["expected"]
+        actual = evaluate_response_quality(case["response"], case["citations"], case["question_type"])
+        if actual != expected:
+            failures.append(f"#{index} evaluate_response_quality: {actual} != {expected}")
+            continue
+
+        for chunks in chunkings(case["response"], rng):
+            scorer = IncrementalQualityScorer(case["question_type"])
+            for chunk in chunks:
+                scorer.feed(chunk)
+            actual = scorer.score(case["citations"])
+            if actual != expected:
+                failures.append(f"#{index} IncrementalQualityScorer({len(chunks)} chunks): {actual} != {expected}")
+                break
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="답변 품질 점수 골든 코퍼스 검증")
+    parser.add_argument("--regenerate", action="store_true", help="현재 evaluate_response_quality 결과로 골든 파일 재생성")
+    args = parser.parse_args()
+
+    if args.regenerate:
+        from app import evaluate_response_quality
+        cases = build_corpus()
+        for case in cases:
+            case["expected"] = evaluate_response_quality(case["response"], case["citations"], case["question_type"])
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(cases, f, ensure_ascii=False, indent=1)
+        print(f"골든 코퍼스 생성: {len(cases)}건 -> {GOLDEN_PATH}")
+        return 0
+
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        cases = json.load(f)
+
+    failures = check(cases)
+    for failure in failures[:20]:
+        print(failure)
+    print(f"골든 코퍼스 {len(cases)}건 중 불일치 {len(failures)}건")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+엔드포인트별 쿼리 수 상한 검사 (N+1 회귀 방지)
+메모리 SQLite에 대화/메시지를 채운 뒤 조회 엔드포인트를 호출하고,
+쿼리 수가 상한(QUERY_BUDGETS)을 넘으면 반복된 쿼리를 출력하고 실패(종료 코드 1)한다
+데이터 양을 늘려도(--conversations) 쿼리 수가 같아야 N+1이 없는 것이다
+
+사용 예:
+    python -m tools.query_budget
+    python -m tools.query_budget --conversations 200 --messages 10
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+# app.py는 import 시 DB 설정이 필요하므로 메모리 SQLite로 대체
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SHARED_CACHE_PATH', ':memory:')
+
+# 엔드포인트 -> 최대 쿼리 수 (현재 측정값 + 세션 캐시 만료 시 조회 1개 여유)
+QUERY_BUDGETS: Dict[str, int] = {
+    "GET /": 4,
+    "GET /api/bootstrap": 3,
+    "GET /api/conversations": 4,
+    "GET /api/conversations?search=": 4,
+    "GET /api/conversations?bucket=older&page=2": 4,
+    "GET /api/conversations/<id>": 5,
+    "GET /api/conversation/<id>": 6,
+    "GET /api/conversations/<id>/related": 8,
+    "GET /api/conversation": 4,
+    "GET /api/settings": 2,
+    "GET /api/archive/conversations": 4,
+    "GET /api/models": 0
+}
+
+
+def seed(app, client, conversations: int, messages: int) -> str:
+    """첫 쓰기 요청으로 사용자를 만들고 대화/메시지를 채운 뒤 마지막 대화 ID 반환"""
+    from models import db, User, Conversation, Message
+    from keyword_index import reindex_keywords
+
+    with app.app_context():
+        db.create_all()
+    client.post('/api/settings', json={'user_name': '검사'})
+
+    with app.app_context():
+        user = User.query.one()
+        now = datetime.utcnow()
+        conversation = None
+        for index in range(conversations):
+            updated = now - timedelta(days=index)
+            conversation = Conversation(user_id=user.id, title=f"검색 대화 {index}", created_at=updated,
+                                        updated_at=updated, is_favorite=index % 10 == 0)
+            db.session.add(conversation)
+            db.session.flush()
+            for position in range(messages):
+                db.session.add(Message(conversation_id=conversation.id, user_id=user.id,
+                                       content=f"검색 메시지 {index}-{position}",
+                                       message_type='user' if position % 2 == 0 else 'assistant',
+                                       question_type='general', citations=['https://example.com'],
+                                       created_at=updated + timedelta(seconds=position)))
+        db.session.commit()
+        reindex_keywords()
+        return conversation.id
+
+
+def endpoint_requests(conversation_id: str) -> List[Tuple[str, Callable]]:
+    return [
+        ("GET /", lambda client: client.get('/')),
+        ("GET /api/bootstrap", lambda client: client.get('/api/bootstrap')),
+        ("GET /api/conversations", lambda client: client.get('/api/conversations')),
+        ("GET /api/conversations?search=", lambda client: client.get('/api/conversations?search=검색')),
+        ("GET /api/conversations?bucket=older&page=2",
+         lambda client: client.get('/api/conversations?bucket=older&page=2&per_page=5')),
+        ("GET /api/conversations/<id>", lambda client: client.get(f'/api/conversations/{conversation_id}')),
+        ("GET /api/conversation/<id>", lambda client: client.get(f'/api/conversation/{conversation_id}')),
+        ("GET /api/conversations/<id>/related",
+         lambda client: client.get(f'/api/conversations/{conversation_id}/related')),
+        ("GET /api/conversation", lambda client: client.get('/api/conversation')),
+        ("GET /api/settings", lambda client: client.get('/api/settings')),
+        ("GET /api/archive/conversations", lambda client: client.get('/api/archive/conversations')),
+        ("GET /api/models", lambda client: client.get('/api/models'))
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="엔드포인트별 쿼리 수 상한 검사")
+    parser.add_argument("--conversations", type=int, default=60)
+    parser.add_argument("--messages", type=int, default=6)
+    args = parser.parse_args()
+
+    from app import app
+    from query_stats import assert_max_queries
+
+    client = app.test_client()
+    conversation_id = seed(app, client, args.conversations, args.messages)
+
+    failures = []
+    print(f"{'endpoint':<46}{'queries':>9}{'budget':>8}{'db(ms)':>9}")
+    for name, send in endpoint_requests(conversation_id):
+        budget = QUERY_BUDGETS[name]
+        try:
+            with assert_max_queries(app, budget) as stats:
+                response = send(client)
+        except AssertionError as e:
+            failures.append(f"{name}: {e}")
+        print(f"{name:<46}{stats.count:>9}{budget:>8}{stats.db_time * 1000:>9.2f}  {response.status_code}")
+
+    if failures:
+        print("\n쿼리 수 상한 초과:")
+        for failure in failures:
+            print(failure)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+캡처한 /api/chat 트래픽 재생 (코드 버전 간 성능 비교)
+traffic_capture.py로 기록한 파일을 읽어, 기록된 업스트림 응답을 그대로 돌려주는 로컬 스텁을 띄우고
+메모리 SQLite 위의 앱에 요청을 기록 순서대로 다시 보낸다 (사용자/대화 흐름 유지)
+요청마다 지연(전체, 업스트림 대기 제외), 쿼리 수, 품질 점수, 재시도 수를 측정해 JSON으로 저장하고
+다른 실행 결과(--compare)와 비교한다
+
+--speed: 1이면 기록된 업스트림 지연과 요청 간격 그대로, 10이면 10배 빠르게, 0이면 대기 없이
+요청은 한 번에 하나씩 보내므로 같은 캡처를 여러 번 재생해도 같은 순서로 같은 응답을 받는다
+취소된 요청(result.cancelled, 이전 캡처는 상태 499)은 기록된 업스트림 호출을 모두 돌려준 직후
+(호출 기록이 없으면 요청 전에) 취소 플래그를 세워 같은 지점에서 취소한다 (시간이 아니라 호출 수 기준이라 배속과 무관)
+
+사용 예:
+    TRAFFIC_CAPTURE_PATH=/tmp/capture.ndjson.gz gunicorn main:app      # 운영/스테이징에서 캡처
+    python -m tools.replay /tmp/capture.ndjson.gz --speed 0 --json-out base.json
+    (코드 변경 후)
+    python -m tools.replay /tmp/capture.ndjson.gz --speed 0 --compare base.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+from tools.loadtest import percentile
+from tools.perplexity_stub import _stream_completion
+from traffic_capture import read_capture
+
+# 비교 표에 출력할 요약 지표 (이름, 작을수록 좋은지)
+COMPARE_METRICS = [
+    ("errors", True),
+    ("latency_p50_ms", True),
+    ("latency_p95_ms", True),
+    ("app_p50_ms", True),
+    ("app_p95_ms", True),
+    ("queries_total", True),
+    ("queries_max", True),
+    ("quality_mean", False),
+    ("retries_total", True),
+    ("degraded", True),
+    ("upstream_calls", True),
+    ("unmatched_calls", True)
+]
+
+
+class ReplayStub:
+    """현재 재생 중인 레코드의 업스트림 응답을 호출 순서대로 돌려주는 스텁"""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._exchanges: List[Dict[str, Any]] = []
+        self._cursor = 0
+        self._waited = 0.0
+        self._unmatched = 0
+        self._on_exhausted: Optional[Callable[[], None]] = None
+
+    def begin(self, exchanges: List[Dict[str, Any]], on_exhausted: Optional[Callable[[], None]] = None):
+        """on_exhausted: 마지막 기록 응답을 돌려주기 직전에 호출 (취소 재생용)"""
+        with self._lock:
+            self._exchanges = exchanges
+            self._cursor = 0
+            self._waited = 0.0
+            self._unmatched = 0
+            self._on_exhausted = on_exhausted
+
+    def finish(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self._cursor + self._unmatched, "unmatched": self._unmatched,
+                    "upstream_wait": self._waited}
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        """다음 기록 응답 (기록보다 많이 호출하면 None -> 새 코드가 추가로 호출한 것)"""
+        with self._lock:
+            if self._cursor >= len(self._exchanges):
+                self._unmatched += 1
+                return None
+            exchange = self._exchanges[self._cursor]
+            self._cursor += 1
+            delay = exchange["elapsed"] / self.speed if self.speed else 0.0
+            self._waited += delay
+            on_exhausted = self._on_exhausted if self._cursor == len(self._exchanges) else None
+        if on_exhausted is not None:
+            on_exhausted()
+        return {**exchange, "delay": delay}
+
+    def create_app(self) -> Flask:
+        stub = Flask(__name__)
+
+        @stub.route('/chat/completions', methods=['POST'])
+        def chat_completions():
+            payload = request.get_json(silent=True) or {}
+            exchange = self._next()
+            if exchange is None:
+                return jsonify({"error": {"message": "no recorded upstream response", "code": 502}}), 502
+
+            error = exchange.get("error")
+            if error:
+                time.sleep(exchange["delay"])
+                status = error.get("status", 504)
+                return jsonify({"error": {"message": f"replayed {error['type']}", "code": status}}), status
+
+            recorded = exchange["response"]
+            completion = {
+                "id": "replay",
+                "model": exchange.get("model") or payload.get("model"),
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "citations": recorded["citations"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": recorded["content"]}}]
+            }
+            if recorded.get("related_questions"):
+                completion["related_questions"] = recorded["related_questions"]
+
+            if payload.get("stream"):
+                return Response(_stream_completion(completion, exchange["delay"]), mimetype='text/event-stream')
+            time.sleep(exchange["delay"])
+            return jsonify(completion)
+
+        return stub
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _uses_streaming(records: List[Dict[str, Any]]) -> bool:
+    exchanges = [exchange for record in records for exchange in record.get("upstream", [])]
+    return bool(exchanges) and sum(exchange.get("stream", False) for exchange in exchanges) * 2 >= len(exchanges)
+
+
+def replay(records: List[Dict[str, Any]], speed: float, database_url: str) -> Dict[str, Any]:
+    """레코드를 순서대로 재생하고 요청별 결과와 요약 반환"""
+    stub = ReplayStub(speed)
+    server = make_server("127.0.0.1", 0, stub.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # app.py는 import 시 설정을 읽으므로 먼저 환경을 맞춤 (선조회/캡처는 추가 업스트림 호출이라 끄고,
+    # 실행마다 같은 결과가 나오도록 공유 캐시는 프로세스 내 메모리 사용, 취소 재생 시점이 밀리지 않도록
+    # 취소 플래그는 확인할 때마다 조회)
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "PERPLEXITY_API_URL": f"http://127.0.0.1:{server.port}/chat/completions",
+        "PPLX_WARMUP": "false",
+        "PPLX_STREAMING": "true" if _uses_streaming(records) else "false",
+        "PREFETCH_ENABLED": "false",
+        "SHARED_CACHE_PATH": ":memory:",
+        "CANCEL_POLL_INTERVAL": "0"
+    })
+    os.environ.pop("TRAFFIC_CAPTURE_PATH", None)
+
+    from app import app
+    from models import db
+    from cancellation import request_cancel
+    from query_stats import collect_queries, instrument_engines
+
+    with app.app_context():
+        db.create_all()
+    instrument_engines(app)
+
+    clients: Dict[Any, Any] = {}
+    conversations: Dict[Any, Any] = {}
+    results = []
+    first_ts = records[0].get("ts", 0) if records else 0
+    started = time.perf_counter()
+
+    try:
+        for index, record in enumerate(records):
+            # 기록된 요청 간격 유지 (앱이 따라가지 못하면 바로 보냄)
+            if speed:
+                wait = (record.get("ts", first_ts) - first_ts) / speed - (time.perf_counter() - started)
+                if wait > 0:
+                    time.sleep(wait)
+
+            user = record.get("user") or f"anonymous-{index}"
+            if user not in clients:
+                clients[user] = app.test_client()
+            client = clients[user]
+            conversation = record.get("conversation")
+            if user in conversations and conversation != conversations[user]:
+                client.post('/api/conversations/new', json={})
+            conversations[user] = conversation
+
+            body = {key: value for key, value in record["request"].items() if value is not None}
+            body["request_id"] = f"replay-{index:012d}"
+            recorded = record.get("result", {})
+            exchanges = record.get("upstream", [])
+            cancel = None
+            if recorded.get("cancelled") or recorded.get("status") == 499:
+                cancel = lambda request_id=body["request_id"]: request_cancel(request_id)
+                if not exchanges:
+                    cancel()
+            stub.begin(exchanges, on_exhausted=cancel)
+            with collect_queries() as stats:
+                request_started = time.perf_counter()
+                response = client.post('/api/chat', json=body)
+                latency = time.perf_counter() - request_started
+            served = stub.finish()
+
+            data = response.get_json(silent=True) or {}
+            results.append({
+                "index": index,
+                "question_type": data.get("question_type"),
+                "status": response.status_code,
+                "recorded_status": recorded.get("status"),
+                "latency_ms": round(latency * 1000, 2),
+                "app_ms": round(max(latency - served["upstream_wait"], 0.0) * 1000, 2),
+                "queries": stats.count,
+                "db_ms": round(stats.db_time * 1000, 2),
+                "quality": (data.get("quality_score") or {}).get("total_score"),
+                "recorded_quality": recorded.get("quality"),
+                "retry_count": data.get("retry_count"),
+                "degraded": bool(data.get("degraded")),
+                "cancelled": bool(data.get("cancelled")),
+                "upstream_calls": served["calls"],
+                "recorded_calls": len(record.get("upstream", [])),
+                "unmatched_calls": served["unmatched"]
+            })
+    finally:
+        server.shutdown()
+
+    return {
+        "revision": _revision(),
+        "speed": speed,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "summary": summarize(results),
+        "requests": results
+    }
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(result["latency_ms"] for result in results)
+    app_times = sorted(result["app_ms"] for result in results)
+    qualities = [result["quality"] for result in results if result["quality"] is not None]
+    queries = [result["queries"] for result in results]
+    return {
+        "requests": len(results),
+        "errors": sum(result["status"] >= 400 and not result.get("cancelled") for result in results),
+        "status_mismatches": sum(result["status"] != result["recorded_status"] for result in results),
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "app_p50_ms": percentile(app_times, 50),
+        "app_p95_ms": percentile(app_times, 95),
+        "queries_total": sum(queries),
+        "queries_max": max(queries, default=0),
+        "quality_mean": round(sum(qualities) / len(qualities), 2) if qualities else None,
+        "quality_changed": sum(result["quality"] != result["recorded_quality"] for result in results),
+        "retries_total": sum(result["retry_count"] or 0 for result in results),
+        "degraded": sum(result["degraded"] for result in results),
+        "cancelled": sum(result.get("cancelled", False) for result in results),
+        "upstream_calls": sum(result["upstream_calls"] for result in results),
+        "unmatched_calls": sum(result["unmatched_calls"] for result in results)
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    summary = result["summary"]
+    print(f"재생 {summary['requests']}건 / {result['elapsed_s']}s (speed {result['speed']}, 리비전 {result['revision']})")
+    for key, value in summary.items():
+        print(f"  {key:<20}{value}")
+
+
+def print_comparison(base: Dict[str, Any], current: Dict[str, Any]):
+    """요약 지표와 요청별 차이(상태, 품질, 쿼리 수) 비교 출력"""
+    print(f"\n비교: {base.get('revision')} -> {current.get('revision')}")
+    header = f"{'metric':<20}{'base':>12}{'current':>12}{'delta':>12}"
+    print(header)
+    print('-' * len(header))
+    for metric, lower_is_better in COMPARE_METRICS:
+        before, after = base["summary"].get(metric), current["summary"].get(metric)
+        if before is None or after is None:
+            continue
+        delta = after - before
+        worse = delta > 0 if lower_is_better else delta < 0
+        flag = "  !" if worse and delta else ""
+        print(f"{metric:<20}{before:>12}{after:>12}{round(delta, 2):>12}{flag}")
+
+    if len(base["requests"]) != len(current["requests"]):
+        print(f"\n요청 수가 다릅니다 ({len(base['requests'])} / {len(current['requests'])}), 같은 캡처인지 확인하세요")
+        return
+    for field in ("status", "quality", "queries", "upstream_calls"):
+        changed = [after["index"] for before, after in zip(base["requests"], current["requests"])
+                   if before[field] != after[field]]
+        if changed:
+            print(f"{field} 달라진 요청: {len(changed)}건 (index {changed[:10]}{' ...' if len(changed) > 10 else ''})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="캡처한 /api/chat 트래픽 재생")
+    parser.add_argument("capture", help="TRAFFIC_CAPTURE_PATH로 기록한 파일")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 배속 (0: 대기 없이)")
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 재생할 최대 요청 수")
+    parser.add_argument("--database-url", default="sqlite://", help="재생용 DB (기본: 메모리 SQLite)")
+    parser.add_argument("--json-out", default=None)
+    parser.add_argument("--compare", default=None, help="비교할 이전 재생 결과 JSON")
+    args = parser.parse_args()
+
+    records = list(read_capture(args.capture))[:args.limit]
+    if not records:
+        print("재생할 레코드가 없습니다.", file=sys.stderr)
+        return 1
+
+    result = replay(records, args.speed, args.database_url)
+    print_report(result)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+/api/chat 트래픽 캡처 (성능 문제 재현용, 기본 꺼짐)
+TRAFFIC_CAPTURE_PATH를 설정하면 채팅 요청마다 개인정보를 가린 입력, 업스트림 요청/응답 쌍과
+소요 시간, 결과 요약(상태, 품질 점수, 재시도 수, 취소 여부와 시점)을 레코드 하나로 모아 파일에 덧붙인다
+레코드는 각각 gzip 멤버로 압축해 한 번의 write로 추가하므로 여러 gunicorn 워커가 같은 파일에 써도 섞이지 않고,
+이어 붙인 파일은 gzip.open으로 그대로 읽을 수 있다
+
+재생: python -m tools.replay capture.ndjson.gz --speed 10 --json-out run.json
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from flask import Flask, g, has_request_context, request, session
+
+TRAFFIC_CAPTURE_PATH = os.environ.get("TRAFFIC_CAPTURE_PATH")
+# 캡처할 요청 비율 (0~1)
+TRAFFIC_CAPTURE_SAMPLE = float(os.environ.get("TRAFFIC_CAPTURE_SAMPLE", "1.0"))
+# 파일이 이 크기를 넘으면 더 쓰지 않음
+TRAFFIC_CAPTURE_MAX_MB = float(os.environ.get("TRAFFIC_CAPTURE_MAX_MB", "200"))
+CAPTURE_FORMAT_VERSION = 1
+CAPTURE_ENDPOINTS = frozenset(("chat",))
+
+# 개인정보로 보이는 값 치환 (순서대로 적용)
+_SCRUB_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "[email]"),
+    (re.compile(r"\b\d{6}-?[1-4]\d{6}\b"), "[rrn]"),
+    (re.compile(r"\b(?:\d[ -]?){13,19}\b"), "[number]"),
+    (re.compile(r"(?:\+?82[ -]?|0)1[016789][ -]?\d{3,4}[ -]?\d{4}\b"), "[phone]"),
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"), "[ip]")
+]
+
+
+def scrub(text: Any) -> Any:
+    """문자열 속 이메일/주민등록번호/카드번호/전화번호/IP를 자리표시자로 치환"""
+    if not isinstance(text, str):
+        return text
+    for pattern, replacement in _SCRUB_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _pseudonym(value: Any) -> Optional[str]:
+    """사용자/대화 ID를 되돌릴 수 없는 짧은 별칭으로 (같은 값은 같은 별칭 -> 재생 시 대화 흐름 유지)"""
+    if value is None:
+        return None
+    salt = os.environ.get("SESSION_SECRET", "")
+    return hashlib.sha256(f"{salt}:{value}".encode()).hexdigest()[:16]
+
+
+def _last_user_message(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages or []):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+class CaptureLog:
+    """캡처 파일 (프로세스별 O_APPEND 파일 기술자, 레코드마다 gzip 멤버 하나)"""
+
+    def __init__(self, path: str, max_bytes: float = TRAFFIC_CAPTURE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._fd: Optional[int] = None
+        self._fd_pid: Optional[int] = None
+        self._full = False
+
+    def _file(self) -> int:
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def append(self, record: Dict[str, Any]):
+        if self._full:
+            return
+        fd = self._file()
+        if os.fstat(fd).st_size >= self.max_bytes:
+            self._full = True
+            logging.warning(f"트래픽 캡처 파일이 최대 크기에 도달해 캡처를 중단합니다: {self.path}")
+            return
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        os.write(fd, gzip.compress(line.encode("utf-8")))
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """캡처 파일의 레코드를 기록 순서대로 반환"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _sanitized_input(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "message": scrub(str(data.get("message") or "")),
+        "search_scope": data.get("search_scope"),
+        "selected_model": data.get("selected_model") or data.get("model"),
+        "deadline_ms": data.get("deadline_ms")
+    }
+
+
+def record_upstream(payload: Dict[str, Any], elapsed: float, response: Optional[Dict[str, Any]] = None,
+                    error: Optional[BaseException] = None):
+    """캡처 중인 요청이면 업스트림 호출 한 번(요청 요약, 응답 또는 오류, 소요 시간)을 기록"""
+    if not has_request_context():
+        return
+    record = g.get("traffic_capture")
+    if record is None:
+        return
+
+    exchange: Dict[str, Any] = {
+        "model": payload.get("model"),
+        "stream": bool(payload.get("stream")),
+        "search_recency_filter": payload.get("search_recency_filter"),
+        "message_count": len(payload.get("messages") or []),
+        "question": scrub(_last_user_message(payload.get("messages"))),
+        "elapsed": round(elapsed, 4)
+    }
+    if error is not None:
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            exchange["error"] = {"type": "http", "status": error.response.status_code}
+        elif isinstance(error, requests.exceptions.Timeout):
+            exchange["error"] = {"type": "timeout"}
+        else:
+            exchange["error"] = {"type": type(error).__name__}
+    else:
+        choices = response.get("choices") or [{}]
+        exchange["response"] = {
+            "content": scrub((choices[0].get("message") or {}).get("content") or ""),
+            "citations": response.get("citations") or [],
+            "related_questions": [scrub(q) for q in response.get("related_questions") or []],
+            "stream_aborted": bool(response.get("stream_aborted"))
+        }
+    record["upstream"].append(exchange)
+
+
+def record_cancel(reason: Optional[str]):
+    """캡처 중인 요청이 취소되면 취소 이유와 시점(요청 시작 후 경과 시간)을 기록
+
+    재생 도구는 기록된 업스트림 호출을 모두 돌려준 뒤 같은 요청을 취소한다
+    """
+    if not has_request_context():
+        return
+    record = g.get("traffic_capture")
+    if record is None:
+        return
+    record["cancel"] = {"reason": reason, "after": round(time.perf_counter() - record["started"], 4)}
+
+
+def init_traffic_capture(app: Flask):
+    """TRAFFIC_CAPTURE_PATH가 설정되면 /api/chat 요청 캡처 훅 등록"""
+    if not TRAFFIC_CAPTURE_PATH:
+        return
+    log = CaptureLog(TRAFFIC_CAPTURE_PATH)
+    logging.info(f"트래픽 캡처 사용: {TRAFFIC_CAPTURE_PATH} (비율 {TRAFFIC_CAPTURE_SAMPLE})")
+
+    @app.before_request
+    def start_traffic_capture():
+        if request.endpoint not in CAPTURE_ENDPOINTS or random.random() >= TRAFFIC_CAPTURE_SAMPLE:
+            return
+        g.traffic_capture = {
+            "v": CAPTURE_FORMAT_VERSION,
+            "ts": round(time.time(), 3),
+            "endpoint": request.path,
+            "request": _sanitized_input(request.get_json(silent=True) or {}),
+            "upstream": [],
+            "started": time.perf_counter()
+        }
+
+    @app.after_request
+    def write_traffic_capture(response):
+        record = g.pop("traffic_capture", None)
+        if record is None:
+            return response
+        try:
+            body = response.get_json(silent=True) or {}
+            record["elapsed"] = round(time.perf_counter() - record.pop("started"), 4)
+            cancel = record.pop("cancel", None)
+            record["user"] = _pseudonym(session.get("user_id"))
+            record["conversation"] = _pseudonym(session.get("conversation_id"))
+            record["result"] = {
+                "status": response.status_code,
+                "question_type": body.get("question_type"),
+                "model_used": body.get("model_used"),
+                "quality": (body.get("quality_score") or {}).get("total_score"),
+                "retry_count": body.get("retry_count"),
+                "degraded": body.get("degraded"),
+                "prefetched": bool(body.get("prefetched")),
+                "cancelled": cancel is not None
+            }
+            if cancel is not None:
+                record["result"]["cancel_reason"] = cancel["reason"]
+                record["result"]["cancel_after"] = cancel["after"]
+            log.append(record)
+        except Exception as e:
+            logging.error(f"트래픽 캡처 기록 오류: {str(e)}")
+        return response
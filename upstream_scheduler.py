@@ -0,0 +1,367 @@
+"""
+업스트림(Perplexity) 호출 우선순위 스케줄링과 과부하 차단
+호스트의 모든 워커/스레드가 UPSTREAM_MAX_CONCURRENCY개의 호출 슬롯을 나눠 쓰고,
+빈 슬롯이 없으면 공유 캐시 파일(shared_cache)의 대기열에서 순서를 기다린다
+
+대기 순서 (가상 시작 시각이 빠른 순):
+    도착 시각 + 등급별 지연(UPSTREAM_CLASS_OFFSETS)
+    + (그 사용자의 실행 중 호출 수 + 사용자 내 대기 순번 - 1) * UPSTREAM_USER_SHARE_SECONDS
+- 등급: classify_question 결과와 모델로 결정 (interactive < standard < deep < batch < prefetch)
+  등급 차이는 엄격한 우선순위가 아니라 시간 가산점이라 낮은 등급도 오래 기다리면 차례가 온다
+- 사용자 간 공정성: 요청을 한꺼번에 많이 보낸 사용자는 다른 사용자의 요청과 번갈아 처리된다
+
+과부하 차단: 예상 대기 시간이 등급별 한도(UPSTREAM_CLASS_MAX_WAIT)를 넘으면 대기열에 넣지 않고 바로,
+대기 중 한도를 넘기면 그 시점에 UpstreamOverloaded를 발생시킨다 (API는 503 + Retry-After)
+
+통계: GET /api/upstream/stats, flask upstream-stats (등급별 대기열 길이, 최근 대기 시간 p50/p95/최대, 차단 수)
+
+등급별 한도 변경 예:
+    UPSTREAM_CLASS_MAX_WAIT="interactive=3,deep=40"
+"""
+
+import logging
+import math
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import click
+from flask import Flask
+
+from deadline import upstream_latency
+from shared_cache import shared_cache
+
+UPSTREAM_SCHEDULER_ENABLED = os.environ.get("UPSTREAM_SCHEDULER_ENABLED", "true").lower() == "true"
+# 호스트 전체 동시 업스트림 호출 수
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get("UPSTREAM_MAX_CONCURRENCY", "16"))
+# 같은 사용자의 요청이 하나 더 실행 중/대기 중일 때마다 밀리는 시간 (공정성)
+UPSTREAM_USER_SHARE_SECONDS = float(os.environ.get("UPSTREAM_USER_SHARE_SECONDS", "2"))
+# 대기 통계 보관 시간
+UPSTREAM_STATS_WINDOW = float(os.environ.get("UPSTREAM_STATS_WINDOW", "300"))
+# 대기 중인 요청이 이 시간 동안 상태를 갱신하지 않으면 (워커 종료 등) 대기열에서 제외
+UPSTREAM_WAITER_STALE_SECONDS = 5.0
+UPSTREAM_HEARTBEAT_SECONDS = 1.0
+UPSTREAM_POLL_MIN_SECONDS = 0.01
+UPSTREAM_POLL_MAX_SECONDS = 0.1
+# 실행 중 슬롯의 임대 여유 (호출 타임아웃 + 여유가 지나면 워커가 죽은 것으로 보고 회수)
+UPSTREAM_LEASE_GRACE_SECONDS = 5.0
+RETRY_AFTER_MAX_SECONDS = 60
+
+DEEP_RESEARCH_MODELS = frozenset(("sonar-deep-research",))
+
+# 등급 -> 대기 순서 가산 시간(초)
+UPSTREAM_CLASS_OFFSETS: Dict[str, float] = {
+    "interactive": 0,
+    "standard": 2,
+    "deep": 15,
+    "batch": 30,
+    "prefetch": 60
+}
+# 등급 -> 최대 대기 시간(초), 넘으면 차단
+UPSTREAM_CLASS_MAX_WAIT: Dict[str, float] = {
+    "interactive": 5,
+    "standard": 8,
+    "deep": 20,
+    "batch": 60,
+    "prefetch": 1
+}
+QUESTION_CLASSES = {
+    "general": "interactive",
+    "realtime": "interactive",
+    "info_search": "standard",
+    "learning": "standard"
+}
+
+
+def _parse_class_seconds(raw: str) -> Dict[str, float]:
+    values = {}
+    for entry in raw.split(","):
+        name, _, seconds = entry.partition("=")
+        if name.strip() not in UPSTREAM_CLASS_MAX_WAIT or not seconds.strip():
+            continue
+        try:
+            values[name.strip()] = float(seconds)
+        except ValueError:
+            logging.warning(f"UPSTREAM_CLASS_MAX_WAIT 항목 무시: {entry}")
+    return values
+
+
+UPSTREAM_CLASS_MAX_WAIT.update(_parse_class_seconds(os.environ.get("UPSTREAM_CLASS_MAX_WAIT", "")))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upstream_queue (
+    ticket TEXT PRIMARY KEY,
+    class TEXT NOT NULL,
+    user_key TEXT NOT NULL,
+    virtual_at REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    state TEXT NOT NULL,
+    heartbeat REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_upstream_queue_state ON upstream_queue (state, user_key);
+CREATE TABLE IF NOT EXISTS upstream_waits (
+    at REAL NOT NULL,
+    class TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    wait REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_upstream_waits_at ON upstream_waits (at);
+"""
+
+# 대기 중인 요청 중 슬롯을 받을 차례인 티켓 (사용자 내 순번은 도착 순)
+_NEXT_TICKETS = """
+WITH running AS (
+    SELECT user_key, count(*) AS n FROM upstream_queue WHERE state = 'running' GROUP BY user_key
+), waiting AS (
+    SELECT ticket, user_key, virtual_at, enqueued_at,
+           ROW_NUMBER() OVER (PARTITION BY user_key ORDER BY enqueued_at) AS user_rank
+    FROM upstream_queue WHERE state = 'waiting' AND heartbeat >= ?
+)
+SELECT w.ticket FROM waiting w LEFT JOIN running r ON r.user_key = w.user_key
+ORDER BY w.virtual_at + (coalesce(r.n, 0) + w.user_rank - 1) * ?, w.enqueued_at
+LIMIT ?
+"""
+
+
+class UpstreamOverloaded(Exception):
+    """업스트림 대기열이 한도를 넘어 요청을 받지 않음"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, min(int(math.ceil(retry_after)), RETRY_AFTER_MAX_SECONDS))
+
+
+class Lane:
+    """호출 하나의 스케줄링 정보 (등급, 공정성 기준 사용자)"""
+
+    def __init__(self, upstream_class: str, user_key: str, model: str):
+        self.upstream_class = upstream_class
+        self.user_key = user_key
+        self.model = model
+
+    @property
+    def offset(self) -> float:
+        return UPSTREAM_CLASS_OFFSETS[self.upstream_class]
+
+    @property
+    def max_wait(self) -> float:
+        return UPSTREAM_CLASS_MAX_WAIT[self.upstream_class]
+
+
+def upstream_lane(question_type: str, model: str, user_key: Optional[str] = None,
+                  background: Optional[str] = None) -> Lane:
+    """질문 유형/모델로 등급 결정 (background: 'batch' 또는 'prefetch')"""
+    if background:
+        upstream_class = background
+    elif model in DEEP_RESEARCH_MODELS:
+        upstream_class = "deep"
+    else:
+        upstream_class = QUESTION_CLASSES.get(question_type, "standard")
+    return Lane(upstream_class, user_key or "anonymous", model)
+
+
+class UpstreamScheduler:
+    """공유 캐시 파일의 대기열로 호출 슬롯을 나누는 스케줄러"""
+
+    def __init__(self, slots: int = UPSTREAM_MAX_CONCURRENCY, enabled: bool = UPSTREAM_SCHEDULER_ENABLED):
+        self.slots = slots
+        self.enabled = enabled
+        self._schema_pid: Optional[int] = None
+
+    def _ensure_schema(self):
+        if self._schema_pid != os.getpid():
+            with shared_cache.connection() as connection:
+                connection.executescript(_SCHEMA)
+            self._schema_pid = os.getpid()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[Any]:
+        self._ensure_schema()
+        with shared_cache.transaction() as connection:
+            yield connection
+
+    def _is_next(self, connection, ticket: str, now: float) -> bool:
+        """빈 슬롯이 있고 이 티켓이 그 안에 드는 차례인지"""
+        running = connection.execute("SELECT count(*) FROM upstream_queue WHERE state = 'running'").fetchone()[0]
+        free = self.slots - running
+        if free <= 0:
+            return False
+        return ticket in {row[0] for row in connection.execute(
+            _NEXT_TICKETS, (now - UPSTREAM_WAITER_STALE_SECONDS, UPSTREAM_USER_SHARE_SECONDS, free))}
+
+    def _cleanup(self, connection, now: float):
+        connection.execute(
+            "DELETE FROM upstream_queue WHERE (state = 'waiting' AND heartbeat < ?) OR (state = 'running' AND expires_at < ?)",
+            (now - UPSTREAM_WAITER_STALE_SECONDS, now)
+        )
+        connection.execute("DELETE FROM upstream_waits WHERE at < ?", (now - UPSTREAM_STATS_WINDOW,))
+
+    def _record(self, connection, lane: Lane, outcome: str, wait: float, now: float):
+        connection.execute("INSERT INTO upstream_waits (at, class, outcome, wait) VALUES (?, ?, ?, ?)",
+                           (now, lane.upstream_class, outcome, wait))
+
+    def _estimate_wait(self, connection, lane: Lane, now: float) -> float:
+        """지금 도착한 요청의 예상 대기 시간 (슬롯 하나가 평균 '모델 중간 응답 시간 / 슬롯 수'마다 빈다고 가정)"""
+        running = connection.execute("SELECT count(*) FROM upstream_queue WHERE state = 'running'").fetchone()[0]
+        ahead = connection.execute(
+            "SELECT count(*) FROM upstream_queue WHERE state = 'waiting' AND heartbeat >= ? AND virtual_at <= ?",
+            (now - UPSTREAM_WAITER_STALE_SECONDS, now + lane.offset)
+        ).fetchone()[0]
+        if running + ahead < self.slots:
+            return 0.0
+        return (running + ahead + 1 - self.slots) / self.slots * upstream_latency.estimate(lane.model, percentile=0.5)
+
+    def admit(self, lane: Lane):
+        """대기열에 넣기 전 빠른 과부하 확인 (저장 등 부수 작업 전에 호출)
+
+        Raises:
+            UpstreamOverloaded: 예상 대기 시간이 등급 한도를 넘는 경우
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._transaction() as connection:
+            self._cleanup(connection, now)
+            expected = self._estimate_wait(connection, lane, now)
+            if expected > lane.max_wait:
+                self._record(connection, lane, "shed", 0.0, now)
+        if expected > lane.max_wait:
+            logging.warning(f"업스트림 과부하로 요청 차단 ({lane.upstream_class}, 예상 대기 {expected:.1f}초)")
+            raise UpstreamOverloaded(f"예상 대기 {expected:.1f}초 > {lane.max_wait:.0f}초", expected)
+
+    @contextmanager
+    def slot(self, lane: Lane, timeout: float, cancel=None) -> Iterator[float]:
+        """호출 슬롯을 받아 호출이 끝날 때까지 유지 (대기 시간을 반환)
+
+        Args:
+            timeout: 호출 타임아웃 (슬롯 임대 시간 계산용)
+
+        Raises:
+            UpstreamOverloaded: 대기 중 등급 한도를 넘은 경우
+            RequestCancelled: 대기 중 cancel이 취소된 경우
+        """
+        if not self.enabled:
+            yield 0.0
+            return
+
+        ticket = uuid.uuid4().hex
+        enqueued = time.time()
+        wait = self._acquire(ticket, lane, enqueued, timeout, cancel)
+        try:
+            yield wait
+        finally:
+            try:
+                with self._transaction() as connection:
+                    connection.execute("DELETE FROM upstream_queue WHERE ticket = ?", (ticket,))
+            except Exception as e:
+                logging.error(f"업스트림 슬롯 반환 오류: {str(e)}")
+
+    def _acquire(self, ticket: str, lane: Lane, enqueued: float, timeout: float, cancel) -> float:
+        with self._transaction() as connection:
+            self._cleanup(connection, enqueued)
+            connection.execute(
+                "INSERT INTO upstream_queue (ticket, class, user_key, virtual_at, enqueued_at, state, heartbeat) "
+                "VALUES (?, ?, ?, ?, ?, 'waiting', ?)",
+                (ticket, lane.upstream_class, lane.user_key, enqueued + lane.offset, enqueued, enqueued)
+            )
+
+        poll = UPSTREAM_POLL_MIN_SECONDS
+        heartbeat = enqueued
+        while True:
+            now = time.time()
+            # 차례 확인은 읽기로만 (WAL이라 다른 워커의 쓰기를 막지 않음), 상태를 바꿀 때만 쓰기 트랜잭션
+            with shared_cache.connection() as connection:
+                ready = self._is_next(connection, ticket, now)
+            cancelled = cancel is not None and cancel.cancelled
+            if not (ready or cancelled or now - enqueued > lane.max_wait or now - heartbeat >= UPSTREAM_HEARTBEAT_SECONDS):
+                time.sleep(poll)
+                poll = min(poll * 2, UPSTREAM_POLL_MAX_SECONDS)
+                continue
+
+            outcome = None
+            with self._transaction() as connection:
+                if ready and self._is_next(connection, ticket, now):
+                    connection.execute(
+                        "UPDATE upstream_queue SET state = 'running', heartbeat = ?, expires_at = ? WHERE ticket = ?",
+                        (now, now + timeout + UPSTREAM_LEASE_GRACE_SECONDS, ticket)
+                    )
+                    outcome = "admitted"
+                elif cancelled:
+                    outcome = "cancelled"
+                elif now - enqueued > lane.max_wait:
+                    outcome = "shed"
+                else:
+                    connection.execute("UPDATE upstream_queue SET heartbeat = ? WHERE ticket = ?", (now, ticket))
+                    heartbeat = now
+
+                if outcome is not None:
+                    if outcome != "admitted":
+                        connection.execute("DELETE FROM upstream_queue WHERE ticket = ?", (ticket,))
+                    self._record(connection, lane, outcome, now - enqueued, now)
+
+            if outcome == "admitted":
+                return now - enqueued
+            if outcome == "cancelled":
+                cancel.check()
+            if outcome == "shed":
+                logging.warning(f"업스트림 대기 한도 초과로 요청 차단 ({lane.upstream_class}, {now - enqueued:.1f}초 대기)")
+                raise UpstreamOverloaded(f"대기 {now - enqueued:.1f}초 > {lane.max_wait:.0f}초",
+                                         upstream_latency.estimate(lane.model, percentile=0.5))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """등급별 대기열 길이/실행 중 호출 수와 최근 UPSTREAM_STATS_WINDOW초 동안의 대기 시간 통계"""
+        now = time.time()
+        classes: Dict[str, Dict[str, Any]] = {
+            name: {"waiting": 0, "running": 0, "admitted": 0, "shed": 0, "cancelled": 0,
+                   "wait_p50_ms": None, "wait_p95_ms": None, "wait_max_ms": None}
+            for name in UPSTREAM_CLASS_OFFSETS
+        }
+        with self._transaction() as connection:
+            self._cleanup(connection, now)
+            for name, state, count in connection.execute(
+                    "SELECT class, state, count(*) FROM upstream_queue GROUP BY class, state"):
+                classes[name][state] = count
+            waits: Dict[str, List[float]] = {}
+            for name, outcome, wait in connection.execute("SELECT class, outcome, wait FROM upstream_waits"):
+                classes[name][outcome] += 1
+                if outcome == "admitted":
+                    waits.setdefault(name, []).append(wait)
+
+        for name, samples in waits.items():
+            samples.sort()
+            classes[name].update({
+                "wait_p50_ms": round(samples[int(len(samples) * 0.5)] * 1000, 1),
+                "wait_p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 1),
+                "wait_max_ms": round(samples[-1] * 1000, 1)
+            })
+
+        return {
+            "enabled": self.enabled,
+            "slots": self.slots,
+            "running": sum(info["running"] for info in classes.values()),
+            "waiting": sum(info["waiting"] for info in classes.values()),
+            "window_seconds": UPSTREAM_STATS_WINDOW,
+            "classes": classes
+        }
+
+
+upstream_scheduler = UpstreamScheduler()
+
+
+def register_upstream_commands(app: Flask):
+    """flask upstream-stats 명령 등록"""
+
+    @app.cli.command("upstream-stats")
+    def upstream_stats():
+        """업스트림 대기열 길이와 등급별 대기 시간 출력"""
+        snapshot = upstream_scheduler.snapshot()
+        click.echo(f"슬롯 {snapshot['slots']}개, 실행 중 {snapshot['running']}, 대기 {snapshot['waiting']} "
+                   f"(최근 {snapshot['window_seconds']:.0f}초)")
+        click.echo(f"{'class':<12}{'wait':>6}{'run':>6}{'admit':>8}{'shed':>6}{'cancel':>8}{'p50ms':>9}{'p95ms':>9}{'maxms':>9}")
+        for name, info in snapshot["classes"].items():
+            click.echo(f"{name:<12}{info['waiting']:>6}{info['running']:>6}{info['admitted']:>8}{info['shed']:>6}"
+                       f"{info['cancelled']:>8}{info['wait_p50_ms'] or '-':>9}{info['wait_p95_ms'] or '-':>9}"
+                       f"{info['wait_max_ms'] or '-':>9}")